@@ -1,4 +1,5 @@
 import math
+import time
 
 try:
     import pygame
@@ -9,6 +10,10 @@ except Exception:
 class ActionTab:
     def __init__(self, action_id):
         self.action_id = action_id
+        # Data version for change-driven rendering; the ring is driven by app state
+        self.version = 0
+        # Last drawn ring state, used to report damage to the app
+        self.drawn_state = None
 
     def draw(self, surface, rect, app, styles, fonts):
         """Draw a large progress ring centered in the available content `rect`.
@@ -30,6 +35,15 @@ class ActionTab:
         if pygame is None:
             return
 
+        # Keep animating the ring while the screen is held
+        if app.long_press_start_time is not None:
+            app.schedule_redraw(time.time() + app.FRAME_INTERVAL)
+
+        state = (tuple(rect), app.long_press_progress)
+        if state != self.drawn_state:
+            self.drawn_state = state
+            app.mark_dirty(rect)
+
         pygame.draw.circle(surface, styles.NEUTRAL_RING, (cx, cy), radius, thickness)
 
         # Draw progress arc
@@ -41,6 +55,6 @@ class ActionTab:
 
         # Draw small action label inside the ring
         label_txt = self.action_id.capitalize()
-        lbl = fonts['content'].render(label_txt, True, styles.ACCENT_COLOR)
+        lbl = styles.render_text(fonts['content'], label_txt, styles.ACCENT_COLOR)
         lbl_rect = lbl.get_rect(center=(cx, cy))
         surface.blit(lbl, lbl_rect)
@@ -0,0 +1,146 @@
+import math
+from collections import deque, namedtuple
+
+TAP = 'tap'
+SWIPE_LEFT = 'swipe_left'
+SWIPE_RIGHT = 'swipe_right'
+LONG_PRESS = 'long_press'
+
+# x/y: where the touch started; dx/dy: total movement; velocity: horizontal
+# speed in px/s over the last VELOCITY_WINDOW; t: event time (time.monotonic())
+Gesture = namedtuple('Gesture', ['kind', 'x', 'y', 'dx', 'dy', 'velocity', 'duration', 't'])
+
+VELOCITY_WINDOW = 0.1  # seconds of movement used for the release velocity
+
+
+class GestureRecognizer:
+    """State machine turning timestamped touch events into gestures.
+
+    Feed it `press(t)`, `move(x, y, t)` and `release(t)` (screen coordinates,
+    times on the time.monotonic() clock) and call `poll(now)` while a finger
+    is down so a long press fires without waiting for the release.
+
+    A touch that stays within `tap_slop` pixels is a tap on release, or a
+    long press once held for `long_press` seconds; a long press no handler
+    consumed still ends as a tap on release. A mostly horizontal move
+    of at least `swipe_distance` pixels, or a shorter flick faster than
+    `fling_velocity` px/s, is a swipe. Handlers subscribed with
+    `commit_on_press=True` get the tap as soon as the first position of a
+    touch lands on them; the rest of that touch is ignored.
+    """
+
+    def __init__(self, tap_slop=20, swipe_distance=60, fling_velocity=400, long_press=0.6):
+        self.tap_slop = tap_slop
+        self.swipe_distance = swipe_distance
+        self.fling_velocity = fling_velocity
+        self.long_press = long_press
+        self._subscribers = []  # (callback, hit, commit_on_press), newest first
+        self._reset()
+
+    def _reset(self):
+        self.down = False
+        self._start = None  # (x, y, t) of the first position of the touch
+        self._press_t = None
+        self._last = None
+        self._samples = deque()
+        self._moved = False
+        self._done = False  # gesture already delivered (long press, press commit)
+        self._long_fired = False  # long press offered (consumed or not)
+
+    @property
+    def dragging(self):
+        """True once the current touch moved beyond the tap slop."""
+        return self.down and self._moved
+
+    def subscribe(self, callback, hit=None, commit_on_press=False):
+        """Call `callback(gesture)` for gestures starting where `hit(x, y)` is true
+        (everywhere if `hit` is None). Newer subscribers are asked first; the
+        first one returning True consumes the gesture."""
+        self._subscribers.insert(0, (callback, hit, commit_on_press))
+
+    def unsubscribe(self, callback):
+        self._subscribers = [s for s in self._subscribers if s[0] is not callback]
+
+    def cancel(self):
+        """Forget the current touch without emitting anything."""
+        self._reset()
+
+    def press(self, t):
+        self._reset()
+        self.down = True
+        self._press_t = t
+
+    def move(self, x, y, t):
+        if not self.down or self._done:
+            return None
+        if self._start is None:
+            self._start = (x, y, t)
+            gesture = Gesture(TAP, x, y, 0, 0, 0.0, t - self._press_t, t)
+            for callback, hit, commit in self._subscribers:
+                if commit and (hit is None or hit(x, y)) and callback(gesture):
+                    self._done = True
+                    return gesture
+        self._last = (x, y, t)
+        self._samples.append(self._last)
+        while t - self._samples[0][2] > VELOCITY_WINDOW:
+            self._samples.popleft()
+        if not self._moved and math.hypot(x - self._start[0], y - self._start[1]) > self.tap_slop:
+            self._moved = True
+        return None
+
+    def poll(self, now):
+        """Emit a long press if the finger has been held still long enough."""
+        if (self.down and not self._done and not self._long_fired and not self._moved
+                and self._start is not None and now - self._press_t >= self.long_press):
+            self._long_fired = True
+            x, y, _ = self._start
+            gesture = self._dispatch(Gesture(LONG_PRESS, x, y, 0, 0, 0.0, now - self._press_t, now))
+            # Unclaimed: the release still counts as a tap
+            self._done = gesture is not None
+            return gesture
+        return None
+
+    def timeout(self, now):
+        """Seconds until poll() may fire a long press, or None if nothing is pending."""
+        if not self.down or self._done or self._long_fired or self._moved or self._start is None:
+            return None
+        return max(0.0, self._press_t + self.long_press - now)
+
+    def release(self, t):
+        """Finish the touch and return the delivered gesture (or None)."""
+        gesture = self.poll(t)
+        if not self.down or self._done or self._start is None:
+            self._reset()
+            return gesture
+        x, y, _ = self._start
+        lx, ly, _ = self._last
+        dx, dy = lx - x, ly - y
+        velocity = self._velocity()
+        duration = t - self._press_t
+        moved = self._moved
+        self._reset()
+        if not moved:
+            kind = TAP
+        elif abs(dx) > 1.5 * abs(dy) and (abs(dx) >= self.swipe_distance
+                                          or abs(velocity) >= self.fling_velocity):
+            kind = SWIPE_LEFT if dx < 0 else SWIPE_RIGHT
+        else:
+            return None
+        return self._dispatch(Gesture(kind, x, y, dx, dy, velocity, duration, t))
+
+    def _velocity(self):
+        """Horizontal speed (px/s) over the most recent samples."""
+        if len(self._samples) < 2:
+            return 0.0
+        (x0, _, t0), (x1, _, t1) = self._samples[0], self._samples[-1]
+        return (x1 - x0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def _dispatch(self, gesture):
+        for callback, hit, commit in self._subscribers:
+            if commit and gesture.kind == TAP:
+                # Press-committed handlers already had their chance
+                continue
+            if hit is None or hit(gesture.x, gesture.y):
+                if callback(gesture):
+                    return gesture
+        return None
@@ -0,0 +1,39 @@
+try:
+    import pygame
+except Exception:
+    pygame = None
+
+
+class ContentLayer:
+    """Off-screen copy of a tab's content area, rebuilt only when it changes.
+
+    `draw()` re-renders into the cached surface when the caller's snapshot
+    key or the content rect differ from the last build; otherwise the
+    cached pixels are composited with a single blit.
+    """
+
+    def __init__(self):
+        self.surface = None
+        self.key = None
+
+    def draw(self, surface, rect, key, render, background):
+        """Blit the layer for `key` into `rect` of `surface`.
+
+        `render(layer, local_rect)` draws the content into the layer, with
+        `local_rect` covering the whole layer. Returns True if rebuilt.
+        """
+        rebuilt = False
+        full_key = (tuple(rect), key)
+        if self.surface is None or full_key != self.key:
+            if self.surface is None or self.surface.get_size() != rect.size:
+                # Same pixel format as the target so compositing is a plain copy
+                self.surface = pygame.Surface(rect.size, 0, surface)
+            self.surface.fill(background)
+            render(self.surface, self.surface.get_rect())
+            self.key = full_key
+            rebuilt = True
+        surface.blit(self.surface, rect.topleft)
+        return rebuilt
+
+    def invalidate(self):
+        self.key = None
@@ -1,5 +1,7 @@
 import pygame
 
+from GUI.text_cache import render_text
+
 # Color palette (friendly theme)
 BG_COLOR = (0, 0, 0)                 # 000000 background
 HEADER_BG = (11, 124, 141)           # 0B7C8D (kept for reference)
@@ -15,6 +17,7 @@ ACCENT_COLOR = (237, 154, 23)        # ED9A17 for highlights/animations/mid-rang
 MUTED_TEXT = (200, 200, 200)         # secondary text like IPs
 OK_COLOR = (48, 155, 64)             # 309B40 success (green dot)
 ERROR_COLOR = (225, 85, 20)          # E15514 error (red/orange)
+WARN_COLOR = (237, 154, 23)          # ED9A17 reachable but slow or lossy
 NEUTRAL_RING = (60, 60, 60)          # ring/background for action tab
 INACTIVE_INDICATOR = (120, 120, 120) # indicator circle when inactive
 
@@ -27,6 +30,10 @@ CONTENT_FONT_SIZE = 44
 # Optional smaller font for compact tables
 SMALL_FONT_SIZE = 32
 
+# Ping cells turn WARN_COLOR at this average RTT or above this loss rate in the window
+LATENCY_WARN_MS = 100
+LOSS_WARN_PCT = 5
+
 
 def load_fonts():
     # Ensure pygame.font was initialized by caller
@@ -39,7 +46,7 @@ def load_fonts():
     }
 
 
-def draw_toast(surface, rect, fonts, message, color=OK_COLOR):
+def draw_toast(surface, rect, fonts, message, color=OK_COLOR, font_key='content'):
     """Render a toast message using the IP tab's style.
 
     - Semi-transparent dark rounded rectangle (simple rect here)
@@ -47,8 +54,8 @@ def draw_toast(surface, rect, fonts, message, color=OK_COLOR):
     - Text in success color by default
     """
     try:
-        toast_font = fonts.get('content', fonts['content'])
-        toast_text = toast_font.render(message, True, color)
+        toast_font = fonts.get(font_key, fonts['content'])
+        toast_text = render_text(toast_font, message, color)
         toast_rect = toast_text.get_rect()
         toast_x = rect.centerx - toast_rect.width // 2
         toast_y = rect.bottom - 60
@@ -63,8 +70,8 @@ def draw_toast(surface, rect, fonts, message, color=OK_COLOR):
     except Exception:
         # Fallback: plain text centered at bottom
         try:
-            toast_font = fonts.get('content', fonts['content'])
-            toast_text = toast_font.render(message, True, color)
+            toast_font = fonts.get(font_key, fonts['content'])
+            toast_text = render_text(toast_font, message, color)
             surface.blit(toast_text, toast_text.get_rect(center=(rect.centerx, rect.bottom - 60)))
         except Exception:
             pass
@@ -1,59 +1,71 @@
-import re
-import os
-import subprocess
 import threading
 import time
 try:
     import pygame
 except Exception:
     pygame = None
-try:
-    import yaml
-except Exception:
-    yaml = None
+
+from GUI.layer import ContentLayer
+from tagtapperpi_comp.config import get_config_store
+from tagtapperpi_comp.netstate import EMPTY_SNAPSHOT, get_network_state, ordered_interfaces
 
 
 class TabIP:
-    def __init__(self):
+    def __init__(self, autostart=True, netstate=None, config=None):
         self._lock = threading.Lock()
         self.cached_ifaces = []
         self.cached_ips = {}
         self.cached_up = {}
         self.cached_vlan_names = {}
-        self.poll_interval = 2  # seconds between refreshes
+        self.cached_ssids = {}
+        # Bumped whenever the cached table data changes (change-driven rendering)
+        self.version = 0
         # Track previous state for change detection
         self.prev_up = {}
         self.prev_ips = {}
         # Toast message system
         self.toast_message = None
         self.toast_time = 0
-        # populate initial cache
-        self.refresh_cache()
-        # start polling thread for reliable updates
-        p = threading.Thread(target=self._poll_loop, daemon=True)
-        p.start()
-
-    def _poll_loop(self):
-        """Periodic fallback refresh to catch state changes if monitor misses events."""
-        while True:
-            try:
-                self.refresh_cache()
-            except Exception:
-                pass
-            time.sleep(self.poll_interval)
-
-    def refresh_cache(self):
+        # Last drawn table state, used to report damage to the app
+        self.drawn_state = None
+        # Off-screen copy of the rendered table
+        self.layer = ContentLayer()
+        # Shared network state service (interfaces, addresses, link state)
+        self.netstate = netstate
+        # Shared config store (VLAN names)
+        self.config = config
+        self._refresh_lock = threading.Lock()
+        # autostart=False leaves the cache empty and idle (e.g. for benchmarks)
+        if autostart:
+            if self.netstate is None:
+                self.netstate = get_network_state()
+            if self.config is None:
+                self.config = get_config_store()
+            self.netstate.subscribe(self._on_net_change)
+            self.config.subscribe(self._on_net_change)
+            # populate initial cache
+            self.refresh_cache()
+
+    def _on_net_change(self, snapshot):
+        """Called when links, addresses or the config changed."""
         try:
-            ifaces = self.get_all_interfaces()
+            self.refresh_cache()
         except Exception:
-            ifaces = []
+            pass
+
+    def refresh_cache(self):
+        # Called from both the network state collector and the config watcher
+        with self._refresh_lock:
+            self._refresh_cache()
+
+    def _refresh_cache(self):
+        snap = self.netstate.snapshot() if self.netstate is not None else EMPTY_SNAPSHOT
+        ifaces = list(snap.ifaces)
+        ips = dict(snap.ips)
+        ups = dict(snap.ups)
+        ssids = dict(snap.ssids)
         vlan_names = self.load_vlan_names()
-        ips = {}
-        ups = {}
-        for iface in ifaces:
-            ips[iface] = self.get_ip_for_iface(iface)
-            ups[iface] = self.iface_is_up(iface)
-        
+
         # Detect state changes and generate toast messages
         for iface in ups:
             if iface not in self.prev_up:
@@ -88,95 +100,82 @@ class TabIP:
                     self.prev_ips[iface] = curr_ip
         
         with self._lock:
+            if (ifaces, ips, ups, vlan_names, ssids) != (self.cached_ifaces, self.cached_ips, self.cached_up,
+                                                         self.cached_vlan_names, self.cached_ssids):
+                self.version += 1
             self.cached_ifaces = ifaces
             self.cached_ips = ips
             self.cached_up = ups
             self.cached_vlan_names = vlan_names
-    def load_vlan_names(self):
-        # repo root is parent of GUI folder
-        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        cfg_path = os.path.join(repo, 'config.yaml')
-        names = {}
-        if not yaml:
-            return names
-        try:
-            with open(cfg_path, 'r') as f:
-                cfg = yaml.safe_load(f) or {}
-            for v in cfg.get('vlans', []):
-                vid = str(v.get('id'))
-                name = v.get('name') or v.get('name', '')
-                if name:
-                    names[vid] = name
-        except Exception:
-            pass
-        return names
-
-    def get_all_interfaces(self):
-        out = subprocess.check_output(['ip', '-o', 'link', 'show']).decode('utf-8')
-        names = []
-        for line in out.splitlines():
-            parts = line.split(':', 2)
-            if len(parts) >= 2:
-                names.append(parts[1].strip().split('@')[0])
-        return names
+            self.cached_ssids = ssids
 
-    def get_ip_for_iface(self, iface):
-        try:
-            out = subprocess.check_output(['ip', '-o', '-4', 'addr', 'show', 'dev', iface]).decode('utf-8')
-            m = re.search(r'\binet (\S+)', out)
-            if m:
-                return m.group(1)
-        except subprocess.CalledProcessError:
-            return None
-        return None
-
-    def iface_is_up(self, iface):
-        # Returns True if the interface operational state is UP
-        try:
-            out = subprocess.check_output(['ip', '-o', 'link', 'show', 'dev', iface]).decode('utf-8')
-            # example: '2: eth0: <BROADCAST,...> mtu 1500 qdisc ... state DOWN mode DEFAULT group ...'
-            m = re.search(r'\bstate\s+(\w+)', out)
-            if m:
-                return m.group(1).upper() == 'UP'
-        except subprocess.CalledProcessError:
-            return False
-        return False
-
-    def get_wifi_ssid(self, iface):
-        """Get the SSID for a wifi interface. Returns None if not connected or error."""
-        try:
-            out = subprocess.check_output(['iwgetid', iface, '-r'], stderr=subprocess.DEVNULL).decode('utf-8').strip()
-            return out if out else None
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return None
+    def load_vlan_names(self):
+        """Return {vlan id: name} from the current config snapshot."""
+        if self.config is None:
+            return {}
+        return dict(self.config.snapshot().vlan_names)
 
     def draw(self, surface, rect, app, styles, fonts):
-        # Use cached data updated by monitor thread for quick redraws
+        # Use cached data updated by the network state collector; no I/O here
         with self._lock:
             ifaces = list(self.cached_ifaces)
             vlan_names = dict(self.cached_vlan_names)
             ips = dict(self.cached_ips)
             ups = dict(self.cached_up)
+            ssids = dict(self.cached_ssids)
 
         # Build ordered candidate list: eth0, VLANs (by id), then wlan*
-        candidates = []
-        if 'eth0' in ifaces:
-            candidates.append('eth0')
+        candidates = ordered_interfaces(ifaces)
 
-        vlans = [n for n in ifaces if '.' in n]
-        def vlan_key(name):
-            try:
-                return int(name.split('.')[-1])
-            except Exception:
-                return 0
-        for n in sorted(vlans, key=vlan_key):
-            candidates.append(n)
+        # Table snapshot: (display name, IP text, OK) per row
+        rows = []
+        for iface in candidates:
+            ip = ips.get(iface)
+            up = ups.get(iface, False)
 
-        for n in sorted(ifaces):
-            if n.startswith('wlan') or n.startswith('wl'):
-                if n not in candidates:
-                    candidates.append(n)
+            display_name = iface
+            if '.' in iface:
+                vid = iface.split('.')[-1]
+                if vid in vlan_names:
+                    display_name = f"{iface} {vlan_names[vid]}"
+            elif iface.startswith('wlan') or iface.startswith('wl'):
+                # Add SSID for wifi interfaces if available
+                ssid = ssids.get(iface)
+                if ssid:
+                    # Truncate SSID if too long (max 16 chars)
+                    ssid_short = ssid[:16] + '…' if len(ssid) > 16 else ssid
+                    display_name = f"{iface} ({ssid_short})"
+
+            # Only show IP if interface is UP and has an IP
+            ip_text = ip if (ip and up) else '-'
+            rows.append((display_name, ip_text, bool(up and ip)))
+        rows = tuple(rows)
 
+        # The table is re-rendered only when the snapshot or rect changes
+        self.layer.draw(surface, rect, rows,
+                        lambda layer, r: self._render_table(layer, r, rows, styles, fonts),
+                        styles.BG_COLOR)
+
+        # Render toast message if active
+        if self.toast_message:
+            elapsed = time.time() - self.toast_time
+            if elapsed < 3:  # Show for 3 seconds
+                app.schedule_redraw(self.toast_time + 3)
+                try:
+                    styles.draw_toast(surface, rect, fonts, self.toast_message)
+                except Exception:
+                    pass
+            else:
+                self.toast_message = None
+
+        # Report the content area as damaged only when what we drew changed
+        state = (tuple(rect), rows, self.toast_message)
+        if state != self.drawn_state:
+            self.drawn_state = state
+            app.mark_dirty(rect)
+
+    def _render_table(self, surface, rect, rows, styles, fonts):
+        """Draw the interface table for `rows` into `rect`."""
         # Use a smaller font for the table to fit more rows and reduce top spacing
         table_font = fonts.get('tab_title', fonts['content'])
         # Prepare drawing positions
@@ -197,46 +196,25 @@ class TabIP:
                 pass
 
         # Header row (no 'OK' label per request)
-        hdr_name = table_font.render('Schnittstelle', True, styles.TEXT_COLOR)
-        hdr_ip = table_font.render('IP', True, styles.TEXT_COLOR)
+        hdr_name = styles.render_text(table_font, 'Schnittstelle', styles.TEXT_COLOR)
+        hdr_ip = styles.render_text(table_font, 'IP', styles.TEXT_COLOR)
         surface.blit(hdr_name, (name_x, rect.top + 18))
         surface.blit(hdr_ip, (ip_x, rect.top + 18))
 
         # Rows
-        for i, iface in enumerate(candidates):
+        for i, (display_name, ip_text, ok) in enumerate(rows):
             y = start_y + i * row_h
-            ip = ips.get(iface)
-            up = ups.get(iface, False)
-
-            display_name = iface
-            if '.' in iface:
-                vid = iface.split('.')[-1]
-                if vid in vlan_names:
-                    display_name = f"{iface} {vlan_names[vid]}"
-            elif iface.startswith('wlan') or iface.startswith('wl'):
-                # Add SSID for wifi interfaces if available
-                ssid = self.get_wifi_ssid(iface)
-                if ssid:
-                    # Truncate SSID if too long (max 16 chars)
-                    ssid_short = ssid[:16] + '…' if len(ssid) > 16 else ssid
-                    display_name = f"{iface} ({ssid_short})"
-
-            name_s = table_font.render(display_name, True, styles.TEXT_COLOR)
+            name_s = styles.render_text(table_font, display_name, styles.TEXT_COLOR)
             surface.blit(name_s, (name_x, y))
-            # Only show IP if interface is UP and has an IP
-            ip_text = ip if (ip and up) else '-'
-            ip_s = table_font.render(ip_text, True, styles.MUTED_TEXT)
+            ip_s = styles.render_text(table_font, ip_text, styles.MUTED_TEXT)
             surface.blit(ip_s, (ip_x, y))
             # Draw status icon: green filled circle if up+ip, otherwise red X
-            if up and ip:
+            if ok:
                 # green dot
                 try:
                     pygame.draw.circle(surface, styles.OK_COLOR, (status_x, y + row_h // 2), row_h // 3)
                 except Exception:
-                    try:
-                        pygame.draw.circle(surface, styles.OK_COLOR, (status_x, y + row_h // 2), row_h // 3)
-                    except Exception:
-                        pass
+                    pass
             else:
                 # red 'X'
                 cx = status_x
@@ -248,14 +226,3 @@ class TabIP:
                     pygame.draw.line(surface, color, (cx - s, cy + s), (cx + s, cy - s), 2)
                 except Exception:
                     pass
-
-        # Render toast message if active
-        if self.toast_message:
-            elapsed = time.time() - self.toast_time
-            if elapsed < 3:  # Show for 3 seconds
-                try:
-                    styles.draw_toast(surface, rect, fonts, self.toast_message)
-                except Exception:
-                    pass
-            else:
-                self.toast_message = None
@@ -1,4 +1,5 @@
-import os
+import logging
+import re
 import subprocess
 import threading
 import time
@@ -6,137 +7,359 @@ try:
     import pygame
 except Exception:
     pygame = None
-try:
-    import yaml
-except Exception:
-    yaml = None
+
+from GUI import gestures
+from GUI.layer import ContentLayer
+from tagtapperpi_comp.config import get_config_store
+from tagtapperpi_comp.icmp import IcmpEngine
+from tagtapperpi_comp.probe_scheduler import ProbeScheduler
+from tagtapperpi_comp.rtt_stats import RttStats
+from tagtapperpi_comp.netstate import get_network_state
 
 
 class TabPing:
-    def __init__(self):
+    def __init__(self, autostart=True, netstate=None, config=None):
         self._lock = threading.Lock()
         self.ping_results = {}  # {(interface, host): bool}
+        # RTT ring buffers and their per-cycle summaries {(interface, host): RttSummary}
+        self.stats = RttStats()
+        self.ping_stats = {}
         self.last_update = None
         self.interfaces = []
         self.ping_targets = []
-        self.update_interval = 10  # seconds
+        self.update_interval = 10  # seconds, default per target (config: pings[].interval)
         self.ping_timeout = 2  # seconds
+        # Sends all probes of a cycle concurrently over ICMP sockets
+        self.engine = IcmpEngine(timeout=self.ping_timeout)
+        # Per-pair due times with backoff for unreachable targets
+        self.scheduler = ProbeScheduler(default_interval=self.update_interval)
+        # (up, ip) per interface as last seen, to re-probe on link/address changes
+        self._link_state = {}
+        # Set to make the ping loop look at the schedule right away
+        self._wake = threading.Event()
+        # Warn only once when the ping binary has to stand in for ICMP sockets
+        self._fallback_logged = False
+        # Last drawn matrix state, used to report damage to the app
+        self.drawn_state = None
+        # Off-screen copy of the rendered matrix
+        self.layer = ContentLayer()
+        # Screen rects of the matrix cells (for taps) and the tapped cell
+        self.cell_rects = {}
+        self.cell_layout_key = None
+        self.selected = None
+        self.selected_time = 0
+        self.detail_duration = 5  # seconds the tapped cell's statistics stay visible
+        # Bumped on every ping cycle or config change (change-driven rendering)
+        self.version = 0
         
-        # Load initial config
-        self.refresh_config()
-        
-        # Start ping monitor thread
         self.stop_event = threading.Event()
-        t = threading.Thread(target=self._ping_loop, daemon=True)
-        t.start()
+        # Called with the new results after every update (e.g. session journal)
+        self._subscribers = []
+        # Shared network state service (which interfaces exist)
+        self.netstate = netstate
+        # Shared config store (VLANs, ping targets)
+        self.config = config
+        # autostart=False skips config loading and pinging (e.g. for benchmarks)
+        if autostart:
+            if self.netstate is None:
+                self.netstate = get_network_state()
+            if self.config is None:
+                self.config = get_config_store()
+            # Load initial config
+            self.refresh_config()
+            # Config edits and new or removed wlan interfaces change the matrix
+            self.netstate.subscribe(self._on_net_change)
+            self.config.subscribe(self._on_net_change)
+
+            # Start ping monitor thread
+            t = threading.Thread(target=self._ping_loop, daemon=True)
+            t.start()
 
     def refresh_config(self):
-        """Load interfaces and ping targets from config.yaml."""
-        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        cfg_path = os.path.join(repo, 'config.yaml')
-        
-        interfaces = []
-        targets = []
-        
-        if not yaml:
+        """Rebuild interfaces and ping targets from the config and network snapshots."""
+        if self.config is None:
             return
-        
-        try:
-            with open(cfg_path, 'r') as f:
-                cfg = yaml.safe_load(f) or {}
-            
-            # Build interface list: eth0, VLANs, then wlan*
-            interfaces.append('eth0')
-            
-            for v in cfg.get('vlans', []):
-                vid = str(v.get('id'))
-                interfaces.append(f"eth0.{vid}")
-            
-            # Add wlan interfaces dynamically (like in tab_ip.py)
-            try:
-                out = subprocess.check_output(['ip', '-o', 'link', 'show']).decode('utf-8')
-                for line in out.splitlines():
-                    parts = line.split(':', 2)
-                    if len(parts) >= 2:
-                        iface = parts[1].strip().split('@')[0]
-                        if iface.startswith('wlan') or iface.startswith('wl'):
-                            if iface not in interfaces:
-                                interfaces.append(iface)
-            except Exception:
-                pass
-            
-            # Get ping targets
-            for p in cfg.get('pings', []):
-                host = p.get('host')
-                name = p.get('name', host)
-                if host:
-                    targets.append({'host': host, 'name': name})
-        
-        except Exception:
-            pass
-        
+        cfg = self.config.snapshot()
+
+        # Build interface list: eth0, VLANs, then wlan*
+        interfaces = ['eth0']
+        for v in cfg.vlans:
+            interfaces.append(f"eth0.{v.id}")
+
+        # Add wlan interfaces dynamically (same state as the IP tab)
+        if self.netstate is not None:
+            for iface in self.netstate.snapshot().ifaces:
+                if iface.startswith('wlan') or iface.startswith('wl'):
+                    if iface not in interfaces:
+                        interfaces.append(iface)
+
+        # Ping targets (validated by the config store)
+        targets = [{'host': p['host'], 'name': p['name'], 'interval': p.get('interval')}
+                   for p in cfg.pings]
+
         with self._lock:
+            changed = (interfaces, targets) != (self.interfaces, self.ping_targets)
+            if changed:
+                self.version += 1
             self.interfaces = interfaces
             self.ping_targets = targets
+            # New pairs become due immediately, removed ones are dropped
+            self.scheduler.configure({(iface, t['host']): t.get('interval')
+                                      for iface in interfaces for t in targets})
+        if changed:
+            self._wake.set()
+
+    def subscribe(self, callback):
+        """Call `callback(results)` from the ping thread after each update of ping_results."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    def _on_net_change(self, snapshot):
+        try:
+            self.refresh_config()
+            # A cable plugged in or an address (re)assigned: re-probe that interface now
+            if hasattr(snapshot, 'ups'):
+                state = {i: (snapshot.ups.get(i), snapshot.ips.get(i)) for i in snapshot.ifaces}
+                with self._lock:
+                    for iface, now in state.items():
+                        if self._link_state.get(iface) != now:
+                            self.scheduler.trigger(iface)
+                    self._link_state = state
+                self._wake.set()
+        except Exception:
+            pass
+
+    def _active_interfaces(self):
+        """Interfaces worth probing: present, link up and an IPv4 address assigned."""
+        if self.netstate is None:
+            return set()
+        snap = self.netstate.snapshot()
+        return {i for i in snap.ifaces if snap.ups.get(i) and snap.ips.get(i)}
 
     def _ping_loop(self):
-        """Background thread that periodically pings all targets from all interfaces."""
+        """Background thread that probes every pair when the scheduler says it is due."""
         while not self.stop_event.is_set():
-            self.refresh_config()
-            results = {}
-            
-            # Ping each target from each interface
-            for iface in self.interfaces:
-                for target in self.ping_targets:
-                    host = target['host']
-                    # Check if interface exists before pinging
-                    if self._interface_exists(iface):
-                        reachable = self._ping(iface, host)
-                    else:
-                        reachable = False
-                    results[(iface, host)] = reachable
-            
-            # Update cache
+            # Clear before reading the schedule: a set() from here on wakes the wait below
+            self._wake.clear()
+            active = self._active_interfaces()
             with self._lock:
-                self.ping_results = results
-                self.last_update = time.time()
-            
-            # Wait for next update cycle
-            self.stop_event.wait(self.update_interval)
+                interfaces = list(self.interfaces)
+                hosts = [t['host'] for t in self.ping_targets]
+                due = self.scheduler.due(time.monotonic(), active)
 
-    def _interface_exists(self, iface):
-        """Check if interface exists."""
-        try:
-            subprocess.check_output(['ip', 'link', 'show', 'dev', iface],
-                                  stderr=subprocess.DEVNULL)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+            # Probe all due pairs concurrently in one round
+            rtts = self.engine.probe(due, timeout=self.ping_timeout) if due else {}
+            # No ICMP socket permitted: fall back to the ping binary, all pairs at once
+            missing = [key for key in due if key not in rtts]
+            if missing:
+                if not self._fallback_logged:
+                    self._fallback_logged = True
+                    logging.warning("ICMP sockets not permitted, falling back to the ping binary")
+                rtts.update(self._ping_all(missing))
+            done = time.monotonic()
+            # One entry per due pair, from the socket engine or the ping binary
+            round_rtts = {key: rtts.get(key) for key in due}
+            self.stats.record_many(round_rtts)
+            probed = {key: rtt is not None for key, rtt in round_rtts.items()}
 
-    def _ping(self, interface, host):
-        """Ping a host from a specific interface with timeout."""
-        try:
-            result = subprocess.run(
-                ['ping', '-I', interface, '-c', '1', '-W', str(self.ping_timeout), host],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                timeout=self.ping_timeout + 1
-            )
-            return result.returncode == 0
-        except (subprocess.TimeoutExpired, Exception):
+            with self._lock:
+                for key, ok in probed.items():
+                    self.scheduler.report(key, ok, done)
+                # Pairs on down or unaddressed interfaces are paused and shown as failed
+                results = {}
+                for iface in interfaces:
+                    for host in hosts:
+                        key = (iface, host)
+                        results[key] = iface in active and probed.get(key, self.ping_results.get(key, False))
+                changed = results != self.ping_results
+
+            if probed or changed:
+                # Bounded memory: drop buffers of pairs that are no longer configured
+                self.stats.prune(results)
+                summaries = self.stats.summaries()
+
+                # Update cache
+                with self._lock:
+                    self.ping_results = results
+                    self.ping_stats = summaries
+                    if probed:
+                        self.last_update = time.time()
+                    self.version += 1
+
+                for callback in list(self._subscribers):
+                    try:
+                        callback(dict(results))
+                    except Exception:
+                        pass
+
+            # Sleep until the next pair is due, a link event or a config change
+            with self._lock:
+                next_due = self.scheduler.next_due(active)
+            wait = self.update_interval if next_due is None else next_due - time.monotonic()
+            if wait > 0:
+                self._wake.wait(min(wait, self.update_interval))
+
+    def _ping_all(self, pairs):
+        """Ping all (interface, host) pairs concurrently with the ping binary.
+
+        Returns {pair: RTT in seconds or None}; a round takes at most one
+        timeout, however many targets are unreachable.
+        """
+        procs = {}
+        for interface, host in pairs:
+            try:
+                procs[(interface, host)] = subprocess.Popen(
+                    ['ping', '-I', interface, '-c', '1', '-W', str(self.ping_timeout), host],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            except Exception:
+                pass
+        deadline = time.monotonic() + self.ping_timeout + 1
+        rtts = {pair: None for pair in pairs}
+        for pair, proc in procs.items():
+            try:
+                out, _ = proc.communicate(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                proc.stdout.close()
+                continue
+            except Exception:
+                continue
+            if proc.returncode == 0:
+                m = re.search(rb'time[=<]([\d.]+) ms', out)
+                rtts[pair] = float(m.group(1)) / 1000 if m else 0.0
+        return rtts
+
+    @staticmethod
+    def _cell_level(reachable, summary, styles):
+        """'ok', 'warn' (slow or lossy) or 'fail' for one matrix cell."""
+        if not reachable:
+            return 'fail'
+        if summary is not None and ((summary.avg_ms or 0) >= styles.LATENCY_WARN_MS
+                                    or summary.loss_pct > styles.LOSS_WARN_PCT):
+            return 'warn'
+        return 'ok'
+
+    @staticmethod
+    def _format_detail(iface, target, summary):
+        """One-line statistics text for a tapped cell."""
+        if summary is None:
+            return f"{iface} -> {target['name']}: keine Daten"
+        if summary.avg_ms is None:
+            return f"{iface} -> {target['name']}: Verlust 100 % ({summary.sent})"
+        return (f"{iface} -> {target['name']}: Ø {summary.avg_ms:.1f} ms, "
+                f"p95 {summary.p95_ms:.1f}, Jitter {summary.jitter_ms:.1f}, "
+                f"Verlust {summary.loss_pct:.0f} %")
+
+    def handle_tap(self, x, y):
+        """Toggle the statistics of the tapped cell. Returns True if a cell was hit."""
+        for key, cell in self.cell_rects.items():
+            if cell.collidepoint(x, y):
+                with self._lock:
+                    self.selected = None if self.selected == key else key
+                    self.selected_time = time.time()
+                    self.version += 1
+                return True
+        return False
+
+    def handle_gesture(self, gesture):
+        """Long press on a cell re-probes its interface right away. Returns True if a cell was hit."""
+        if gesture.kind != gestures.LONG_PRESS:
             return False
+        for (iface, _host), cell in self.cell_rects.items():
+            if cell.collidepoint(gesture.x, gesture.y):
+                with self._lock:
+                    self.scheduler.trigger(iface)
+                self._wake.set()
+                return True
+        return False
 
     def draw(self, surface, rect, app, styles, fonts):
         """Draw ping matrix table."""
         with self._lock:
             results = dict(self.ping_results)
+            stats = dict(self.ping_stats)
             targets = list(self.ping_targets)
             interfaces = list(self.interfaces)
             last_update = self.last_update
-        
+            selected = self.selected
+            selected_time = self.selected_time
+
+        # Cell colour: green, amber for high latency/loss, red when unreachable
+        levels = {(iface, t['host']): self._cell_level(results.get((iface, t['host']), False),
+                                                      stats.get((iface, t['host'])), styles)
+                  for iface in interfaces for t in targets}
+
+        # The matrix is re-rendered only when the snapshot or rect changes
+        snapshot = (tuple((t['host'], t['name']) for t in targets), tuple(interfaces),
+                    tuple(sorted(levels.items())))
+        row_h = fonts.get('tab_title', fonts['content']).get_height() + 6
+        self.layer.draw(surface, rect, snapshot,
+                        lambda layer, r: self._render_matrix(layer, r, targets, interfaces, levels, styles, fonts),
+                        styles.BG_COLOR)
+
+        # Screen positions of the cells, for handle_tap()
+        layout_key = (tuple(rect), snapshot[:2], row_h)
+        if layout_key != self.cell_layout_key:
+            self.cell_layout_key = layout_key
+            self.cell_rects = self._cell_rects(rect, targets, interfaces, row_h)
+
+        # Statistics of a tapped cell replace the update toast for a few seconds
+        detail = None
+        if selected is not None and time.time() - selected_time < self.detail_duration:
+            app.schedule_redraw(selected_time + self.detail_duration)
+            target = next((t for t in targets if t['host'] == selected[1]), None)
+            if target is not None:
+                detail = self._format_detail(selected[0], target, stats.get(selected))
+
+        show_toast = detail is None and bool(last_update) and time.time() - last_update < 3
+        state = (tuple(rect), snapshot, show_toast, detail)
+        if state != self.drawn_state:
+            self.drawn_state = state
+            app.mark_dirty(rect)
+
+        if detail is not None:
+            try:
+                styles.draw_toast(surface, rect, fonts, detail, color=styles.TEXT_COLOR, font_key='tab_title')
+            except Exception:
+                pass
+        # Show toast for 3 seconds after update (IP-style)
+        elif show_toast:
+            app.schedule_redraw(last_update + 3)
+            try:
+                styles.draw_toast(surface, rect, fonts, "Aktualisiert")
+            except Exception:
+                pass
+
+    @staticmethod
+    def _cell_rects(rect, targets, interfaces, row_h):
+        """Return {(interface, host): Rect} of the matrix cells inside `rect`."""
+        name_col_width = 190
+        iface_start_x = rect.left + 10 + name_col_width
+        available_width = rect.width - name_col_width - 40  # Leave margin
+        num_ifaces = len(interfaces)
+        iface_col_width = min(70, available_width // num_ifaces) if num_ifaces > 0 else 70
+        start_y = rect.top + 50
+        cells = {}
+        for row_idx, target in enumerate(targets):
+            y = start_y + row_idx * row_h
+            for col_idx, iface in enumerate(interfaces):
+                col_x = iface_start_x + col_idx * iface_col_width
+                cells[(iface, target['host'])] = pygame.Rect(col_x, y, iface_col_width, row_h)
+        return cells
+
+    def _render_matrix(self, surface, rect, targets, interfaces, levels, styles, fonts):
+        """Draw the target x interface matrix into `rect`."""
         if not targets:
             # No ping targets configured
-            msg = fonts['content'].render("Keine Ping-Ziele konfiguriert", True, styles.MUTED_TEXT)
+            msg = styles.render_text(fonts['content'], "Keine Ping-Ziele konfiguriert", styles.MUTED_TEXT)
             surface.blit(msg, msg.get_rect(center=(rect.centerx, rect.centery)))
             return
         
@@ -166,7 +389,7 @@ class TabPing:
         
         # Header row: "Ziel" + interface names
         hdr_y = header_y + 6
-        hdr_target = table_font.render('Ziel', True, styles.TEXT_COLOR)
+        hdr_target = styles.render_text(table_font, 'Ziel', styles.TEXT_COLOR)
         surface.blit(hdr_target, (name_x, hdr_y))
         
         # Interface column headers (abbreviated)
@@ -182,45 +405,32 @@ class TabPing:
                 iface_abbr = iface[:4]
             
             col_x = iface_start_x + i * iface_col_width
-            hdr_if = table_font.render(iface_abbr, True, styles.TEXT_COLOR)
+            hdr_if = styles.render_text(table_font, iface_abbr, styles.TEXT_COLOR)
             surface.blit(hdr_if, (col_x, hdr_y))
         
         # Data rows
+        cells = self._cell_rects(rect, targets, interfaces, row_h)
+        colors = {'ok': styles.OK_COLOR, 'warn': styles.WARN_COLOR, 'fail': styles.ERROR_COLOR}
         start_y = rect.top + 50
         for row_idx, target in enumerate(targets):
             y = start_y + row_idx * row_h
             
             # Target name
-            name_s = table_font.render(target['name'], True, styles.TEXT_COLOR)
+            name_s = styles.render_text(table_font, target['name'], styles.TEXT_COLOR)
             surface.blit(name_s, (name_x, y))
             
             # Ping results for each interface
-            for col_idx, iface in enumerate(interfaces):
-                col_x = iface_start_x + col_idx * iface_col_width
+            for iface in interfaces:
                 key = (iface, target['host'])
-                reachable = results.get(key, False)
+                cell = cells[key]
                 
                 # Draw indicator dot
-                dot_x = col_x + 15
-                dot_y = y + row_h // 2
+                dot_x = cell.left + 15
+                dot_y = cell.centery
                 radius = row_h // 4
-                
-                if reachable:
-                    color = styles.OK_COLOR
-                else:
-                    color = styles.ERROR_COLOR
+                color = colors[levels.get(key, 'fail')]
                 
                 try:
                     pygame.draw.circle(surface, color, (dot_x, dot_y), radius)
                 except Exception:
                     pass
-        
-        # Show last update time
-        if last_update:
-            elapsed = time.time() - last_update
-            if elapsed < 3:
-                # Show toast for 3 seconds after update (IP-style)
-                try:
-                    styles.draw_toast(surface, rect, fonts, "Aktualisiert")
-                except Exception:
-                    pass
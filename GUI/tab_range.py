@@ -1,180 +1,230 @@
+import logging
+import math
 import os
-import re
-import subprocess
 import threading
 import time
 try:
     import pygame
 except Exception:
     pygame = None
-try:
-    import yaml
-except Exception:
-    yaml = None
+
+from GUI.layer import ContentLayer
+from tagtapperpi_comp.config import get_config_store
+from tagtapperpi_comp.session_reporter import report_dir
+from tagtapperpi_comp.walk_test import WalkTest
+from tagtapperpi_comp.wifi_scan import WifiScanner, dbm_to_percent
+from tagtapperpi_comp.wireless import get_ssid
 
 
 class TabRange:
-    def __init__(self):
+    def __init__(self, autostart=True, config=None):
         self._lock = threading.Lock()
         self.signal_strengths = {}  # {ssid: signal_percent}
         self.connected_ssid = None
         self.last_update = None
         self.interface = 'wlan0'
-        self.update_interval = 5
+        self.update_interval = 5  # seconds between scans
+        self.poll_interval = 0.5  # seconds between checks whether a scan finished
         self.target_ssids = []
+        # Triggers scans in the background and reads the kernel's scan cache
+        self.scanner = WifiScanner(self.interface)
+        # High-rate signal sampling of the connected link, toggled by a button
+        self.walk_test = WalkTest(self.interface)
+        self.button_rect = None
+        # Last drawn bar state, used to report damage to the app
+        self.drawn_state = None
+        # Off-screen copy of the rendered bars
+        self.layer = ContentLayer()
+        # Bumped on every scan or config change (change-driven rendering)
+        self.version = 0
         
-        # Load initial config
-        self.refresh_config()
-        
-        # Start scanning thread
         self.stop_event = threading.Event()
         self.is_active = False  # Only scan when tab is visible
-        t = threading.Thread(target=self._scan_loop, daemon=True)
-        t.start()
+        # Shared config store (scanner settings)
+        self.config = config
+        # autostart=False skips config loading and scanning (e.g. for benchmarks)
+        if autostart:
+            if self.config is None:
+                self.config = get_config_store()
+            # Load initial config and follow edits
+            self.refresh_config()
+            self.config.subscribe(lambda snapshot: self.refresh_config())
+
+            # Start scanning thread
+            t = threading.Thread(target=self._scan_loop, daemon=True)
+            t.start()
     
     def set_active(self, active):
         """Called when tab becomes visible/hidden."""
         self.is_active = active
     
     def refresh_config(self):
-        """Load scanning config from config.yaml."""
-        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        cfg_path = os.path.join(repo, 'config.yaml')
-        
-        if not yaml:
+        """Apply scanning settings from the config snapshot."""
+        if self.config is None:
             return
-        
-        try:
-            with open(cfg_path, 'r') as f:
-                cfg = yaml.safe_load(f) or {}
-            
-            scanner_cfg = cfg.get('range_scanner', {})
-            self.interface = scanner_cfg.get('interface', 'wlan0')
-            self.update_interval = scanner_cfg.get('update_interval', 5)
-            
-            # Get target SSIDs
-            ssids = []
-            for s in scanner_cfg.get('ssid', []):
-                name = s.get('name')
-                if name:
-                    ssids.append(name)
-            
-            with self._lock:
-                self.target_ssids = ssids
-        
-        except Exception:
-            pass
+        scanner_cfg = self.config.snapshot().range_scanner
+        self.interface = scanner_cfg.interface
+        self.scanner.interface = scanner_cfg.interface
+        if not self.walk_test.running:
+            self.walk_test.interface = scanner_cfg.interface
+        self.update_interval = scanner_cfg.update_interval
+        ssids = list(scanner_cfg.ssids)
+
+        with self._lock:
+            if ssids != self.target_ssids:
+                self.version += 1
+            self.target_ssids = ssids
     
     def _scan_loop(self):
-        """Background thread that periodically scans for WiFi networks."""
+        """Background thread that triggers scans and follows the cached results."""
+        next_scan = 0
+        next_dump = 0
+        was_scanning = False
         while not self.stop_event.is_set():
-            # Only scan when tab is active to save resources
-            if self.is_active:
-                self.refresh_config()
-                signals = {}
-                
-                # Get currently connected SSID
+            # Only scan when tab is active to save resources; scans would
+            # also disturb the association a walk test is measuring
+            if self.is_active and not self.walk_test.running:
+                now = time.monotonic()
+                # Never overlaps: the scanner refuses while its last scan still runs
+                if now >= next_scan and self.scanner.trigger(now):
+                    next_scan = now + self.update_interval
+                scanning = self.scanner.scanning()
+
+                # Read the cached results when a scan finished, otherwise (e.g. when
+                # the tab becomes visible) at most once per update_interval; stale
+                # ones stay on screen while a scan runs
+                networks = None
+                if (was_scanning and not scanning) or (not scanning and now >= next_dump):
+                    networks = self.scanner.results()
+                    next_dump = now + self.update_interval
                 connected = self._get_connected_ssid()
-                
-                # Scan for networks
-                networks = self._scan_networks()
-                
-                # Extract signal strength for target SSIDs
-                for ssid in self.target_ssids:
-                    if ssid in networks:
-                        signals[ssid] = networks[ssid]
-                    else:
-                        signals[ssid] = 0  # Not visible
-                
-                # Update cache
+
                 with self._lock:
-                    self.signal_strengths = signals
-                    self.connected_ssid = connected
-                    self.last_update = time.time()
-            
-            # Wait for next update cycle
-            self.stop_event.wait(self.update_interval)
+                    signals = self.signal_strengths
+                    if networks is not None:
+                        # Extract signal strength for target SSIDs (0 = not visible)
+                        signals = {ssid: networks.get(ssid, 0) for ssid in self.target_ssids}
+                    if (signals, connected) != (self.signal_strengths, self.connected_ssid):
+                        self.signal_strengths = signals
+                        self.connected_ssid = connected
+                        self.version += 1
+                    if was_scanning and not scanning:
+                        self.last_update = time.time()
+                        self.version += 1
+                was_scanning = scanning
+
+            self.stop_event.wait(self.poll_interval)
     
     def _get_connected_ssid(self):
         """Get the SSID of currently connected network."""
-        try:
-            out = subprocess.check_output(['iwgetid', self.interface, '-r'],
-                                        stderr=subprocess.DEVNULL).decode('utf-8').strip()
-            return out if out else None
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return None
+        return get_ssid(self.interface)
     
-    def _scan_networks(self):
-        """Scan for WiFi networks and return {ssid: signal_percent}."""
-        networks = {}
-        
-        try:
-            # Use iwlist scan to get network information
-            out = subprocess.check_output(['sudo', 'iwlist', self.interface, 'scan'],
-                                        stderr=subprocess.DEVNULL,
-                                        timeout=10).decode('utf-8')
-            
-            # Parse iwlist output
-            current_ssid = None
-            current_quality = None
-            
-            for line in out.splitlines():
-                line = line.strip()
-                
-                # Extract SSID
-                if 'ESSID:' in line:
-                    match = re.search(r'ESSID:"([^"]+)"', line)
-                    if match:
-                        current_ssid = match.group(1)
-                
-                # Extract signal quality
-                elif 'Quality=' in line:
-                    # Format: Quality=70/100  Signal level=-40 dBm
-                    match = re.search(r'Quality=(\d+)/(\d+)', line)
-                    if match:
-                        quality = int(match.group(1))
-                        max_quality = int(match.group(2))
-                        current_quality = int((quality / max_quality) * 100)
-                    else:
-                        # Alternative: parse signal level in dBm
-                        match = re.search(r'Signal level[=:](-?\d+)', line)
-                        if match:
-                            signal_dbm = int(match.group(1))
-                            current_quality = self._dbm_to_percent(signal_dbm)
-                
-                # Store when we have both SSID and quality
-                if current_ssid and current_quality is not None:
-                    networks[current_ssid] = current_quality
-                    current_ssid = None
-                    current_quality = None
-        
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-        
-        return networks
-    
-    def _dbm_to_percent(self, dbm):
-        """Convert dBm signal strength to percentage (0-100)."""
-        # Typical WiFi signal range: -90 dBm (weak) to -30 dBm (strong)
-        if dbm >= -30:
-            return 100
-        elif dbm <= -90:
-            return 0
+    def toggle_walk_test(self):
+        """Start or stop the walk test; a new session file goes to the report directory."""
+        if self.walk_test.running:
+            path = self.walk_test.stop()
+            logging.info(f"Walk test stopped: {path}")
         else:
-            # Linear interpolation
-            return int(((dbm + 90) / 60) * 100)
-    
+            directory = report_dir(self.config.snapshot()) if self.config else '.'
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except Exception:
+                pass
+            path = os.path.join(directory, time.strftime("walktest-%Y%m%d-%H%M%S.csv"))
+            self.walk_test.start(path)
+            logging.info(f"Walk test started: {path}")
+        with self._lock:
+            self.version += 1
+
+    def handle_tap(self, x, y):
+        """Toggle the walk test when its button was tapped. Returns True if it was."""
+        if self.button_rect is not None and self.button_rect.collidepoint(x, y):
+            self.toggle_walk_test()
+            return True
+        return False
+
     def draw(self, surface, rect, app, styles, fonts):
-        """Draw WiFi signal strength bars."""
+        """Draw WiFi signal strength bars (sparklines during a walk test)."""
         with self._lock:
             signals = dict(self.signal_strengths)
             connected = self.connected_ssid
             ssids = list(self.target_ssids)
             last_update = self.last_update
-        
-        if not ssids:
+
+        walking = self.walk_test.running
+        sparks = None
+        if walking:
+            live_ssid, live_dbm = self.walk_test.latest()
+            connected = live_ssid
+            sparks = {ssid: self.walk_test.series(ssid) for ssid in ssids}
+            # Live bars follow the samples, not the (paused) scans
+            if live_ssid in ssids and live_dbm is not None:
+                signals[live_ssid] = dbm_to_percent(live_dbm)
+            app.schedule_redraw(time.time() + 1.0 / self.walk_test.rate)
+
+        # The bars are re-rendered only when the snapshot or rect changes
+        bars = tuple((ssid, signals.get(ssid, 0)) for ssid in ssids)
+        snapshot = (bars, connected, self.walk_test.version if walking else None)
+        self.layer.draw(surface, rect, snapshot,
+                        lambda layer, r: self._render_bars(layer, r, bars, connected, styles, fonts, sparks),
+                        styles.BG_COLOR)
+        self._draw_button(surface, rect, styles, fonts, walking)
+
+        show_toast = not walking and bool(last_update) and time.time() - last_update < 3
+        state = (tuple(rect), snapshot, show_toast)
+        if state != self.drawn_state:
+            self.drawn_state = state
+            app.mark_dirty(rect)
+
+        # Show toast for 3 seconds after scan (IP-style)
+        if show_toast:
+            app.schedule_redraw(last_update + 3)
+            try:
+                styles.draw_toast(surface, rect, fonts, "Gescannt")
+            except Exception:
+                pass
+
+    def _draw_button(self, surface, rect, styles, fonts, walking):
+        """Walk-test toggle in the bottom right corner of `rect`."""
+        font = fonts.get('header', fonts['content'])
+        label = styles.render_text(font, "Stopp" if walking else "Walk-Test", styles.TEXT_COLOR)
+        pad = 8
+        self.button_rect = pygame.Rect(0, 0, label.get_width() + 2 * pad, label.get_height() + 2 * pad)
+        self.button_rect.bottomright = (rect.right - 6, rect.bottom - 6)
+        try:
+            pygame.draw.rect(surface, styles.ERROR_COLOR if walking else styles.TAB_BG, self.button_rect)
+        except Exception:
+            pass
+        surface.blit(label, (self.button_rect.left + pad, self.button_rect.top + pad))
+
+    @staticmethod
+    def _draw_sparkline(surface, area, series, color, slots):
+        """Plot dBm samples (-90..-30, NaN = gap) across `area`, `slots` wide, newest at the right."""
+        if series is None or len(series) < 2:
+            return
+        step = area.width / (slots - 1)
+        offset = slots - len(series)
+        segment = []
+        for i, dbm in enumerate(series, offset):
+            if math.isnan(dbm):
+                if len(segment) > 1:
+                    pygame.draw.lines(surface, color, False, segment, 2)
+                segment = []
+                continue
+            frac = dbm_to_percent(dbm) / 100.0
+            segment.append((area.left + i * step, area.bottom - 1 - frac * (area.height - 2)))
+        if len(segment) > 1:
+            pygame.draw.lines(surface, color, False, segment, 2)
+
+    def _render_bars(self, surface, rect, bars, connected, styles, fonts, sparks=None):
+        """Draw one signal bar per (ssid, signal) entry into `rect`.
+
+        With `sparks` ({ssid: dBm samples}) each bar gets the walk test's
+        sparkline drawn over it.
+        """
+        if not bars:
             # No SSIDs configured
-            msg = fonts['content'].render("Keine SSIDs konfiguriert", True, styles.MUTED_TEXT)
+            msg = styles.render_text(fonts['content'], "Keine SSIDs konfiguriert", styles.MUTED_TEXT)
             surface.blit(msg, msg.get_rect(center=(rect.centerx, rect.centery)))
             return
         
@@ -190,9 +240,8 @@ class TabRange:
         start_y = rect.top + 30
         
         # Draw each SSID with signal bar
-        for i, ssid in enumerate(ssids):
+        for i, (ssid, signal) in enumerate(bars):
             y = start_y + i * bar_spacing
-            signal = signals.get(ssid, 0)
             is_connected = (ssid == connected)
             
             # Draw SSID name with connection indicator
@@ -201,7 +250,7 @@ class TabRange:
                 ssid_display = f"* {ssid}"
             
             ssid_color = styles.TEXT_ACTIVE if is_connected else styles.TEXT_COLOR
-            ssid_s = ssid_font.render(ssid_display, True, ssid_color)
+            ssid_s = styles.render_text(ssid_font, ssid_display, ssid_color)
             surface.blit(ssid_s, (start_x, y))
             
             # Draw signal strength bar
@@ -229,22 +278,15 @@ class TabRange:
 
             try:
                 pygame.draw.rect(surface, bar_color, bar_fill_rect)
+                if sparks is not None:
+                    self._draw_sparkline(surface, bar_bg_rect, sparks.get(ssid), styles.TEXT_COLOR,
+                                         self.walk_test.capacity)
             except Exception:
                 pass
             
             # Draw signal percentage text on bar
             percent_text = f"{signal}%"
-            percent_s = label_font.render(percent_text, True, styles.TEXT_COLOR)
+            percent_s = styles.render_text(label_font, percent_text, styles.TEXT_COLOR)
             percent_x = start_x + bar_width + 10
             percent_y = bar_y + (bar_height - label_font.get_height()) // 2
             surface.blit(percent_s, (percent_x, percent_y))
-        
-        # Show last update time
-        if last_update:
-            elapsed = time.time() - last_update
-            if elapsed < 3:
-                # Show toast for 3 seconds after scan (IP-style)
-                try:
-                    styles.draw_toast(surface, rect, fonts, "Gescannt")
-                except Exception:
-                    pass
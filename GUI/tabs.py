@@ -8,6 +8,8 @@ class Tabs:
         self.indicator_radius = 8
         self.indicator_spacing = 24
         self.indicator_margin = 30
+        # Last rendered header text, used to report header damage
+        self.drawn_header = None
 
     def render(self, surface, app, styles, fonts):
         """Render header (title) and indicators. Returns a content_rect for tabs to draw into.
@@ -15,37 +17,38 @@ class Tabs:
         w, h = app.width, app.height
         # Header (app bar) with no background; only text elements
 
-        # Title centered
-        try:
-            fonts['tab_title'].set_bold(True)
-        except Exception:
-            pass
+        # Title centered (bold variant is cached, no per-frame set_bold toggling)
         label = app.TABS[app.active_tab]['label']
-        tab_label = fonts['tab_title'].render(label, True, styles.TEXT_ACTIVE)
+        tab_label = styles.render_text(fonts['tab_title'], label, styles.TEXT_ACTIVE, bold=True)
         tab_label_rect = tab_label.get_rect(center=(w // 2, self.header_height // 2))
         surface.blit(tab_label, tab_label_rect)
-        try:
-            fonts['tab_title'].set_bold(False)
-        except Exception:
-            pass
 
         # Left app name
-        title = fonts['header'].render('Tag Tapper Pi', True, styles.MUTED_TEXT)
+        title = styles.render_text(fonts['header'], 'Tag Tapper Pi', styles.MUTED_TEXT)
         surface.blit(title, (10, (self.header_height - title.get_height()) // 2))
 
         # Date/time right
+        time_str = None
         try:
             import datetime
             now = datetime.datetime.now()
             time_str = now.strftime('%d.%m.%Y %H:%M')
-            time_text = fonts['header'].render(time_str, True, styles.MUTED_TEXT)
+            time_text = styles.render_text(fonts['header'], time_str, styles.MUTED_TEXT)
             surface.blit(time_text, (w - time_text.get_width() - 10, (self.header_height - time_text.get_height()) // 2))
+            # Redraw when the minute rolls over
+            next_minute = now.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+            app.schedule_redraw(next_minute.timestamp())
         except Exception:
             pass
 
+        # Header only needs pushing when the title or the clock text changed
+        header = (label, time_str)
+        if header != self.drawn_header:
+            self.drawn_header = header
+            app.mark_dirty(pygame.Rect(0, 0, w, self.header_height))
+
         # Indicators at bottom
-        total_width = len(app.TABS) * self.indicator_spacing
-        start_x = (w - total_width) // 2 + self.indicator_radius
+        start_x = self._indicator_start_x(app)
         indicator_y = h - self.indicator_margin
         for i in range(len(app.TABS)):
             x = start_x + i * self.indicator_spacing
@@ -59,4 +62,21 @@ class Tabs:
         content_bottom = indicator_y - (self.indicator_radius * 2) - 12
         return pygame.Rect(0, content_top, w, max(0, content_bottom - content_top))
 
+    def _indicator_start_x(self, app):
+        total_width = len(app.TABS) * self.indicator_spacing
+        return (app.width - total_width) // 2 + self.indicator_radius
 
+    def indicator_at(self, app, x, y):
+        """Index of the indicator dot at screen position (x, y), or None.
+
+        Each dot owns the full spacing around it and the strip below the
+        content area, so the hit target is larger than the drawn circle.
+        """
+        indicator_y = app.height - self.indicator_margin
+        if y < indicator_y - self.indicator_radius * 2 - 8:
+            return None
+        offset = x - self._indicator_start_x(app) + self.indicator_spacing // 2
+        if offset < 0:
+            return None
+        index = offset // self.indicator_spacing
+        return index if index < len(app.TABS) else None
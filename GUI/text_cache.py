@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+
+class TextCache:
+    """Size-bounded LRU cache of rendered text surfaces.
+
+    Entries are keyed by (font, text, color, bold, antialias) and evicted
+    least-recently-used first once their pixel memory exceeds `max_bytes`.
+    Returned surfaces are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def render(self, font, text, color, bold=False, antialias=True):
+        key = (font, text, tuple(color), bold, antialias)
+        surf = self._entries.get(key)
+        if surf is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        if bold:
+            was_bold = font.get_bold()
+            font.set_bold(True)
+            try:
+                surf = font.render(text, antialias, color)
+            finally:
+                font.set_bold(was_bold)
+        else:
+            surf = font.render(text, antialias, color)
+
+        self._entries[key] = surf
+        self.size_bytes += self._surface_bytes(surf)
+        while self.size_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.size_bytes -= self._surface_bytes(old)
+        return surf
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+    @staticmethod
+    def _surface_bytes(surf):
+        return surf.get_pitch() * surf.get_height()
+
+
+# Shared cache used by all tabs (rendering happens on the main thread only)
+TEXT_CACHE = TextCache()
+
+
+def render_text(font, text, color, bold=False, antialias=True):
+    """Render `text` through the shared cache; see `TextCache.render`."""
+    return TEXT_CACHE.render(font, text, color, bold=bold, antialias=antialias)
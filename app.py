@@ -3,14 +3,16 @@ import os
 import sys
 import time
 import threading
-import queue
-import mmap
-import struct
-import yaml
-import numpy as np
-from collections import deque
+import signal
 from GUI import styles
 from GUI import tabs as tabs_module
+from GUI import gestures
+from GUI.text_cache import TEXT_CACHE
+from tagtapperpi_comp.config import get_config_store
+from tagtapperpi_comp.framebuffer import FramebufferWriter, FramebufferPresenter
+from tagtapperpi_comp.frame_stats import FrameStats
+from tagtapperpi_comp.storage import BufferedLogHandler, get_write_behind
+from tagtapperpi_comp import logpipe
 import subprocess
 
 try:
@@ -24,117 +26,65 @@ except Exception as e:
 TOUCH_PATH = "/dev/input/by-path/platform-3f204000.spi-cs-1-event"
 LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tag-tapper-pi.log")
 
-# Configure logging to file only
-try:
-    logdir = os.path.dirname(LOG_PATH)
-    if logdir and not os.path.exists(logdir):
-        os.makedirs(logdir, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_PATH,
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    )
-except PermissionError:
-    logging.basicConfig(stream=sys.stderr, level=logging.INFO, format='%(asctime)s - %(message)s')
-
-
-def get_fb_size(fbdev='/dev/fb1'):
-    """Get framebuffer size from sysfs."""
-    try:
-        base = '/sys/class/graphics/' + os.path.basename(fbdev)
-        vs = os.path.join(base, 'virtual_size')
-        if os.path.exists(vs):
-            with open(vs, 'r') as f:
-                s = f.read().strip()
-            w, h = s.split(',') if ',' in s else s.split('x')
-            return int(w), int(h)
-        modes = os.path.join(base, 'modes')
-        if os.path.exists(modes):
-            with open(modes, 'r') as f:
-                line = f.readline().strip()
-            if line and 'x' in line:
-                w, h = line.split('x')[:2]
-                return int(w), int(h)
-    except Exception as e:
-        logging.info(f"Couldn't read fb size: {e}")
-    return 800, 480
-
-
-class FramebufferWriter:
-    """Minimal direct framebuffer writer for 16bpp (RGB565) devices."""
-    def __init__(self, fbdev='/dev/fb1'):
-        self.fbdev = fbdev
-        self.width, self.height = get_fb_size(fbdev)
-        self.bpp = 16
-        self.line_length = self.width * (self.bpp // 8)
-        self.fb = open(self.fbdev, 'r+b', buffering=0)
-        self.size_bytes = self.line_length * self.height
-        self.mm = mmap.mmap(self.fb.fileno(), self.size_bytes, access=mmap.ACCESS_WRITE)
-        logging.info(f"Opened framebuffer {self.fbdev} for direct writing")
-        logging.info(f"Framebuffer BPP: {self.bpp}")
-
-    def close(self):
-        try:
-            if self.mm:
-                self.mm.flush()
-                self.mm.close()
-        finally:
-            try:
-                self.fb.close()
-            except Exception:
-                pass
-
-    def blit_surface(self, surface):
-        """Copy a pygame Surface to the framebuffer as RGB565.
-
-        Assumes surface size matches framebuffer size.
-        """
-        if surface.get_width() != self.width or surface.get_height() != self.height:
-            # Scale to framebuffer size if needed
-            surface = pygame.transform.smoothscale(surface, (self.width, self.height))
-
-        # Get RGB bytes (24bpp, row-major)
-        rgb_bytes = pygame.image.tostring(surface, 'RGB')
-        # Convert to RGB565 (little-endian) using NumPy - vectorized, 10-50x faster
-        rgb = np.frombuffer(rgb_bytes, dtype=np.uint8).reshape(self.height, self.width, 3)
-        # Extract channels
-        r = rgb[:, :, 0].astype(np.uint16)
-        g = rgb[:, :, 1].astype(np.uint16)
-        b = rgb[:, :, 2].astype(np.uint16)
-        # Combine to RGB565: RRRRR GGGGGG BBBBB
-        rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
-        # Convert to little-endian bytes
-        rgb565_le = rgb565.astype('<u2')
-        
-        # Write to framebuffer mmap
-        self.mm.seek(0)
-        self.mm.write(rgb565_le.tobytes())
-        # No need to flush every frame; keep performance reasonable
+LOG_MAX_BYTES = 1024 * 1024  # rotated into tag-tapper-pi.log.1.gz ... .3.gz
+LOG_BACKUPS = 3
+LOG_RING_SIZE = 5000  # records kept in RAM for `kill -USR2` dumps
 
+def configure_logging():
+    """Log to file only: records go through a queue to a listener thread (see
+    logpipe), the file is buffered in RAM and written in batches.
 
-def load_touch_calibration(config_file="/home/dietpi/tag-tapper-pi/config.yaml"):
-    """Load calibration values (raw min/max) from YAML config.
+    Does nothing if logging is already configured, e.g. by a script that
+    imports this module (the log file is then not created at all).
+    """
+    if logging.getLogger().handlers:
+        return
+    try:
+        logdir = os.path.dirname(LOG_PATH)
+        if logdir and not os.path.exists(logdir):
+            os.makedirs(logdir, exist_ok=True)
+        # Fail early (and fall back to stderr) if the log file is not writable
+        open(LOG_PATH, 'a').close()
+        handler = BufferedLogHandler(LOG_PATH, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS)
+    except PermissionError:
+        handler = logging.StreamHandler(sys.stderr)
+    logpipe.setup_logging(handler, level=logging.INFO, ring_size=LOG_RING_SIZE)
+
+
+def load_touch_calibration(snapshot=None):
+    """Return calibration values (raw min/max) from the config snapshot.
     Falls back to defaults if not present.
     """
+    snapshot = snapshot or get_config_store().snapshot()
+    if not snapshot.has_touch_calibration:
+        logging.info("No touch calibration found, using defaults")
+    calib = snapshot.touch_calibration
+    return {key: calib[key] for key in ('raw_x_min', 'raw_x_max', 'raw_y_min', 'raw_y_max')}
+
+
+def apply_log_level(snapshot=None):
+    """Set the root logger level from `log_level` in the config."""
+    snapshot = snapshot or get_config_store().snapshot()
+    logging.getLogger().setLevel(snapshot.log_level)
+
+
+def dump_log_ring():
+    """Write the in-RAM log history next to the log file (runs off the main thread)."""
+    pipeline = logpipe.get_pipeline()
+    if pipeline is None:
+        return
+    path = os.path.join(os.path.dirname(LOG_PATH),
+                        time.strftime("tag-tapper-pi-ring-%Y%m%d-%H%M%S.log"))
     try:
-        with open(config_file, 'r') as f:
-            config = yaml.safe_load(f) or {}
-            calib = config.get('touch_calibration')
-            if calib:
-                return {
-                    'raw_x_min': int(calib.get('raw_x_min', 0)),
-                    'raw_x_max': int(calib.get('raw_x_max', 4095)),
-                    'raw_y_min': int(calib.get('raw_y_min', 0)),
-                    'raw_y_max': int(calib.get('raw_y_max', 4095)),
-                }
+        pipeline.dump_ring(path)
     except Exception as e:
-        logging.info(f"No touch calibration found: {e}")
-    return {
-        'raw_x_min': 0,
-        'raw_x_max': 4095,
-        'raw_y_min': 0,
-        'raw_y_max': 4095,
-    }
+        logging.error(f"Log ring dump failed: {e}")
+
+
+def load_debug_overlay(snapshot=None):
+    """Return True if `debug_overlay: true` is set in the config."""
+    snapshot = snapshot or get_config_store().snapshot()
+    return snapshot.debug_overlay
 
 
 def map_raw_to_screen(x, y, size, calib):
@@ -178,6 +128,9 @@ def map_raw_to_screen(x, y, size, calib):
 
 class TagTapperApp:
     """Pygame-based TUI with tabs and touch support."""
+
+    FRAME_INTERVAL = 1.0 / 30  # seconds between frames while animating
+    IDLE_POLL = 0.25  # seconds between component version checks while idle
     
     TABS = [
         {"id": "ip", "label": "IP"},
@@ -189,7 +142,9 @@ class TagTapperApp:
     
     # Color constants were moved to GUI/styles.py
     
-    def __init__(self, size):
+    def __init__(self, size, components=None, session_reports=True):
+        """`components` replaces the per-tab components (e.g. fixtures in
+        benchmarks); `session_reports=False` skips the SessionReporter."""
         self.size = size
         self.width, self.height = size
         self.active_tab = 0
@@ -212,25 +167,29 @@ class TagTapperApp:
         self.content_font = self.fonts['content']
 
         # Components per tab (created lazily here)
-        try:
-            from GUI import tab_ip, tab_ping, tab_range, action
-            self.components = {
-                'ip': tab_ip.TabIP(),
-                'ping': tab_ping.TabPing(),
-                'range': tab_range.TabRange(),
-                'reboot': action.ActionTab('reboot'),
-                'shutdown': action.ActionTab('shutdown'),
-            }
-        except Exception:
-            self.components = {}
+        if components is not None:
+            self.components = components
+        else:
+            try:
+                from GUI import tab_ip, tab_ping, tab_range, action
+                self.components = {
+                    'ip': tab_ip.TabIP(),
+                    'ping': tab_ping.TabPing(),
+                    'range': tab_range.TabRange(),
+                    'reboot': action.ActionTab('reboot'),
+                    'shutdown': action.ActionTab('shutdown'),
+                }
+            except Exception:
+                self.components = {}
 
         # Session reporter: monitors eth0 UP/DOWN and writes reports
         try:
             from tagtapperpi_comp.session_reporter import SessionReporter
             ip_comp = self.components.get('ip')
             ping_comp = self.components.get('ping')
-            if ip_comp and ping_comp:
-                self.session_reporter = SessionReporter(ip_comp, ping_comp)
+            if session_reports and ip_comp and ping_comp:
+                self.session_reporter = SessionReporter(ip_comp, ping_comp,
+                                                        netstate=getattr(ip_comp, 'netstate', None))
                 self.session_reporter.start()
             else:
                 self.session_reporter = None
@@ -243,8 +202,13 @@ class TagTapperApp:
         except Exception:
             self.tabs = None
 
-        # Position smoothing buffer for touch POS events
-        self.pos_buffer = deque(maxlen=4)
+        # Touch gestures: swipes change tabs, the indicator dots switch on press
+        self.gestures = gestures.GestureRecognizer()
+        self.gestures.subscribe(self.handle_gesture)
+        if self.tabs is not None:
+            self.gestures.subscribe(self._tap_indicator, commit_on_press=True,
+                                    hit=lambda x, y: self.tabs.indicator_at(self, x, y) is not None)
+
         # Long-press (hold) control for destructive actions
         self.long_press_start_time = None
         self.long_press_target = None
@@ -257,17 +221,160 @@ class TagTapperApp:
         self.exec_after_anim = None
         self.anim_start = None
         self.anim_duration = 1.0  # seconds for pre-exec animation
-        
-        
-    
-    
+        # Damage tracking: screen regions that changed since the last framebuffer push
+        self.dirty_rects = []
+        self.full_damage = True
+        self.drawn_tab = None
+        # Change-driven rendering: next time a redraw is due and the
+        # (tab, component version) pair shown by the last frame
+        self.redraw_at = 0.0
+        self.drawn_version = None
+        # Per-frame phase timings; the overlay shows a summary on screen
+        self.stats = FrameStats(
+            ['touch', 'longpress', 'tabs']
+            + [f"draw:{tab['id']}" for tab in self.TABS]
+            + ['present', 'convert', 'write'],
+            async_phases=('convert', 'write'),
+        )
+        self.show_overlay = False
+        # Screen area of the last drawn overlay, repainted once it is switched off
+        self.overlay_rect = None
+
+    def handle_tap(self, x, y):
+        """Offer a tap at screen position (x, y) to the active tab's component.
+
+        Components may implement `handle_tap(x, y)` and return True when the
+        tap hit one of their elements; the release then does not change tabs.
+        """
+        if x is None or y is None:
+            return False
+        comp = self.components.get(self.TABS[self.active_tab]['id'])
+        handler = getattr(comp, 'handle_tap', None)
+        if handler is None:
+            return False
+        try:
+            return bool(handler(x, y))
+        except Exception as e:
+            logging.error(f"handle_tap failed: {e}")
+            return False
+
+    def switch_tab(self, index):
+        """Show tab `index` and tell the Range tab about visibility changes."""
+        old_tab, self.active_tab = self.active_tab, index % len(self.TABS)
+        if old_tab == self.active_tab:
+            return
+        try:
+            if self.TABS[old_tab]['id'] == 'range':
+                self.components['range'].set_active(False)
+            if self.TABS[self.active_tab]['id'] == 'range':
+                self.components['range'].set_active(True)
+        except Exception:
+            pass
+        self.invalidate()
+        logging.debug("Switched to tab %s", self.TABS[self.active_tab]['label'])
+
+    def handle_gesture(self, gesture):
+        """Default gesture handling, after the active tab's component had its turn.
+
+        Components may implement `handle_gesture(gesture)` and return True to
+        consume it. Taps go to `handle_tap()` and otherwise advance to the
+        next tab; swipes move to the neighbouring tab.
+        """
+        comp = self.components.get(self.TABS[self.active_tab]['id'])
+        handler = getattr(comp, 'handle_gesture', None)
+        if handler is not None:
+            try:
+                if handler(gesture):
+                    self.invalidate()
+                    return True
+            except Exception as e:
+                logging.error(f"handle_gesture failed: {e}")
+        if gesture.kind == gestures.TAP:
+            if not self.handle_tap(gesture.x, gesture.y):
+                self.switch_tab(self.active_tab + 1)
+        elif gesture.kind == gestures.SWIPE_LEFT:
+            self.switch_tab(self.active_tab + 1)
+        elif gesture.kind == gestures.SWIPE_RIGHT:
+            self.switch_tab(self.active_tab - 1)
+        else:
+            return False
+        return True
+
+    def _tap_indicator(self, gesture):
+        index = self.tabs.indicator_at(self, gesture.x, gesture.y)
+        if index is None:
+            return False
+        self.switch_tab(index)
+        return True
+
+    def invalidate(self):
+        """Request a redraw on the next main-loop iteration."""
+        self.redraw_at = 0.0
+
+    def schedule_redraw(self, when):
+        """Request a redraw no later than the timestamp `when`."""
+        self.redraw_at = min(self.redraw_at, when)
+
+    def visible_version(self):
+        """Return the data version of what the active tab would draw now."""
+        comp = self.components.get(self.TABS[self.active_tab]['id'])
+        return (self.active_tab, getattr(comp, 'version', 0))
+
+    def needs_redraw(self):
+        """True if a redraw was requested/scheduled or visible data changed."""
+        return time.time() >= self.redraw_at or self.visible_version() != self.drawn_version
+
+    def idle_timeout(self):
+        """Seconds the main loop may sleep before the next redraw check."""
+        return max(0.0, min(self.IDLE_POLL, self.redraw_at - time.time()))
+
+    def mark_dirty(self, rect=None):
+        """Report a changed screen region. None marks the whole screen dirty."""
+        if rect is None:
+            self.full_damage = True
+        else:
+            self.dirty_rects.append(pygame.Rect(rect))
+
+    def pop_dirty_rects(self):
+        """Return the regions to push since the last call and reset tracking.
+
+        Returns None for a full-frame update and an empty list if nothing changed.
+        """
+        rects = self.dirty_rects
+        full = self.full_damage
+        self.dirty_rects = []
+        self.full_damage = False
+        if full:
+            return None
+        # Merge overlapping rects so shared pixels are converted only once
+        merged = []
+        for rect in rects:
+            for i, other in enumerate(merged):
+                if other.colliderect(rect):
+                    merged[i] = other.union(rect)
+                    break
+            else:
+                merged.append(rect)
+        area = sum(r.width * r.height for r in merged)
+        if area >= self.width * self.height // 2:
+            return None
+        return merged
+
     def draw(self, surface):
         """Draw the complete UI (header + content)."""
         surface.fill(styles.BG_COLOR)
+        # Components and the header re-schedule time-driven redraws while drawing
+        self.redraw_at = float('inf')
+        self.drawn_version = self.visible_version()
+        # Switching tabs changes every region of the screen
+        if self.drawn_tab != self.active_tab:
+            self.drawn_tab = self.active_tab
+            self.mark_dirty()
         # Render header and indicators via Tabs component -> get safe content rect
         if self.tabs is not None:
             try:
-                content_rect = self.tabs.render(surface, self, styles, self.fonts)
+                with self.stats.phase('tabs'):
+                    content_rect = self.tabs.render(surface, self, styles, self.fonts)
             except Exception:
                 content_rect = pygame.Rect(0, self.header_height, self.width, self.height - self.header_height)
         else:
@@ -284,19 +391,47 @@ class TagTapperApp:
         comp = self.components.get(tab['id']) if hasattr(self, 'components') else None
         if comp:
             try:
-                comp.draw(surface, content_rect, self, styles, self.fonts)
+                with self.stats.phase(f"draw:{tab['id']}"):
+                    comp.draw(surface, content_rect, self, styles, self.fonts)
             except Exception:
                 pass
         else:
-            title = self.title_font.render(tab['label'], True, styles.TEXT_ACTIVE)
+            title = styles.render_text(self.title_font, tab['label'], styles.TEXT_ACTIVE)
             surface.blit(title, title.get_rect(center=(self.width // 2, self.header_height + 60)))
 
         # If an execution animation is active, draw it on top
         if self.exec_after_anim is not None:
+            self.mark_dirty()
+            self.schedule_redraw(time.time() + self.FRAME_INTERVAL)
             try:
                 self.draw_animation(surface)
             except Exception:
                 pass
+
+        if self.show_overlay:
+            try:
+                self.draw_overlay(surface)
+            except Exception:
+                pass
+        elif self.overlay_rect is not None:
+            # Overlay switched off: push the content now drawn where it was
+            self.mark_dirty(self.overlay_rect)
+            self.overlay_rect = None
+
+    def draw_overlay(self, surface):
+        """Draw frame time percentiles and FPS in the top-left corner of the content."""
+        font = self.fonts['header']
+        lines = self.stats.format_lines()
+        line_h = font.get_height()
+        rect = pygame.Rect(4, self.header_height + 4, 230, line_h * len(lines) + 8)
+        surface.fill((20, 20, 20), rect)
+        self.overlay_rect = rect
+        for i, line in enumerate(lines):
+            txt = styles.render_text(font, line, styles.ACCENT_COLOR)
+            surface.blit(txt, (rect.left + 6, rect.top + 4 + i * line_h))
+        self.mark_dirty(rect)
+        # Refresh the numbers once per second
+        self.schedule_redraw(time.time() + 1.0)
     
     def draw_animation(self, surface):
         """Draw a short pre-execution animation (spinner + fade)."""
@@ -328,7 +463,7 @@ class TagTapperApp:
             pygame.draw.arc(surface, styles.ACCENT_COLOR, rect, start_angle, end_angle, thickness)
 
             # Text "Executing..."
-            txt = self.content_font.render("Executing…", True, styles.ACCENT_COLOR)
+            txt = styles.render_text(self.content_font, "Executing…", styles.ACCENT_COLOR)
             rtxt = txt.get_rect(center=(cx, cy + radius + 30))
             surface.blit(txt, rtxt)
         except Exception:
@@ -339,35 +474,78 @@ class TagTapperApp:
 
 def main():
     """Main application loop."""
+    configure_logging()
     # Force headless mode: do not attempt to use SDL/fbcon
-    size = get_fb_size('/dev/fb1')
     fbw = FramebufferWriter('/dev/fb1')
+    size = (fbw.width, fbw.height)
     try:
         pygame.font.init()
     except Exception:
         pass
-    screen = pygame.Surface(size)
+    # Draw straight into the framebuffer's RGB565 format (no per-frame conversion)
+    screen = fbw.create_surface()
+    # Conversion and mmap writes run on the presenter thread
+    presenter = FramebufferPresenter(fbw, screen)
+    presenter.start()
     
     # Create app
     app = TagTapperApp(size)
+    app.show_overlay = load_debug_overlay()
+    fbw.stats = app.stats
+
+    # SIGUSR1 dumps the frame timing summary to the log (handled in the loop)
+    def request_stats_dump(signum, frame):
+        app.stats.dump_requested = True
+    try:
+        signal.signal(signal.SIGUSR1, request_stats_dump)
+    except Exception:
+        pass
+
+    # SIGUSR2 writes the last LOG_RING_SIZE log records (all levels that are
+    # enabled, including rate-limited ones) to tag-tapper-pi-ring-*.log
+    def request_ring_dump(signum, frame):
+        threading.Thread(target=dump_log_ring, daemon=True).start()
+    try:
+        signal.signal(signal.SIGUSR2, request_ring_dump)
+    except Exception:
+        pass
+
+    # SIGTERM (systemctl stop, reboot) leaves through the cleanup below, so
+    # buffered log lines and reports are written before the process exits
+    def request_exit(signum, frame):
+        raise KeyboardInterrupt
+    try:
+        signal.signal(signal.SIGTERM, request_exit)
+    except Exception:
+        pass
     
+    apply_log_level()
+
     # Load touch calibration
     calib = load_touch_calibration()
     logging.info(f"Calibration: X={calib['raw_x_min']}-{calib['raw_x_max']} Y={calib['raw_y_min']}-{calib['raw_y_max']}")
 
+    # Apply config edits (e.g. a new calibration from calibrate_touch.py) while running
+    def on_config_change(snapshot):
+        calib.update(load_touch_calibration(snapshot))
+        app.show_overlay = load_debug_overlay(snapshot)
+        apply_log_level(snapshot)
+        app.invalidate()
+    get_config_store().subscribe(on_config_change)
+
     # Start touch monitoring thread (delegated to tagtapperpi_comp.touch)
-    touch_queue = queue.Queue()
     stop_event = threading.Event()
     t = None
+    touch_channel = None
     try:
         from tagtapperpi_comp import touch as touch_module
-        t = touch_module.start_touch_monitor(touch_queue, TOUCH_PATH, stop_event)
+        touch_channel = touch_module.TouchChannel()
+        t = touch_module.start_touch_monitor(touch_channel, TOUCH_PATH, stop_event)
     except Exception as e:
         logging.error(f"Failed to start touch monitor: {e}")
     
     logging.info('App started. Starting main loop...')
     
-    clock = pygame.time.Clock()
     running = True
     touched = False
     
@@ -375,18 +553,30 @@ def main():
         while running:
             # No pygame display or events in headless mode
             
-            # Process touch queue
+            touch_t0 = None
+            touch_s = 0.0
+            # Process touch events; sleep here until a touch arrives or a redraw is due
             try:
-                while True:
-                    ev = touch_queue.get_nowait()
-                    if not ev:
-                        continue
-                    
+                # Wake up for a pending long press too
+                wait = app.idle_timeout()
+                gesture_wait = app.gestures.timeout(time.monotonic())
+                if gesture_wait is not None:
+                    wait = min(wait, gesture_wait)
+                if touch_channel is not None:
+                    events = touch_channel.drain(wait)
+                else:
+                    events = []
+                    time.sleep(wait)
+                if events:
+                    touch_t0 = time.perf_counter()
+                for ev in events:
                     if ev[0] == 'BTN':
                         # Touch button press/release
-                        val = ev[1]
+                        app.invalidate()
+                        _, val, ev_t = ev
                         if val == 1:  # Press
                             touched = True
+                            app.gestures.press(ev_t)
                             # Start long-press only for action tabs
                             try:
                                 if app.TABS[app.active_tab]["id"] in ("reboot", "shutdown"):
@@ -415,60 +605,47 @@ def main():
                             except Exception:
                                 was_hold = False
 
-                            # Simple next-tab on touch release only if it was not a long-press
-                            if not was_hold:
-                                try:
-                                    old_tab = app.active_tab
-                                    app.active_tab = (app.active_tab + 1) % len(app.TABS)
-                                    # Notify Range tab about visibility change
-                                    try:
-                                        if app.TABS[old_tab]['id'] == 'range':
-                                            app.components['range'].set_active(False)
-                                        if app.TABS[app.active_tab]['id'] == 'range':
-                                            app.components['range'].set_active(True)
-                                    except Exception:
-                                        pass
-                                    logging.info(f"Touch released -> next tab: {app.TABS[app.active_tab]['label']}")
-                                except Exception:
-                                    pass
-                            else:
+                            if was_hold:
                                 # consume and clear suppression so next releases behave normally
-                                try:
-                                    app.suppress_next_release = False
-                                except Exception:
-                                    pass
-                            # Reset touch and position buffer
+                                app.gestures.cancel()
+                                app.suppress_next_release = False
+                            else:
+                                gesture = app.gestures.release(ev_t)
+                                if gesture is not None:
+                                    logging.debug("Gesture %s at X=%s Y=%s dx=%s v=%.0f px/s",
+                                                  gesture.kind, gesture.x, gesture.y, gesture.dx, gesture.velocity)
+                            # Reset touch position
                             app.last_touch_x = None
                             app.last_touch_y = None
-                            try:
-                                app.pos_buffer.clear()
-                            except Exception:
-                                pass
                             # reset long-press
                             app.long_press_start_time = None
                             app.long_press_progress = 0.0
                             app.long_press_target = None
                             app.long_press_executed = False
-                        logging.debug(f'Touch event -> touched={touched}')
+                        logging.debug('Touch event -> touched=%s', touched)
                     
                     elif ev[0] == 'POS':
-                        # Position update
-                        _, x, y, p = ev
-                        if x is not None and y is not None:
-                            sx, sy = map_raw_to_screen(x, y, size, calib)
-                            # Append to smoothing buffer and compute averages
-                            try:
-                                app.pos_buffer.append((sx, sy))
-                                bx = int(sum(p[0] for p in app.pos_buffer) / len(app.pos_buffer))
-                                by = int(sum(p[1] for p in app.pos_buffer) / len(app.pos_buffer))
-                            except Exception:
-                                bx, by = sx, sy
-                            logging.debug(f"Touch raw: X={x} Y={y} -> screen: X={sx} Y={sy} avg: X={bx} Y={by}")
-                            app.last_touch_x = bx
-                            app.last_touch_y = by
-            
-            except queue.Empty:
-                pass
+                        # Position update (already smoothed and coalesced by the reader thread)
+                        _, x, y, p, ev_t = ev
+                        sx, sy = map_raw_to_screen(x, y, size, calib)
+                        logging.debug("Touch avg raw: X=%s Y=%s -> screen: X=%s Y=%s", x, y, sx, sy)
+                        app.last_touch_x = sx
+                        app.last_touch_y = sy
+                        if app.gestures.move(sx, sy, ev_t) is not None:
+                            app.invalidate()
+                        # A drag is a swipe, never the start of a reboot/shutdown hold
+                        if app.gestures.dragging and app.long_press_start_time is not None:
+                            app.long_press_start_time = None
+                            app.long_press_target = None
+                            app.long_press_progress = 0.0
+                # Long press of a still finger (rows and tabs may subscribe to it)
+                if app.gestures.poll(time.monotonic()) is not None:
+                    app.invalidate()
+            except Exception as e:
+                logging.error(f"Touch event handling failed: {e}")
+            longpress_t0 = time.perf_counter()
+            if touch_t0 is not None:
+                touch_s = longpress_t0 - touch_t0
             # Update long-press progress and handle execution
             try:
                 now = time.time()
@@ -497,11 +674,29 @@ def main():
                         app.long_press_executed = False
             except Exception:
                 pass
+            longpress_s = time.perf_counter() - longpress_t0
             
-            # Draw and update
-            app.draw(screen)
-            # Push buffer to framebuffer
-            fbw.blit_surface(screen)
+            # Draw and update only when something visible changed; idle
+            # wakeups are not frames and do not show up in the statistics
+            if app.needs_redraw():
+                frame = app.stats.begin_frame()
+                app.stats.add('touch', touch_s)
+                app.stats.add('longpress', longpress_s)
+                app.draw(screen)
+                # Hand the changed regions to the presenter thread, which
+                # books its convert/write times on this frame
+                with app.stats.phase('present'):
+                    presenter.present(screen, app.pop_dirty_rects(), frame=frame)
+                app.stats.end_frame()
+            if app.stats.dump_requested:
+                app.stats.dump_requested = False
+                frames_log = logging.getLogger('tagtapper.frames')
+                app.stats.dump(frames_log)
+                cache = TEXT_CACHE.stats()
+                lookups = cache['hits'] + cache['misses']
+                frames_log.info("Text cache: %d entries, %d KiB, %d hits, %d misses (%.0f %% hit rate)",
+                                cache['entries'], cache['bytes'] // 1024, cache['hits'], cache['misses'],
+                                100.0 * cache['hits'] / lookups if lookups else 0.0)
             # If a pre-exec animation is running, check for completion and perform cleanup+exec
             try:
                 if app.exec_after_anim is not None and app.anim_start is not None:
@@ -514,8 +709,9 @@ def main():
                             t.join(timeout=2)
                         except Exception:
                             pass
-                        # close framebuffer
+                        # flush pending frames and close framebuffer
                         try:
+                            presenter.stop()
                             fbw.close()
                         except Exception:
                             pass
@@ -524,6 +720,13 @@ def main():
                             pygame.quit()
                         except Exception:
                             pass
+                        # write out buffered logs and reports before the system goes down
+                        try:
+                            if logpipe.get_pipeline():
+                                logpipe.get_pipeline().stop()
+                            get_write_behind().flush()
+                        except Exception:
+                            pass
                         # execute system action
                         try:
                             if tabid == 'reboot':
@@ -538,8 +741,6 @@ def main():
                         break
             except Exception:
                 pass
-            
-            clock.tick(30)  # 30 FPS
     
     except KeyboardInterrupt:
         logging.info('Exiting on user request')
@@ -551,6 +752,7 @@ def main():
         except Exception:
             pass
         try:
+            presenter.stop()
             fbw.close()
         except Exception:
             pass
@@ -564,6 +766,13 @@ def main():
                 app.session_reporter.stop()
         except Exception:
             pass
+        # Write out buffered log lines and reports
+        try:
+            if logpipe.get_pipeline():
+                logpipe.get_pipeline().stop()
+            get_write_behind().stop()
+        except Exception:
+            pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Headless render benchmark for tag-tapper-pi.
+
+Builds TagTapperApp with fixture data for every tab and renders into a
+memory- or file-backed mmap that stands in for /dev/fb1, so it runs on
+any Linux box without the display, touch screen or network tools.
+
+Per scenario and tab it reports:
+  - draw ms/frame     app.draw() into the native render surface
+  - push ms/frame     copy of the damaged regions into the fake framebuffer
+  - conv ms/frame     RGB888 -> framebuffer format conversion of a full frame
+  - KiB/frame         bytes written into the framebuffer mapping
+  - alloc KiB/frame   peak Python/NumPy allocations while drawing and pushing
+
+Each tab is measured "cold" (its data changes every frame, so cached
+layers are rebuilt) and "idle" (nothing changes, forced redraw).
+
+Usage: python3 benchmark_render.py [--frames N] [--scenario NAME ...] [--fb PATH]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Only warnings (e.g. from the tab components) go to stderr; app.py sets up
+# its log file in main(), which the benchmark never calls
+logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+
+try:
+    import pygame
+except Exception:
+    print("pygame is required. Install with: pip3 install pygame")
+    sys.exit(1)
+
+from app import TagTapperApp
+from GUI import tab_ip, tab_ping, tab_range, action
+from tagtapperpi_comp.framebuffer import FramebufferWriter, rgb565_info
+
+SIZE = (800, 480)
+
+
+def scenario_fixture(name):
+    """Return fixture data for a named scale scenario."""
+    vlans = [(70, 'Server'), (80, 'Jail'), (100, 'Infra'), (178, 'User')]
+    targets = [('192.168.70.1', 'Server VLAN Gateway'), ('192.168.80.1', 'Jail VLAN Gateway'),
+               ('172.16.100.1', 'Infra VLAN Gateway'), ('8.8.8.8', 'Google DNS')]
+    ssids = ['Spezialgelagertes Sonder-WLAN', 'Kita Gramschatz', 'ShellyPlus1-D4D4DAF4B6B0']
+    if name == 'vlans50':
+        vlans = [(100 + i, f'VLAN {100 + i}') for i in range(50)]
+    elif name == 'targets20':
+        targets = [(f'10.0.{i}.1', f'Gateway {i}') for i in range(20)]
+    elif name == 'long_ssids':
+        ssids = [f'Sehr-langes-Gaeste-WLAN-im-Gebaeude-{i:02d}' for i in range(6)]
+        targets = [(host, f'{label} (Zweigstelle Nord, Etage 3)') for host, label in targets]
+    elif name != 'default':
+        raise ValueError(f"Unknown scenario: {name}")
+
+    ifaces = ['lo', 'eth0'] + [f'eth0.{vid}' for vid, _ in vlans] + ['wlan0']
+    return {
+        'ifaces': ifaces,
+        'vlan_names': {str(vid): label for vid, label in vlans},
+        'targets': [{'host': host, 'name': label} for host, label in targets],
+        'ssids': ssids,
+    }
+
+
+SCENARIOS = ['default', 'vlans50', 'targets20', 'long_ssids']
+
+
+def build_components():
+    return {
+        'ip': tab_ip.TabIP(autostart=False),
+        'ping': tab_ping.TabPing(autostart=False),
+        'range': tab_range.TabRange(autostart=False),
+        'reboot': action.ActionTab('reboot'),
+        'shutdown': action.ActionTab('shutdown'),
+    }
+
+
+def apply_fixture(components, fixture, step):
+    """Load fixture data into the components; `step` varies the values."""
+    ifaces = fixture['ifaces']
+    ip = components['ip']
+    with ip._lock:
+        ip.cached_ifaces = list(ifaces)
+        ip.cached_vlan_names = dict(fixture['vlan_names'])
+        ip.cached_ips = {n: f'10.{i}.{step % 250}.2/24' for i, n in enumerate(ifaces) if n != 'lo'}
+        ip.cached_up = {n: (i + step) % 5 != 0 for i, n in enumerate(ifaces)}
+        ip.cached_ssids = {n: fixture['ssids'][0] for n in ifaces if n.startswith('wl')}
+        ip.version += 1
+
+    ping = components['ping']
+    ping_ifaces = [n for n in ifaces if n != 'lo']
+    with ping._lock:
+        ping.interfaces = ping_ifaces
+        ping.ping_targets = list(fixture['targets'])
+        ping.ping_results = {(n, t['host']): (i + j + step) % 3 != 0
+                             for i, n in enumerate(ping_ifaces)
+                             for j, t in enumerate(fixture['targets'])}
+        ping.version += 1
+
+    rng = components['range']
+    with rng._lock:
+        rng.target_ssids = list(fixture['ssids'])
+        rng.signal_strengths = {s: (17 * i + step) % 101 for i, s in enumerate(fixture['ssids'])}
+        rng.connected_ssid = fixture['ssids'][0]
+        rng.version += 1
+
+
+def open_fake_framebuffer(path=None):
+    """Return (writer, path) for a file-backed RGB565 fake framebuffer."""
+    info = rgb565_info(*SIZE)
+    if path is None:
+        shm = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        fd, path = tempfile.mkstemp(prefix='fake-fb-', dir=shm)
+        os.close(fd)
+    with open(path, 'wb') as f:
+        f.truncate(info.line_length * info.height)
+    return FramebufferWriter(path, info=info), path
+
+
+def bytes_written(fbw, rects):
+    if rects is None:
+        return fbw.page_bytes
+    bounds = pygame.Rect(0, 0, fbw.width, fbw.height)
+    return sum(bounds.clip(r).width * bounds.clip(r).height for r in rects) * fbw.bytes_per_pixel
+
+
+def measure_tab(app, fbw, screen, tab_index, fixture, frames, cold):
+    """Render `frames` frames of one tab and return averaged metrics."""
+    app.active_tab = tab_index
+    apply_fixture(app.components, fixture, 0)
+    # Warm-up frame (tab switch, text cache fill)
+    app.invalidate()
+    app.draw(screen)
+    fbw.blit_surface(screen, app.pop_dirty_rects())
+
+    draw_s = push_s = 0.0
+    written = 0
+    alloc_peak = 0
+    tracemalloc.start()
+    for step in range(1, frames + 1):
+        if cold:
+            apply_fixture(app.components, fixture, step)
+        app.invalidate()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        app.draw(screen)
+        t1 = time.perf_counter()
+        rects = app.pop_dirty_rects()
+        fbw.blit_surface(screen, rects)
+        t2 = time.perf_counter()
+        alloc_peak += tracemalloc.get_traced_memory()[1] - base
+        draw_s += t1 - t0
+        push_s += t2 - t1
+        written += bytes_written(fbw, rects)
+    tracemalloc.stop()
+    return {
+        'draw_ms': draw_s * 1000 / frames,
+        'push_ms': push_s * 1000 / frames,
+        'kib': written / 1024 / frames,
+        'alloc_kib': alloc_peak / 1024 / frames,
+    }
+
+
+def measure_conversion(fbw, screen, frames):
+    """Average ms for converting a full RGB888 frame to the framebuffer format."""
+    rgb = pygame.Surface(SIZE)
+    rgb.blit(screen, (0, 0))
+    fbw.blit_surface(rgb)
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fbw.blit_surface(rgb)
+    return (time.perf_counter() - t0) * 1000 / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--frames', type=int, default=50, help='frames per measurement (default 50)')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='scenario to run (repeatable, default: all)')
+    parser.add_argument('--fb', help='file to use as fake framebuffer (default: temp file in /dev/shm)')
+    args = parser.parse_args()
+
+    pygame.font.init()
+    fbw, fb_path = open_fake_framebuffer(args.fb)
+    try:
+        screen = fbw.create_surface()
+        print(f"Fake framebuffer: {fb_path} ({fbw.width}x{fbw.height}, {fbw.bpp} bpp), {args.frames} frames")
+        print(f"{'scenario':<11} {'tab':<9} {'mode':<5} {'draw ms':>8} {'push ms':>8} "
+              f"{'KiB/frame':>10} {'alloc KiB':>10}")
+        for name in args.scenario or SCENARIOS:
+            fixture = scenario_fixture(name)
+            app = TagTapperApp(SIZE, components=build_components(), session_reports=False)
+            for tab_index, tab in enumerate(app.TABS[:4]):
+                for cold in (True, False):
+                    m = measure_tab(app, fbw, screen, tab_index, fixture, args.frames, cold)
+                    print(f"{name:<11} {tab['id']:<9} {'cold' if cold else 'idle':<5} "
+                          f"{m['draw_ms']:8.2f} {m['push_ms']:8.3f} {m['kib']:10.1f} {m['alloc_kib']:10.1f}")
+        print(f"RGB888 conversion (full frame): {measure_conversion(fbw, screen, args.frames):.2f} ms/frame")
+    finally:
+        fbw.close()
+        if args.fb is None:
+            try:
+                os.unlink(fb_path)
+            except OSError:
+                pass
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,6 @@ import threading
 import queue
 import time
 import yaml
-import mmap
 
 try:
     import pygame
@@ -22,80 +21,15 @@ except Exception as e:
     print("evdev is required. Install with: pip3 install evdev")
     sys.exit(1)
 
+from tagtapperpi_comp.config import CONFIG_PATH
+from tagtapperpi_comp.framebuffer import FramebufferWriter
+
 TOUCH_PATH = "/dev/input/by-path/platform-3f204000.spi-cs-1-event"
-CONFIG_FILE = "/home/dietpi/tag-tapper-pi/config.yaml"
+CONFIG_FILE = str(CONFIG_PATH)
 
 logging.basicConfig(filename='/tmp/touch_calibration.log', level=logging.INFO, format='%(asctime)s - %(message)s')
 
 
-def get_fb_size(fbdev='/dev/fb1'):
-    """Get framebuffer size from sysfs."""
-    try:
-        base = '/sys/class/graphics/' + os.path.basename(fbdev)
-        vs = os.path.join(base, 'virtual_size')
-        if os.path.exists(vs):
-            with open(vs, 'r') as f:
-                s = f.read().strip()
-            w, h = s.split(',') if ',' in s else s.split('x')
-            return int(w), int(h)
-        modes = os.path.join(base, 'modes')
-        if os.path.exists(modes):
-            with open(modes, 'r') as f:
-                line = f.readline().strip()
-            if line and 'x' in line:
-                w, h = line.split('x')[:2]
-                return int(w), int(h)
-    except Exception as e:
-        logging.info(f"Couldn't read fb size: {e}")
-    return 480, 320
-
-
-class FramebufferWriter:
-    """Minimal direct framebuffer writer for 16bpp (RGB565) devices."""
-    def __init__(self, fbdev='/dev/fb1'):
-        self.fbdev = fbdev
-        self.width, self.height = get_fb_size(fbdev)
-        self.bpp = 16
-        self.line_length = self.width * (self.bpp // 8)
-        self.fb = open(self.fbdev, 'r+b', buffering=0)
-        self.size_bytes = self.line_length * self.height
-        self.mm = mmap.mmap(self.fb.fileno(), self.size_bytes, access=mmap.ACCESS_WRITE)
-        logging.info(f"Opened framebuffer {self.fbdev} for direct writing")
-
-    def close(self):
-        try:
-            if self.mm:
-                self.mm.flush()
-                self.mm.close()
-        finally:
-            try:
-                self.fb.close()
-            except Exception:
-                pass
-
-    def blit_surface(self, surface):
-        """Copy a pygame Surface to the framebuffer as RGB565."""
-        if surface.get_width() != self.width or surface.get_height() != self.height:
-            surface = pygame.transform.smoothscale(surface, (self.width, self.height))
-
-        rgb_bytes = pygame.image.tostring(surface, 'RGB')
-        out = bytearray(self.size_bytes)
-        ib = memoryview(rgb_bytes)
-        ob = memoryview(out)
-        j = 0
-        for i in range(0, len(ib), 3):
-            r = ib[i]
-            g = ib[i+1]
-            b = ib[i+2]
-            val = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
-            ob[j] = val & 0xFF
-            ob[j+1] = (val >> 8) & 0xFF
-            j += 2
-
-        self.mm.seek(0)
-        self.mm.write(ob)
-
-
 def touch_thread(devpath, q, stop_event):
     """Thread to read touch events from evdev and push to queue."""
     try:
@@ -239,8 +173,11 @@ class CalibrationApp:
         }
         
         try:
-            with open(CONFIG_FILE, 'w') as f:
+            # Write-then-rename so the running app never reloads a half-written file
+            tmp_file = CONFIG_FILE + '.tmp'
+            with open(tmp_file, 'w') as f:
                 yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+            os.replace(tmp_file, CONFIG_FILE)
             logging.info(f"Saved to {CONFIG_FILE}: X={min(raw_x)}-{max(raw_x)}, Y={min(raw_y)}-{max(raw_y)}")
             print(f"✓ Calibration saved: X={min(raw_x)}-{max(raw_x)}, Y={min(raw_y)}-{max(raw_y)}")
         except Exception as e:
@@ -250,15 +187,16 @@ class CalibrationApp:
 
 def main():
     """Main calibration loop."""
-    size = get_fb_size('/dev/fb1')
-    fbw = FramebufferWriter('/dev/fb1')
+    fbw = FramebufferWriter('/dev/fb1', default_size=(480, 320))
+    size = (fbw.width, fbw.height)
     
     try:
         pygame.font.init()
     except Exception:
         pass
     
-    screen = pygame.Surface(size)
+    # Native RGB565 surface: each frame is a plain copy into the framebuffer
+    screen = fbw.create_surface()
     app = CalibrationApp(size)
     
     # Start touch monitoring thread
@@ -22,6 +22,11 @@ if env_repo:
 else:
     REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Interface state comes from the app's network state module
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+from tagtapperpi_comp.netstate import read_snapshot
+
 CONFIG = os.environ.get('VLAN_CONFIG') or os.path.join(REPO_DIR, 'config.yaml')
 print('VLAN sync: using config file:', CONFIG)
 
@@ -38,32 +43,19 @@ def run(cmd):
         return e.returncode
 
 
-def iface_exists(name):
-    try:
-        subprocess.check_output(['ip', 'link', 'show', name], stderr=subprocess.DEVNULL)
-        return True
-    except subprocess.CalledProcessError:
-        return False
-    except FileNotFoundError:
-        print('ip command not found')
-        sys.exit(1)
+def iface_exists(name, snapshot):
+    return name in snapshot.ifaces
 
 
-def get_all_interfaces():
-    out = subprocess.check_output(['ip', '-o', 'link', 'show']).decode('utf-8')
-    names = []
-    for line in out.splitlines():
-        parts = line.split(':', 2)
-        if len(parts) >= 2:
-            names.append(parts[1].strip().split('@')[0])
-    return names
+def get_all_interfaces(snapshot):
+    return list(snapshot.ifaces)
 
 
-def choose_base_interface():
+def choose_base_interface(snapshot):
     # Prefer eth0, then first non-loopback non-wlan
-    if iface_exists('eth0'):
+    if iface_exists('eth0', snapshot):
         return 'eth0'
-    names = get_all_interfaces()
+    names = get_all_interfaces(snapshot)
     for n in names:
         if n == 'lo':
             continue
@@ -96,18 +88,22 @@ def main():
         desired_ids.add(vid)
         desired_map[vid] = v
 
-    base_if = os.environ.get('VLAN_BASE_IF') or choose_base_interface()
+    # One interface dump per sync pass; interfaces created below are desired
+    # ones, so the deletion pass can work from the same snapshot
+    snapshot = read_snapshot()
+
+    base_if = os.environ.get('VLAN_BASE_IF') or choose_base_interface(snapshot)
     print('Using base interface:', base_if)
 
     # Ensure base interface exists
-    if not iface_exists(base_if):
+    if not iface_exists(base_if, snapshot):
         print(f'Base interface {base_if} does not exist. Aborting.')
         sys.exit(1)
 
     # Create or update desired VLANs
     for vid in sorted(desired_ids, key=int):
         name = f"{base_if}.{vid}"
-        if iface_exists(name):
+        if iface_exists(name, snapshot):
             print(f'Interface {name} exists, skipping creation')
         else:
             print(f'Creating VLAN interface {name} on {base_if} (id {vid})')
@@ -128,7 +124,7 @@ def main():
             print(f'No static IP configured for {name}, will use DHCP if available')
 
     # Delete interfaces that match base_if.* but not desired
-    existing = get_all_interfaces()
+    existing = get_all_interfaces(snapshot)
     for ifname in existing:
         if ifname.startswith(base_if + '.'):
             parts = ifname.split('.')
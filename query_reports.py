@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Query the session index (sessions.sqlite) next to the reports.
+
+Examples:
+  python3 query_reports.py sessions --since 30d
+  python3 query_reports.py down --vlan 80 --since 2026-09-01
+  python3 query_reports.py pings --host 8.8.8.8
+  python3 query_reports.py sql "SELECT COUNT(*) FROM sessions"
+  python3 query_reports.py reindex
+
+The directory defaults to the one from config.yaml (report_path).
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from tagtapperpi_comp.config import ConfigStore  # noqa: E402
+from tagtapperpi_comp.report_index import ReportIndex, journals  # noqa: E402
+from tagtapperpi_comp.session_reporter import report_dir  # noqa: E402
+
+
+def parse_since(text):
+    """'30d', '12h' or 'YYYY-MM-DD' -> epoch seconds (None for no limit)."""
+    if not text:
+        return None
+    m = re.fullmatch(r'(\d+)([dh])', text)
+    if m:
+        return time.time() - int(m.group(1)) * (86400 if m.group(2) == 'd' else 3600)
+    return time.mktime(time.strptime(text, '%Y-%m-%d'))
+
+
+def fmt_time(ts):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)) if ts else '-'
+
+
+def print_table(columns, rows):
+    cells = [[fmt_time(v) if c in ('start', 'end') else ('' if v is None else str(v)) for c, v in zip(columns, row)]
+             for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)]
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print('  '.join(v.ljust(w) for v, w in zip(r, widths)))
+    print(f"({len(rows)} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--dir', help='report directory (default: from config.yaml)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('sessions', help='list sessions')
+    p.add_argument('--since')
+
+    p = sub.add_parser('down', help='sessions in which interfaces were or went down')
+    p.add_argument('--vlan', type=int)
+    p.add_argument('--iface')
+    p.add_argument('--since')
+
+    p = sub.add_parser('pings', help='probe outcomes per interface and target')
+    p.add_argument('--host')
+    p.add_argument('--since')
+
+    p = sub.add_parser('sql', help='run a read-only SQL query')
+    p.add_argument('query')
+
+    sub.add_parser('reindex', help='rebuild the index from all session journals')
+
+    args = parser.parse_args()
+    directory = args.dir or report_dir(ConfigStore().snapshot())
+    index = ReportIndex(directory)
+    since = parse_since(getattr(args, 'since', None)) or 0
+
+    if args.command == 'reindex':
+        paths = journals(directory)
+        n = sum(1 for path in paths if index.add(path))
+        print(f"Indexed {n} of {len(paths)} journals in {index.path}")
+        return
+
+    if args.command == 'sessions':
+        sql = ("SELECT s.id, s.start, s.end, s.recovered, "
+               "(SELECT COUNT(*) FROM interfaces i WHERE i.session_id = s.id AND i.down_events > 0) AS flapped, "
+               "(SELECT COUNT(*) FROM probes p WHERE p.session_id = s.id AND NOT p.ok) AS failed_probes "
+               "FROM sessions s WHERE s.start >= ? ORDER BY s.start")
+        params = (since,)
+    elif args.command == 'down':
+        where = ["s.start >= ?", "(NOT i.up OR i.down_events > 0)"]
+        params = [since]
+        if args.vlan is not None:
+            where.append("i.vlan = ?")
+            params.append(args.vlan)
+        if args.iface:
+            where.append("i.iface = ?")
+            params.append(args.iface)
+        sql = ("SELECT s.id, s.start, s.end, i.iface, i.vlan_name, i.up, i.down_events, i.ip "
+               "FROM interfaces i JOIN sessions s ON s.id = i.session_id "
+               f"WHERE {' AND '.join(where)} ORDER BY s.start")
+    elif args.command == 'pings':
+        where = ["s.start >= ?"]
+        params = [since]
+        if args.host:
+            where.append("p.host = ?")
+            params.append(args.host)
+        sql = ("SELECT p.iface, p.host, COUNT(*) AS sessions, SUM(NOT p.ok) AS failed_at_end, "
+               "SUM(p.fail_events) AS fail_events, SUM(p.sent) AS sent, SUM(p.lost) AS lost, "
+               "ROUND(100.0 * SUM(p.lost) / NULLIF(SUM(p.sent), 0), 1) AS loss_pct, "
+               "ROUND(SUM(p.avg_ms * (p.sent - p.lost)) / NULLIF(SUM(p.sent - p.lost), 0), 1) AS avg_ms, "
+               "ROUND(MAX(p.max_ms), 1) AS max_ms "
+               "FROM probes p JOIN sessions s ON s.id = p.session_id "
+               f"WHERE {' AND '.join(where)} GROUP BY p.iface, p.host ORDER BY p.iface, p.host")
+    else:
+        index.query("PRAGMA query_only=ON")
+        sql, params = args.query, ()
+
+    t0 = time.perf_counter()
+    try:
+        columns, rows = index.query(sql, params)
+    except sqlite3.Error as e:
+        print(f"Query failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    print_table(columns, rows)
+    print(f"{(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,4 +4,17 @@ __all__ = [
     "system",
     "config",
     "touch",
+    "framebuffer",
+    "icmp",
+    "rtt_stats",
+    "probe_scheduler",
+    "netlink",
+    "netstate",
+    "wireless",
+    "wifi_scan",
+    "walk_test",
+    "journal",
+    "report_index",
+    "storage",
+    "logpipe",
 ]
@@ -1,14 +1,310 @@
-import yaml
+"""Central store for config.yaml.
+
+The file is parsed and validated once into an immutable, versioned
+`ConfigSnapshot`. A watcher thread reloads it when inotify reports that
+config.yaml was written or replaced (falling back to mtime polling) and
+notifies subscribers, so edits apply immediately and nobody re-reads the
+SD card on a timer.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+from collections import namedtuple
 from pathlib import Path
+from types import MappingProxyType
+
+import yaml
+
+log = logging.getLogger(__name__)
 
 CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
 
+DEFAULT_TOUCH_CALIBRATION = MappingProxyType({
+    'raw_x_min': 0,
+    'raw_x_max': 4095,
+    'raw_y_min': 0,
+    'raw_y_max': 4095,
+    'screen_width': 480,
+    'screen_height': 320,
+})
+
+Vlan = namedtuple('Vlan', ['id', 'name', 'ip'])
+RangeScanner = namedtuple('RangeScanner', ['interface', 'update_interval', 'ssids'])
+
+# raw: the parsed YAML, deep-frozen; the other fields are validated views of it
+ConfigSnapshot = namedtuple('ConfigSnapshot', [
+    'version', 'raw', 'vlans', 'vlan_names', 'pings', 'range_scanner',
+    'report_path', 'report_quota', 'touch_calibration', 'has_touch_calibration', 'debug_overlay',
+    'log_level',
+])
+
+DEFAULT_REPORT_QUOTA_MB = 100
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _freeze(obj):
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+def _thaw(obj):
+    if isinstance(obj, MappingProxyType):
+        return {k: _thaw(v) for k, v in obj.items()}
+    if isinstance(obj, tuple):
+        return [_thaw(v) for v in obj]
+    return obj
+
+
+def _items(cfg, key):
+    """Return cfg[key] as a list of dicts, dropping anything else with a warning."""
+    value = cfg.get(key) or []
+    if not isinstance(value, list):
+        log.warning(f"config.yaml: '{key}' must be a list, ignoring it")
+        return []
+    items = [v for v in value if isinstance(v, dict)]
+    if len(items) != len(value):
+        log.warning(f"config.yaml: ignoring {len(value) - len(items)} malformed '{key}' entries")
+    return items
+
+
+def build_snapshot(cfg, version):
+    """Validate parsed YAML `cfg` and return a ConfigSnapshot."""
+    if not isinstance(cfg, dict):
+        raise ValueError("top level must be a mapping")
+
+    vlans = []
+    for v in _items(cfg, 'vlans'):
+        try:
+            vid = int(v.get('id'))
+        except (TypeError, ValueError):
+            log.warning(f"config.yaml: VLAN without numeric id ignored: {v}")
+            continue
+        vlans.append(Vlan(str(vid), str(v.get('name') or ''), v.get('ip')))
+
+    pings = []
+    for p in _items(cfg, 'pings'):
+        host = p.get('host')
+        if not host:
+            continue
+        entry = dict(p)
+        entry['host'] = str(host)
+        entry['name'] = str(p.get('name') or host)
+        # Optional per-target probe interval in seconds
+        if 'interval' in entry:
+            try:
+                entry['interval'] = float(entry['interval'])
+                if entry['interval'] <= 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                log.warning(f"config.yaml: invalid interval for ping {host}, using the default")
+                del entry['interval']
+        pings.append(_freeze(entry))
+
+    scanner = cfg.get('range_scanner') or {}
+    if not isinstance(scanner, dict):
+        scanner = {}
+    try:
+        interval = float(scanner.get('update_interval', 5))
+    except (TypeError, ValueError):
+        interval = 5
+    ssids = tuple(str(s.get('name')) for s in _items(scanner, 'ssid') if s.get('name'))
+    range_scanner = RangeScanner(str(scanner.get('interface') or 'wlan0'), interval, ssids)
+
+    try:
+        quota_mb = float(cfg.get('report_quota_mb', DEFAULT_REPORT_QUOTA_MB))
+        if quota_mb <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        log.warning(f"config.yaml: invalid report_quota_mb, using {DEFAULT_REPORT_QUOTA_MB}")
+        quota_mb = DEFAULT_REPORT_QUOTA_MB
+
+    log_level = str(cfg.get('log_level') or 'INFO').upper()
+    if log_level not in LOG_LEVELS:
+        log.warning(f"config.yaml: invalid log_level {log_level}, using INFO")
+        log_level = 'INFO'
+
+    calib = cfg.get('touch_calibration')
+    touch = dict(DEFAULT_TOUCH_CALIBRATION)
+    if isinstance(calib, dict):
+        for key in touch:
+            try:
+                touch[key] = int(calib.get(key, touch[key]))
+            except (TypeError, ValueError):
+                log.warning(f"config.yaml: invalid touch_calibration.{key}, using {touch[key]}")
+
+    return ConfigSnapshot(
+        version=version,
+        raw=_freeze(cfg),
+        vlans=tuple(vlans),
+        vlan_names=MappingProxyType({v.id: v.name for v in vlans if v.name}),
+        pings=tuple(pings),
+        range_scanner=range_scanner,
+        report_path=cfg.get('report_path') or None,
+        report_quota=int(quota_mb * 1024 * 1024),
+        touch_calibration=MappingProxyType(touch),
+        has_touch_calibration=isinstance(calib, dict),
+        debug_overlay=bool(cfg.get('debug_overlay', False)),
+        log_level=log_level,
+    )
+
+
+class ConfigStore:
+    """Parsed-once view of config.yaml with hot reload."""
+
+    def __init__(self, path=CONFIG_PATH, poll_interval=2):
+        self.path = Path(path)
+        # Only used when inotify is unavailable
+        self.poll_interval = poll_interval
+        self._snapshot = build_snapshot({}, 0)
+        self._subscribers = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reload()
+
+    def snapshot(self):
+        """Return the current ConfigSnapshot (immutable; safe to keep)."""
+        return self._snapshot
+
+    def subscribe(self, callback):
+        """Call `callback(snapshot)` from the watcher thread after each reload that changed something."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    def reload(self):
+        """Parse the file and publish a new snapshot if its content changed.
+
+        A missing, unparsable or invalid file keeps the last good snapshot.
+        """
+        with self._reload_lock:
+            prev = self._snapshot
+            try:
+                with self.path.open() as f:
+                    cfg = yaml.safe_load(f) or {}
+                snap = build_snapshot(cfg, prev.version + 1)
+            except FileNotFoundError:
+                log.warning(f"{self.path} not found, keeping previous config")
+                return prev
+            except Exception as e:
+                log.error(f"Invalid {self.path}, keeping previous config: {e}")
+                return prev
+            if snap.raw == prev.raw and prev.version:
+                return prev
+            self._snapshot = snap
+            log.info(f"Loaded {self.path} (version {snap.version})")
+            for callback in list(self._subscribers):
+                try:
+                    callback(snap)
+                except Exception as e:
+                    log.error(f"Config subscriber failed: {e}")
+            return snap
+
+    def start(self):
+        if self._thread:
+            return
+        fd = self._inotify_open()
+        target = self._poll_loop if fd is None else lambda: self._inotify_loop(fd)
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _inotify_open(self):
+        """Watch the config directory (editors replace the file by rename). Returns the fd or None."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            wd = libc.inotify_add_watch(fd, os.fsencode(self.path.parent),
+                                        IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE)
+            if wd < 0:
+                err = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(err, os.strerror(err))
+            return fd
+        except Exception as e:
+            log.warning(f"inotify unavailable, polling {self.path}: {e}")
+            return None
+
+    def _inotify_loop(self, fd):
+        name = os.fsencode(self.path.name)
+        while not self._stop.is_set():
+            ready, _, _ = select.select([fd], [], [], 1.0)
+            if not ready:
+                continue
+            hit = False
+            # Coalesce the burst of events a save produces into one reload
+            while ready:
+                data = os.read(fd, 4096)
+                offset = 0
+                while offset + INOTIFY_EVENT.size <= len(data):
+                    _wd, _mask, _cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+                    start = offset + INOTIFY_EVENT.size
+                    if data[start:start + length].rstrip(b'\0') == name:
+                        hit = True
+                    offset = start + length
+                ready, _, _ = select.select([fd], [], [], 0.05)
+            if hit:
+                self.reload()
+        os.close(fd)
+
+    def _stat(self):
+        try:
+            st = self.path.stat()
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def _poll_loop(self):
+        last = self._stat()
+        while not self._stop.wait(self.poll_interval):
+            stamp = self._stat()
+            if stamp != last and stamp is not None:
+                self.reload()
+            last = stamp
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_config_store():
+    """Return the process-wide ConfigStore for CONFIG_PATH, starting its watcher on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ConfigStore()
+            _shared.start()
+        return _shared
+
+
 def load_config() -> dict:
     if not CONFIG_PATH.exists():
         raise FileNotFoundError("config.yaml nicht gefunden")
 
-    with CONFIG_PATH.open() as f:
-        cfg = yaml.safe_load(f) or {}
+    # Mutable copy of the shared snapshot
+    cfg = _thaw(get_config_store().snapshot().raw)
 
     cfg.setdefault("vlans", [])
     cfg.setdefault("external_pings", [])
@@ -0,0 +1,110 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class FrameStats:
+    """Per-frame phase timings kept in a fixed-size ring buffer.
+
+    The main loop calls `begin_frame()` for every frame it draws, records
+    phases with `phase()` or `add()` and finishes with `end_frame()`.
+    Phases listed in `async_phases` (e.g. work done by the presenter
+    thread) are passed the frame id `begin_frame()` returned and land in
+    that frame's row even after it ended, but are not counted in the
+    main-loop frame time.
+    """
+
+    def __init__(self, phases, capacity=600, async_phases=()):
+        self.phases = list(phases)
+        self.capacity = capacity
+        self.async_phases = set(async_phases)
+        self._index = {name: i for i, name in enumerate(self.phases)}
+        self._sync_mask = np.array([name not in self.async_phases for name in self.phases])
+        # Ring buffer: one row of phase seconds, frame total and end time per frame
+        self._phase_s = np.zeros((capacity, len(self.phases)))
+        self._total_s = np.zeros(capacity)
+        self._stamps = np.zeros(capacity)
+        self._current = np.zeros(len(self.phases))
+        self._lock = threading.Lock()
+        self._open = None  # id of the frame between begin_frame() and end_frame()
+        self.count = 0
+        # Set from a signal handler; the main loop logs and clears it
+        self.dump_requested = False
+
+    def begin_frame(self):
+        """Start a frame and return its id (for `add(..., frame=id)` from other threads)."""
+        with self._lock:
+            self._current[:] = 0.0
+            self._open = self.count
+            return self._open
+
+    def add(self, name, seconds, frame=None):
+        """Add `seconds` to phase `name` of frame `frame` (default: the current one).
+
+        Unknown names and frames that already left the ring are ignored.
+        """
+        i = self._index.get(name)
+        if i is None:
+            return
+        with self._lock:
+            if frame is None or frame == self._open:
+                self._current[i] += seconds
+            elif self.count - self.capacity <= frame < self.count:
+                slot = frame % self.capacity
+                self._phase_s[slot, i] += seconds
+                if self._sync_mask[i]:
+                    self._total_s[slot] += seconds
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def end_frame(self):
+        with self._lock:
+            slot = self.count % self.capacity
+            self._phase_s[slot] = self._current
+            self._total_s[slot] = self._current[self._sync_mask].sum()
+            self._stamps[slot] = time.time()
+            self.count += 1
+            self._open = None
+
+    def summary(self, fps_window=5.0):
+        """Return {'frames', 'fps', 'p50_ms', 'p99_ms', 'phases': {name: (p50_ms, p99_ms)}}."""
+        with self._lock:
+            n = min(self.count, self.capacity)
+            totals = self._total_s[:n].copy()
+            phase_s = self._phase_s[:n].copy()
+            stamps = self._stamps[:n].copy()
+        if n == 0:
+            return {'frames': 0, 'fps': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'phases': {}}
+        recent = np.count_nonzero(stamps >= time.time() - fps_window)
+        p50, p99 = np.percentile(totals, [50, 99]) * 1000
+        phases = {}
+        for name, col in zip(self.phases, (phase_s * 1000).T):
+            lo, hi = np.percentile(col, [50, 99])
+            phases[name] = (lo, hi)
+        return {'frames': self.count, 'fps': recent / fps_window, 'p50_ms': p50, 'p99_ms': p99,
+                'phases': phases}
+
+    def format_lines(self):
+        """Short text lines for the on-screen overlay."""
+        s = self.summary()
+        return [
+            f"p50 {s['p50_ms']:.1f} ms  p99 {s['p99_ms']:.1f} ms",
+            f"{s['fps']:.1f} fps  ({s['frames']} frames)",
+        ]
+
+    def dump(self, logger):
+        """Log the frame time summary and per-phase percentiles."""
+        s = self.summary()
+        logger.info(f"Frame stats: {s['frames']} frames, {s['fps']:.1f} fps, "
+                    f"p50 {s['p50_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms")
+        for name, (p50, p99) in s['phases'].items():
+            suffix = ' (async)' if name in self.async_phases else ''
+            logger.info(f"  {name:<14} p50 {p50:7.2f} ms  p99 {p99:7.2f} ms{suffix}")
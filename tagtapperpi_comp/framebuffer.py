@@ -0,0 +1,398 @@
+"""Direct framebuffer output shared by app.py and calibrate_touch.py.
+
+Frames are pygame Surfaces at the framebuffer's native size. Surfaces
+created with `FramebufferWriter.create_surface()` already use the
+framebuffer's pixel layout (RGB565, BGR565, XRGB8888, ...) and are copied
+without conversion; any other surface is converted with NumPy into
+preallocated scratch buffers, so steady-state frames do not allocate
+pixel-sized temporaries.
+"""
+import logging
+import mmap
+import os
+import struct
+import fcntl
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    import pygame
+except Exception:
+    pygame = None
+
+log = logging.getLogger(__name__)
+
+# Linux framebuffer ioctls (linux/fb.h)
+FBIOGET_VSCREENINFO = 0x4600
+FBIOGET_FSCREENINFO = 0x4602
+FBIOPAN_DISPLAY = 0x4606
+# struct fb_var_screeninfo is 40 __u32 fields
+FB_VAR_FORMAT = '40I'
+# struct fb_fix_screeninfo (native alignment; unsigned long fields follow the ABI)
+FB_FIX_FORMAT = '16sLIIIIHHHILIIHHH'
+
+# Geometry and pixel layout of a framebuffer. Channels are (offset, length) in bits.
+FramebufferInfo = namedtuple('FramebufferInfo', [
+    'width', 'height', 'virtual_height', 'bpp', 'line_length', 'red', 'green', 'blue',
+])
+
+
+def rgb565_info(width, height):
+    """FramebufferInfo for a packed little-endian RGB565 screen of the given size."""
+    return FramebufferInfo(width, height, height, 16, width * 2, (11, 5), (5, 6), (0, 5))
+
+
+def read_fb_info(fb):
+    """Query geometry and pixel layout of the open framebuffer `fb`.
+
+    Returns (FramebufferInfo, raw var screeninfo fields), or (None, None)
+    if the file does not answer the framebuffer ioctls.
+    """
+    # Spare room: the kernel may pad the fix struct beyond what struct reports
+    var_buf = bytearray(struct.calcsize(FB_VAR_FORMAT))
+    fix_buf = bytearray(struct.calcsize(FB_FIX_FORMAT) + 8)
+    try:
+        fcntl.ioctl(fb, FBIOGET_VSCREENINFO, var_buf)
+        fcntl.ioctl(fb, FBIOGET_FSCREENINFO, fix_buf)
+    except OSError as e:
+        log.info(f"Framebuffer ioctls unavailable: {e}")
+        return None, None
+    var = struct.unpack(FB_VAR_FORMAT, var_buf)
+    fix = struct.unpack_from(FB_FIX_FORMAT, fix_buf)
+    info = FramebufferInfo(
+        width=var[0],
+        height=var[1],
+        virtual_height=var[3],
+        bpp=var[6],
+        line_length=fix[9] or var[0] * var[6] // 8,
+        red=(var[8], var[9]),
+        green=(var[11], var[12]),
+        blue=(var[14], var[15]),
+    )
+    return info, list(var)
+
+
+def format_name(info):
+    """Human readable pixel format, e.g. RGB565, BGR565 or XRGB8888."""
+    channels = sorted([('R', info.red), ('G', info.green), ('B', info.blue)], key=lambda c: -c[1][0])
+    name = ''.join(c[0] for c in channels)
+    lengths = ''.join(str(c[1][1]) for c in channels)
+    if info.bpp > sum(c[1][1] for c in channels):
+        name = 'X' + name
+        lengths = str(info.bpp - sum(c[1][1] for c in channels)) + lengths
+    return name + lengths
+
+
+def get_fb_size(fbdev='/dev/fb1', default=(800, 480)):
+    """Get framebuffer size from sysfs, or `default` if it cannot be read."""
+    try:
+        base = '/sys/class/graphics/' + os.path.basename(fbdev)
+        vs = os.path.join(base, 'virtual_size')
+        if os.path.exists(vs):
+            with open(vs, 'r') as f:
+                s = f.read().strip()
+            w, h = s.split(',') if ',' in s else s.split('x')
+            return int(w), int(h)
+        modes = os.path.join(base, 'modes')
+        if os.path.exists(modes):
+            with open(modes, 'r') as f:
+                line = f.readline().strip()
+            if line and 'x' in line:
+                w, h = line.split('x')[:2]
+                return int(w), int(h)
+    except Exception as e:
+        log.info(f"Couldn't read fb size: {e}")
+    return default
+
+
+class FramebufferWriter:
+    """Direct framebuffer writer honouring the device's geometry and pixel format.
+
+    Geometry, stride (`line_length`), depth and channel offsets come from
+    FBIOGET_VSCREENINFO/FBIOGET_FSCREENINFO. If the device does not answer
+    them, `info` (or an RGB565 screen of the sysfs size) is used instead.
+    """
+
+    def __init__(self, fbdev='/dev/fb1', default_size=(800, 480), info=None):
+        self.fbdev = fbdev
+        self.fb = open(self.fbdev, 'r+b', buffering=0)
+        var = None
+        if info is None:
+            info, var = read_fb_info(self.fb)
+        if info is None:
+            info = rgb565_info(*get_fb_size(fbdev, default_size))
+        self.info = info
+        self.width, self.height = info.width, info.height
+        self.bpp = info.bpp
+        self.bytes_per_pixel = (info.bpp + 7) // 8
+        self.line_length = info.line_length
+        self.masks = tuple(((1 << length) - 1) << offset for offset, length in (info.red, info.green, info.blue)) + (0,)
+        # Pages > 1 means a double-height virtual screen usable for page flips
+        self.pages = 1
+        self.var_info = None
+        if var is not None and info.virtual_height >= 2 * info.height:
+            self.pages = 2
+            self.var_info = var
+        self.page_bytes = self.line_length * self.height
+        self.size_bytes = self.page_bytes * self.pages
+        self.mm = mmap.mmap(self.fb.fileno(), self.size_bytes, access=mmap.ACCESS_WRITE)
+        # Writable (rows x bytes-per-line) view of the mapping for partial updates
+        self.fb_bytes = np.frombuffer(self.mm, dtype=np.uint8).reshape(self.height * self.pages, self.line_length)
+        # Per-pixel view and scratch planes for converting non-native surfaces
+        self.fb_pixels = None
+        self._scratch = None
+        # Optional FrameStats receiving 'convert' and 'write' phase timings
+        self.stats = None
+        dtype = {16: np.uint16, 32: np.uint32}.get(self.bpp)
+        if dtype is not None and self.line_length % self.bytes_per_pixel == 0:
+            self.fb_pixels = self.fb_bytes.view(dtype)
+            self._scratch = np.empty((2, self.height, self.width), dtype=dtype)
+        log.info(f"Opened framebuffer {self.fbdev} for direct writing")
+        log.info(f"Framebuffer {self.width}x{self.height} {format_name(info)}, "
+                 f"stride {self.line_length}, pages: {self.pages}")
+
+    def pan_to(self, page):
+        """Show `page` by panning the display (yoffset). Returns False if the driver refuses."""
+        if self.var_info is None:
+            return False
+        var = list(self.var_info)
+        var[5] = page * self.height  # yoffset
+        try:
+            fcntl.ioctl(self.fb, FBIOPAN_DISPLAY, struct.pack(FB_VAR_FORMAT, *var))
+        except OSError as e:
+            log.warning(f"Framebuffer panning failed, falling back to single page: {e}")
+            self.var_info = None
+            return False
+        return True
+
+    def close(self):
+        # Drop the NumPy views first; mmap refuses to close while they are exported
+        self.fb_pixels = None
+        self.fb_bytes = None
+        try:
+            if self.mm:
+                self.mm.flush()
+                self.mm.close()
+        finally:
+            try:
+                self.fb.close()
+            except Exception:
+                pass
+
+    def create_surface(self):
+        """Return a render surface in the framebuffer's native size and pixel format.
+
+        Frames drawn into it are copied to the framebuffer without conversion.
+        """
+        return pygame.Surface((self.width, self.height), 0, self.bpp, self.masks)
+
+    def is_native(self, surface):
+        """True if `surface` already has the framebuffer's pixel format."""
+        return surface.get_bitsize() == self.bpp and surface.get_masks()[:3] == self.masks[:3]
+
+    def blit_surface(self, surface, rects=None, page=0, frame=None):
+        """Copy a pygame Surface of the framebuffer's size to the framebuffer.
+
+        `rects` limits the update to the given dirty regions; None pushes
+        the whole frame and an empty list pushes nothing. Native surfaces
+        (see `create_surface`) are copied without conversion.
+        `page` selects the target page on double-height framebuffers;
+        `frame` is the FrameStats id the convert/write times are booked on.
+        """
+        if surface.get_size() != (self.width, self.height):
+            raise ValueError(f"Surface size {surface.get_size()} does not match "
+                             f"framebuffer {self.width}x{self.height}")
+
+        bounds = pygame.Rect(0, 0, self.width, self.height)
+        if self.is_native(surface):
+            self._copy_native(surface, bounds, rects, page, frame)
+            return
+        if self.fb_pixels is None:
+            raise ValueError(f"Cannot convert surfaces to {self.bpp} bpp; use create_surface()")
+        if rects is None:
+            rects = [bounds]
+        for rect in rects:
+            region = bounds.clip(rect)
+            if region.width and region.height:
+                self._blit_region(surface, region, page, frame)
+        # No need to flush every frame; keep performance reasonable
+
+    def _copy_native(self, surface, bounds, rects, page=0, frame=None):
+        """Copy pixels straight from the surface buffer into the mmap."""
+        t0 = time.perf_counter()
+        buf = surface.get_buffer()
+        if rects is None and surface.get_pitch() == self.line_length:
+            # Identical layout: the whole frame is one memory copy
+            offset = page * self.page_bytes
+            self.mm[offset:offset + buf.length] = buf
+            if self.stats is not None:
+                self.stats.add('write', time.perf_counter() - t0, frame)
+            return
+        bpp = self.bytes_per_pixel
+        src = np.frombuffer(buf, dtype=np.uint8).reshape(self.height, surface.get_pitch())
+        top = page * self.height
+        for rect in ([bounds] if rects is None else rects):
+            region = bounds.clip(rect)
+            if region.width and region.height:
+                cols = slice(region.left * bpp, region.right * bpp)
+                self.fb_bytes[top + region.top:top + region.bottom, cols] = src[region.top:region.bottom, cols]
+        if self.stats is not None:
+            self.stats.add('write', time.perf_counter() - t0, frame)
+
+    def _blit_region(self, surface, region, page=0, frame=None):
+        """Convert one rectangle to the framebuffer format and store it at the row stride."""
+        t0 = time.perf_counter()
+        cols = slice(region.left, region.right)
+        rows = slice(region.top, region.bottom)
+        try:
+            # (width, height, 3) view of the surface pixels, no copy
+            px = pygame.surfarray.pixels3d(surface)[cols, rows]
+        except ValueError:
+            # Surfaces without an RGB view (e.g. palette): go through a copy
+            rgb = pygame.image.tostring(surface.subsurface(region), 'RGB')
+            px = np.frombuffer(rgb, dtype=np.uint8).reshape(region.height, region.width, 3).swapaxes(0, 1)
+        h, w = region.height, region.width
+        acc = self._scratch[0, :h, :w]
+        tmp = self._scratch[1, :h, :w]
+        # Pack each 8-bit channel at its offset/length, in place in the scratch planes
+        for i, (offset, length) in enumerate((self.info.red, self.info.green, self.info.blue)):
+            dst = acc if i == 0 else tmp
+            np.copyto(dst, px[:, :, i].T)
+            if length < 8:
+                np.right_shift(dst, 8 - length, out=dst)
+            if offset:
+                np.left_shift(dst, offset, out=dst)
+            if i:
+                np.bitwise_or(acc, tmp, out=acc)
+        del px
+        t1 = time.perf_counter()
+        # Single store into the mmap view; slicing honours line_length per row
+        top = page * self.height
+        self.fb_pixels[top + region.top:top + region.bottom, cols] = acc
+        if self.stats is not None:
+            self.stats.add('convert', t1 - t0, frame)
+            self.stats.add('write', time.perf_counter() - t1, frame)
+
+
+class FramebufferPresenter:
+    """Pushes rendered frames to a FramebufferWriter on its own thread.
+
+    `present()` copies the damaged areas of the frame into one of two back
+    buffers and returns immediately, so input handling never waits on pixel pushing. A frame
+    still waiting when the next one arrives is dropped and its damage is
+    merged into the newer frame. On double-height framebuffers frames are
+    written to the hidden page and shown by panning (tear-free flips).
+    """
+
+    def __init__(self, writer, surface):
+        self.writer = writer
+        self.buffers = [surface.copy(), surface.copy()]
+        # Per back buffer: areas changed by frames it has not received yet
+        # (None = the whole buffer is out of date)
+        self._stale = [[], []]
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self._pending = None
+        self._pending_rects = None
+        self._pending_frame = None
+        self._writing = None
+        self._stopping = False
+        # Page flipping state: shown page and damage last written to it
+        self._shown_page = 0
+        self._last_rects = None
+        self._thread = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Write any pending frame, then stop the presenter thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            try:
+                self._thread.join(timeout=timeout)
+            except Exception:
+                pass
+
+    def present(self, surface, rects=None, frame=None):
+        """Queue `surface` with its dirty `rects` (None = full frame) for display.
+
+        `frame` is the FrameStats id the writer's convert/write times belong to.
+        """
+        if rects is not None and not rects:
+            return
+        with self._cond:
+            if self._pending is not None:
+                # Renderer is ahead: replace the stale frame, keep its damage
+                idx = self._pending
+                self.dropped += 1
+                if rects is not None and self._pending_rects is not None:
+                    rects = self._pending_rects + list(rects)
+                else:
+                    rects = None
+            else:
+                idx = 1 if self._writing == 0 else 0
+            # Copy only what changed since this buffer last received a frame
+            stale = self._stale[idx]
+            if rects is None or stale is None:
+                self.buffers[idx].blit(surface, (0, 0))
+            else:
+                buf = self.buffers[idx]
+                for r in stale + list(rects):
+                    r = pygame.Rect(r)
+                    buf.blit(surface, r.topleft, r)
+            self._stale[idx] = []
+            other = 1 - idx
+            if rects is None or self._stale[other] is None:
+                self._stale[other] = None
+            else:
+                self._stale[other].extend(rects)
+            self._pending = idx
+            self._pending_rects = rects
+            self._pending_frame = frame
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._stopping:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                idx, rects, frame = self._pending, self._pending_rects, self._pending_frame
+                self._pending = None
+                self._writing = idx
+            try:
+                self._write(self.buffers[idx], rects, frame)
+            except Exception as e:
+                log.error(f"Framebuffer presenter error: {e}")
+            with self._cond:
+                self._writing = None
+
+    def _write(self, buf, rects, frame=None):
+        writer = self.writer
+        if writer.pages < 2 or writer.var_info is None:
+            writer.blit_surface(buf, rects, page=self._shown_page, frame=frame)
+            return
+        # The hidden page still shows the frame before last: bring it up to
+        # date with this frame's damage plus the damage of the previous flip
+        hidden = 1 - self._shown_page
+        if rects is None or self._last_rects is None:
+            damage = None
+        else:
+            damage = list(rects) + self._last_rects
+        writer.blit_surface(buf, damage, page=hidden, frame=frame)
+        if writer.pan_to(hidden):
+            self._shown_page = hidden
+            self._last_rects = None if rects is None else list(rects)
+        else:
+            # Panning unsupported after all: draw onto the page still shown
+            writer.blit_surface(buf, None, page=self._shown_page, frame=frame)
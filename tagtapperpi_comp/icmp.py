@@ -0,0 +1,175 @@
+"""Concurrent ICMP echo probes without spawning `ping`.
+
+`IcmpEngine.probe()` opens one ICMP socket per interface (unprivileged
+datagram socket where allowed, raw socket otherwise), pins it to the
+interface with SO_BINDTODEVICE like `ping -I`, sends an echo request to
+every target up front and collects the replies in a single select loop.
+A whole interface x target matrix therefore completes within one timeout.
+"""
+import errno
+import logging
+import os
+import select
+import socket
+import struct
+import time
+
+log = logging.getLogger(__name__)
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_HDR = struct.Struct('!BBHHH')  # type, code, checksum, identifier, sequence
+SO_BINDTODEVICE = getattr(socket, 'SO_BINDTODEVICE', 25)
+PAYLOAD = b'tag-tapper-pi...'
+
+
+def checksum(data):
+    """RFC 1071 Internet checksum."""
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def echo_request(ident, seq, payload=PAYLOAD):
+    header = ICMP_HDR.pack(ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    return ICMP_HDR.pack(ICMP_ECHO_REQUEST, 0, checksum(header + payload), ident, seq) + payload
+
+
+def resolve(host):
+    """Return the IPv4 address for `host`, or None."""
+    try:
+        socket.inet_aton(host)
+        return host
+    except OSError:
+        pass
+    try:
+        return socket.gethostbyname(host)
+    except OSError:
+        return None
+
+
+class IcmpEngine:
+    """Sends ICMP echo probes for many (interface, host) pairs at once."""
+
+    def __init__(self, timeout=2.0):
+        self.timeout = timeout
+        self._ident = os.getpid() & 0xFFFF
+        self._seq = 0
+
+    def _next_seq(self):
+        self._seq = (self._seq + 1) & 0xFFFF
+        return self._seq
+
+    def open_socket(self, iface):
+        """Return (socket, is_raw) bound to `iface`.
+
+        Raises OSError if neither a datagram nor a raw ICMP socket can be
+        opened and bound (ENODEV if the interface does not exist).
+        """
+        error = None
+        for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+            except OSError as e:
+                error = e
+                continue
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, iface.encode('utf-8') + b'\0')
+            except OSError as e:
+                sock.close()
+                if e.errno == errno.ENODEV:
+                    raise
+                error = e
+                continue
+            sock.setblocking(False)
+            return sock, kind == socket.SOCK_RAW
+        raise error
+
+    def probe(self, pairs, timeout=None):
+        """Probe every (iface, host) pair once, concurrently.
+
+        Returns {(iface, host): rtt in seconds, or None if lost/unreachable}.
+        Pairs whose interface could not get an ICMP socket for lack of
+        privileges are left out so the caller can fall back to `ping`.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        results = {}
+        by_iface = {}
+        for iface, host in pairs:
+            by_iface.setdefault(iface, []).append(host)
+
+        socks = {}     # fileno -> (socket, is_raw)
+        pending = {}   # (fileno, seq) -> (pair, address, send time)
+        try:
+            for iface, hosts in by_iface.items():
+                try:
+                    sock, is_raw = self.open_socket(iface)
+                except OSError as e:
+                    if e.errno == errno.ENODEV:
+                        for host in hosts:
+                            results[(iface, host)] = None
+                    else:
+                        log.debug(f"No ICMP socket for {iface}: {e}")
+                    continue
+                socks[sock.fileno()] = (sock, is_raw)
+                for host in hosts:
+                    pair = (iface, host)
+                    addr = resolve(host)
+                    if addr is None:
+                        results[pair] = None
+                        continue
+                    seq = self._next_seq()
+                    try:
+                        sock.sendto(echo_request(self._ident, seq), (addr, 0))
+                    except OSError:
+                        # e.g. ENETUNREACH: no route to the target via this interface
+                        results[pair] = None
+                        continue
+                    pending[(sock.fileno(), seq)] = (pair, addr, time.monotonic())
+
+            deadline = time.monotonic() + timeout
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                waiting = {fd for fd, _ in pending}
+                ready, _, _ = select.select([socks[fd][0] for fd in waiting], [], [], remaining)
+                for sock in ready:
+                    self._drain(sock, socks[sock.fileno()][1], pending, results)
+        finally:
+            for sock, _ in socks.values():
+                sock.close()
+
+        for pair, _, _ in pending.values():
+            results[pair] = None
+        return results
+
+    def _drain(self, sock, is_raw, pending, results):
+        fd = sock.fileno()
+        while True:
+            try:
+                data, (src, _) = sock.recvfrom(2048)
+            except BlockingIOError:
+                return
+            except OSError:
+                # Asynchronous ICMP errors surface here; the probe simply times out
+                continue
+            now = time.monotonic()
+            if is_raw:
+                # Raw sockets deliver the IP header as well
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < ICMP_HDR.size:
+                continue
+            kind, _code, _csum, ident, seq = ICMP_HDR.unpack_from(data)
+            # Datagram sockets get their identifier rewritten by the kernel
+            if kind != ICMP_ECHO_REPLY or (is_raw and ident != self._ident):
+                continue
+            entry = pending.get((fd, seq))
+            if entry is None or entry[1] != src:
+                continue
+            pair, _, sent = entry
+            results[pair] = now - sent
+            del pending[(fd, seq)]
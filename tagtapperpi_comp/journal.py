@@ -0,0 +1,64 @@
+import gzip
+import json
+import logging
+import os
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class Journal:
+    """Append-only JSON lines file with batched fsync.
+
+    `append()` only buffers; `sync()` (called about once a second by the
+    owner) pushes everything written since the last call to the SD card
+    with a single fsync. A power cut therefore loses at most the entries
+    of the last interval, and a torn last line is skipped by `read()`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._dirty = False
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + '\n')
+            self._dirty = True
+
+    def sync(self):
+        """Flush and fsync pending entries (no-op if nothing was appended)."""
+        with self._lock:
+            if self._file is None or not self._dirty:
+                return
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._dirty = False
+            except OSError as e:
+                log.error(f"Journal sync failed for {self.path}: {e}")
+
+    def close(self):
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def read(path):
+        """Return the entries of a journal file (plain or archived .gz), skipping unreadable lines."""
+        entries = []
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Torn write from a power cut
+                    continue
+        return entries
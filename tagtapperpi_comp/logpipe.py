@@ -0,0 +1,192 @@
+"""Non-blocking logging pipeline.
+
+Logging calls in the render loop, the touch thread and the probe threads
+only create a record and put it on a bounded queue; message formatting,
+rate limiting and file output happen on a listener thread:
+
+    logger -> QueueHandler (no formatting) -> queue -> QueueListener
+                                                       +-> RingBufferHandler (last N records, RAM)
+                                                       +-> RateLimitedHandler -> file/stderr
+
+The ring buffer keeps every record, also the ones rate limiting keeps
+out of the file, and `dump_ring()` (SIGUSR2 in the app) writes it out.
+Use lazy %-style arguments (`log.debug("x=%s", x)`) on hot paths so
+disabled levels cost a level check and enabled ones no formatting in the
+calling thread.
+"""
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from tagtapperpi_comp.storage import atomic_write
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock `prepare()` merges message and arguments in the caller;
+    here only exception info is rendered eagerly (tracebacks cannot cross
+    threads safely). A full queue drops the record and counts it.
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+        self._exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` records in RAM; formats them only when dumped."""
+
+    def __init__(self, capacity=5000):
+        super().__init__()
+        self.records = collections.deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def dump(self, path):
+        """Write the buffered records to `path`. Returns the number written."""
+        with self.lock:
+            records = list(self.records)
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                lines.append(f"<unformattable record from {record.pathname}:{record.lineno}>")
+        atomic_write(path, ("\n".join(lines) + "\n").encode('utf-8'))
+        return len(records)
+
+
+class RateLimitedHandler(logging.Handler):
+    """Passes at most `burst` records per call site and `period` seconds to `target`.
+
+    A call site is the (file, line) of the logging call. When a site is let
+    through again, a summary line reports how many records were dropped.
+    """
+
+    def __init__(self, target, burst=20, period=10.0):
+        super().__init__()
+        self.target = target
+        self.burst = burst
+        self.period = period
+        self._sites = {}  # (pathname, lineno) -> [window start, count, suppressed]
+
+    def emit(self, record):
+        now = time.monotonic()
+        site = self._sites.get((record.pathname, record.lineno))
+        if site is None or now - site[0] >= self.period:
+            suppressed = site[2] if site else 0
+            site = self._sites[(record.pathname, record.lineno)] = [now, 0, 0]
+            if suppressed:
+                self.target.handle(logging.makeLogRecord({
+                    'name': record.name, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': "Rate limit: suppressed %d messages from %s:%d",
+                    'args': (suppressed, os.path.basename(record.pathname), record.lineno),
+                }))
+        if site[1] >= self.burst:
+            site[2] += 1
+            return
+        site[1] += 1
+        self.target.handle(record)
+
+    def flush(self):
+        self.target.flush()
+
+    def close(self):
+        self.target.close()
+        super().close()
+
+
+class LogPipeline:
+    """Owns the queue, the listener thread and the handlers behind it."""
+
+    def __init__(self, output, ring_size=5000, queue_size=10000, burst=20, period=10.0):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.queue_handler = _DeferredQueueHandler(self.queue)
+        formatter = logging.Formatter(FORMAT)
+        self.ring = RingBufferHandler(ring_size)
+        self.ring.setFormatter(formatter)
+        if output.formatter is None:
+            output.setFormatter(formatter)
+        self.output = RateLimitedHandler(output, burst=burst, period=period)
+        self.listener = logging.handlers.QueueListener(self.queue, self.ring, self.output,
+                                                       respect_handler_level=True)
+        self._dump_lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self.listener.start()
+
+    def stop(self):
+        """Drain the queue, stop the listener thread and let records logged
+        afterwards (shutdown errors) go straight to the output handler."""
+        if not self._running:
+            return
+        self._running = False
+        root = logging.getLogger()
+        if self.queue_handler in root.handlers:
+            root.addHandler(self.output.target)
+            root.removeHandler(self.queue_handler)
+        try:
+            self.listener.stop()
+        except Exception:
+            pass
+        self.output.flush()
+
+    def dump_ring(self, path):
+        """Write the ring buffer to `path` (safe to call from any thread)."""
+        with self._dump_lock:
+            n = self.ring.dump(path)
+        logging.getLogger(__name__).info("Dumped %d log records to %s (%d dropped on a full queue)",
+                                         n, path, self.queue_handler.dropped)
+        return n
+
+
+_pipeline = None
+
+
+def setup_logging(output, level=logging.INFO, **kwargs):
+    """Route the root logger through a LogPipeline writing to `output`.
+
+    Like `logging.basicConfig()`, does nothing if the root logger already
+    has handlers (e.g. a script configured logging before importing the
+    app). Returns the pipeline or None.
+    """
+    global _pipeline
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+    _pipeline = LogPipeline(output, **kwargs)
+    root.addHandler(_pipeline.queue_handler)
+    root.setLevel(level)
+    _pipeline.start()
+    atexit.register(_pipeline.stop)
+    return _pipeline
+
+
+def get_pipeline():
+    """Return the pipeline installed by setup_logging(), or None."""
+    return _pipeline
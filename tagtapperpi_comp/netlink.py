@@ -0,0 +1,231 @@
+"""Event-driven view of network interfaces via rtnetlink.
+
+`InterfaceMonitor` subscribes to the RTMGRP_LINK and RTMGRP_IPV4_IFADDR
+multicast groups, seeds its table with RTM_GETLINK/RTM_GETADDR dumps and
+then applies the link/address messages the kernel pushes. Consumers read
+`snapshot()` or register a callback with `subscribe()`; no processes are
+spawned.
+"""
+import logging
+import os
+import socket
+import struct
+import threading
+
+log = logging.getLogger(__name__)
+
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+
+IFLA_IFNAME = 3
+IFLA_OPERSTATE = 16
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+IF_OPER_UP = 6
+
+NLMSG_HDR = struct.Struct('=IHHII')   # len, type, flags, seq, pid
+IFINFOMSG = struct.Struct('=BxHiII')  # family, type, index, flags, change
+IFADDRMSG = struct.Struct('=BBBBI')   # family, prefixlen, flags, scope, index
+RTATTR = struct.Struct('=HH')         # len, type
+
+
+def _align(n):
+    return (n + 3) & ~3
+
+
+def _parse_attrs(data, offset):
+    """Return {type: payload bytes} for the rtattrs starting at `offset`."""
+    attrs = {}
+    while offset + RTATTR.size <= len(data):
+        length, kind = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        attrs[kind] = data[offset + RTATTR.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def _iter_messages(data):
+    """Yield (type, payload) for each netlink message in a datagram."""
+    offset = 0
+    while offset + NLMSG_HDR.size <= len(data):
+        length, kind, _flags, _seq, _pid = NLMSG_HDR.unpack_from(data, offset)
+        if length < NLMSG_HDR.size:
+            break
+        yield kind, data[offset + NLMSG_HDR.size:offset + length]
+        offset += _align(length)
+
+
+class InterfaceMonitor:
+    """In-memory table of links (name, operstate) and IPv4 addresses kept current by rtnetlink."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = {}   # {ifindex: name}
+        self._oper = {}    # {ifindex: operstate}
+        self._addrs = {}   # {ifindex: ['a.b.c.d/prefix', ...]} in kernel order
+        self._subscribers = []
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._seq = 0
+        # Bumped on every applied change
+        self.version = 0
+
+    def start(self):
+        """Subscribe to link/address events and load the current state.
+
+        Raises OSError if rtnetlink is unavailable (non-Linux, sandbox).
+        """
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        # Subscribe before dumping so no change between dump and listen is lost
+        sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR))
+        self._sock = sock
+        self.resync()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        try:
+            if self._sock:
+                self._sock.close()
+        except Exception:
+            pass
+
+    def subscribe(self, callback):
+        """Call `callback()` from the monitor thread after each batch of changes."""
+        self._subscribers.append(callback)
+
+    def snapshot(self):
+        """Return (ifaces, ips, ups): names in ifindex order, {name: 'ip/prefix' or None}, {name: bool}."""
+        with self._lock:
+            order = sorted(self._names)
+            ifaces = [self._names[i] for i in order]
+            ips = {self._names[i]: (self._addrs.get(i) or [None])[0] for i in order}
+            ups = {self._names[i]: self._oper.get(i) == IF_OPER_UP for i in order}
+        return ifaces, ips, ups
+
+    def resync(self):
+        """Reload the whole table with link and address dumps."""
+        names, oper, addrs = {}, {}, {}
+        for kind, payload in self._dump(RTM_GETLINK, IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)):
+            self._apply_link(kind, payload, names, oper, addrs)
+        for kind, payload in self._dump(RTM_GETADDR, IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)):
+            self._apply_addr(kind, payload, addrs)
+        with self._lock:
+            self._names, self._oper, self._addrs = names, oper, addrs
+            self.version += 1
+        self._notify()
+
+    def _dump(self, kind, body):
+        """Run one NLM_F_DUMP request on a private socket and return its messages."""
+        self._seq += 1
+        msgs = []
+        with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+            sock.bind((0, 0))
+            hdr = NLMSG_HDR.pack(NLMSG_HDR.size + len(body), kind, NLM_F_REQUEST | NLM_F_DUMP, self._seq, 0)
+            sock.send(hdr + body)
+            while True:
+                data = sock.recv(65536)
+                for msg_kind, payload in _iter_messages(data):
+                    if msg_kind == NLMSG_DONE:
+                        return msgs
+                    if msg_kind == NLMSG_ERROR:
+                        errno = -struct.unpack_from('=i', payload)[0]
+                        if errno:
+                            raise OSError(errno, os.strerror(errno))
+                        return msgs
+                    msgs.append((msg_kind, payload))
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                data = self._sock.recv(65536)
+            except OSError as e:
+                if self._stop.is_set():
+                    return
+                if e.errno == 105:  # ENOBUFS: events were dropped, reload everything
+                    log.warning("rtnetlink buffer overrun, resyncing interface table")
+                    try:
+                        self.resync()
+                    except OSError as e2:
+                        log.error(f"rtnetlink resync failed: {e2}")
+                    continue
+                log.error(f"rtnetlink monitor stopped: {e}")
+                return
+            changed = False
+            with self._lock:
+                for kind, payload in _iter_messages(data):
+                    if kind in (RTM_NEWLINK, RTM_DELLINK):
+                        changed |= self._apply_link(kind, payload, self._names, self._oper, self._addrs)
+                    elif kind in (RTM_NEWADDR, RTM_DELADDR):
+                        changed |= self._apply_addr(kind, payload, self._addrs)
+                if changed:
+                    self.version += 1
+            if changed:
+                self._notify()
+
+    @staticmethod
+    def _apply_link(kind, payload, names, oper, addrs):
+        if len(payload) < IFINFOMSG.size:
+            return False
+        _family, _type, index, _flags, _change = IFINFOMSG.unpack_from(payload)
+        if kind == RTM_DELLINK:
+            existed = index in names
+            names.pop(index, None)
+            oper.pop(index, None)
+            addrs.pop(index, None)
+            return existed
+        attrs = _parse_attrs(payload, IFINFOMSG.size)
+        before = (names.get(index), oper.get(index))
+        if IFLA_IFNAME in attrs:
+            names[index] = attrs[IFLA_IFNAME].split(b'\0', 1)[0].decode('utf-8', 'replace')
+        if IFLA_OPERSTATE in attrs:
+            oper[index] = attrs[IFLA_OPERSTATE][0]
+        return (names.get(index), oper.get(index)) != before
+
+    @staticmethod
+    def _apply_addr(kind, payload, addrs):
+        if len(payload) < IFADDRMSG.size:
+            return False
+        family, prefixlen, _flags, _scope, index = IFADDRMSG.unpack_from(payload)
+        if family != socket.AF_INET:
+            return False
+        attrs = _parse_attrs(payload, IFADDRMSG.size)
+        raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+        if not raw or len(raw) != 4:
+            return False
+        addr = f"{socket.inet_ntoa(raw)}/{prefixlen}"
+        current = addrs.setdefault(index, [])
+        if kind == RTM_NEWADDR:
+            if addr in current:
+                return False
+            current.append(addr)
+            return True
+        if addr in current:
+            current.remove(addr)
+            return True
+        return False
+
+    def _notify(self):
+        for callback in list(self._subscribers):
+            try:
+                callback()
+            except Exception as e:
+                log.error(f"Interface monitor subscriber failed: {e}")
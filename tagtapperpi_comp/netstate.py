@@ -0,0 +1,215 @@
+"""Shared network state service.
+
+One collector (the rtnetlink `InterfaceMonitor`, or `ip` polling where
+netlink is unavailable) publishes immutable, versioned `NetSnapshot`s.
+Tabs, the session reporter and scripts read `snapshot()` or subscribe
+instead of querying the system themselves, so every view agrees.
+SSIDs of wireless interfaces are re-read on link events and otherwise
+every `ssid_ttl` seconds (roaming does not always change the link).
+"""
+import logging
+import re
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from tagtapperpi_comp.netlink import InterfaceMonitor
+from tagtapperpi_comp.wireless import get_ssid
+
+log = logging.getLogger(__name__)
+
+# ifaces: names in ifindex order; ips: {name: 'a.b.c.d/prefix' or None}; ups: {name: bool};
+# ssids: {wireless name: SSID or None}
+NetSnapshot = namedtuple('NetSnapshot', ['version', 'timestamp', 'ifaces', 'ips', 'ups', 'ssids'])
+
+EMPTY_SNAPSHOT = NetSnapshot(0, 0.0, (), MappingProxyType({}), MappingProxyType({}), MappingProxyType({}))
+
+
+def is_wireless(name):
+    return name.startswith('wlan') or name.startswith('wl')
+
+
+def ordered_interfaces(ifaces):
+    """Display order used by the panels and reports: eth0, VLANs by id, then wlan*."""
+    candidates = []
+    if 'eth0' in ifaces:
+        candidates.append('eth0')
+
+    def vlan_key(name):
+        try:
+            return int(name.split('.')[-1])
+        except Exception:
+            return 0
+    for n in sorted((n for n in ifaces if '.' in n), key=vlan_key):
+        candidates.append(n)
+
+    for n in sorted(ifaces):
+        if is_wireless(n):
+            if n not in candidates:
+                candidates.append(n)
+    return candidates
+
+
+def _ip_interfaces():
+    out = subprocess.check_output(['ip', '-o', 'link', 'show']).decode('utf-8')
+    names = []
+    for line in out.splitlines():
+        parts = line.split(':', 2)
+        if len(parts) >= 2:
+            names.append(parts[1].strip().split('@')[0])
+    return names
+
+
+def _ip_address(iface):
+    try:
+        out = subprocess.check_output(['ip', '-o', '-4', 'addr', 'show', 'dev', iface]).decode('utf-8')
+        m = re.search(r'\binet (\S+)', out)
+        if m:
+            return m.group(1)
+    except subprocess.CalledProcessError:
+        return None
+    return None
+
+
+def _ip_is_up(iface):
+    # Operational state UP, e.g. '2: eth0: <BROADCAST,...> mtu 1500 ... state DOWN mode DEFAULT ...'
+    try:
+        out = subprocess.check_output(['ip', '-o', 'link', 'show', 'dev', iface]).decode('utf-8')
+        m = re.search(r'\bstate\s+(\w+)', out)
+        if m:
+            return m.group(1).upper() == 'UP'
+    except subprocess.CalledProcessError:
+        return False
+    return False
+
+
+def collect_interfaces(monitor=None):
+    """Return (ifaces, ips, ups) from `monitor`, a one-off rtnetlink dump, or `ip` as a last resort."""
+    if monitor is None:
+        try:
+            monitor = InterfaceMonitor()
+            monitor.resync()
+        except Exception:
+            monitor = None
+    if monitor is not None:
+        return monitor.snapshot()
+    try:
+        ifaces = _ip_interfaces()
+    except Exception:
+        ifaces = []
+    ips = {iface: _ip_address(iface) for iface in ifaces}
+    ups = {iface: _ip_is_up(iface) for iface in ifaces}
+    return ifaces, ips, ups
+
+
+def collect_ssids(ifaces, ups):
+    """Return {name: SSID or None} for the wireless interfaces in `ifaces`."""
+    return {n: (get_ssid(n) if ups.get(n) else None) for n in ifaces if is_wireless(n)}
+
+
+def _make_snapshot(version, ifaces, ips, ups, ssids):
+    return NetSnapshot(version, time.time(), tuple(ifaces), MappingProxyType(dict(ips)),
+                       MappingProxyType(dict(ups)), MappingProxyType(dict(ssids)))
+
+
+def read_snapshot():
+    """One-shot snapshot for scripts that do not keep a collector running."""
+    ifaces, ips, ups = collect_interfaces()
+    return _make_snapshot(1, ifaces, ips, ups, collect_ssids(ifaces, ups))
+
+
+class NetworkState:
+    """Single collector of interface state, published as versioned snapshots."""
+
+    def __init__(self, poll_interval=2, ssid_ttl=10):
+        # Only used when rtnetlink is unavailable
+        self.poll_interval = poll_interval
+        # Maximum age of the SSIDs when no link event arrives
+        self.ssid_ttl = ssid_ttl
+        self.monitor = None
+        self._snapshot = EMPTY_SNAPSHOT
+        self._subscribers = []
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        try:
+            monitor = InterfaceMonitor()
+            monitor.start()
+            monitor.subscribe(self.refresh)
+            self.monitor = monitor
+        except Exception as e:
+            log.warning(f"rtnetlink unavailable, polling interfaces with ip: {e}")
+            self.monitor = None
+        self.refresh()
+        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.monitor is not None:
+            self.monitor.stop()
+
+    def snapshot(self):
+        """Return the current NetSnapshot (immutable; safe to keep)."""
+        return self._snapshot
+
+    def subscribe(self, callback):
+        """Call `callback(snapshot)` from the collector thread whenever the state changes."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    def iface_exists(self, name):
+        return name in self._snapshot.ifaces
+
+    def refresh(self):
+        """Collect the current state and publish a new snapshot if it changed."""
+        with self._refresh_lock:
+            if self.monitor is not None:
+                ifaces, ips, ups = self.monitor.snapshot()
+            else:
+                ifaces, ips, ups = collect_interfaces()
+            ssids = collect_ssids(ifaces, ups)
+            prev = self._snapshot
+            if (tuple(ifaces), dict(ips), dict(ups), ssids) == (prev.ifaces, dict(prev.ips),
+                                                                 dict(prev.ups), dict(prev.ssids)):
+                return prev
+            snap = _make_snapshot(prev.version + 1, ifaces, ips, ups, ssids)
+            self._snapshot = snap
+            # Delivered in publish order, still under the refresh lock
+            for callback in list(self._subscribers):
+                try:
+                    callback(snap)
+                except Exception as e:
+                    log.error(f"Network state subscriber failed: {e}")
+            return snap
+
+    def _poll_loop(self):
+        # With rtnetlink only the SSIDs need polling
+        while not self._stop.wait(self.poll_interval if self.monitor is None else self.ssid_ttl):
+            try:
+                self.refresh()
+            except Exception:
+                pass
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_network_state():
+    """Return the process-wide NetworkState, starting it on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = NetworkState()
+            _shared.start()
+        return _shared
@@ -0,0 +1,58 @@
+class ProbeScheduler:
+    """Decides when each (interface, target) pair is probed next.
+
+    Every pair has a base interval (per target from config.yaml, else the
+    default). A pair that fails backs off exponentially up to
+    `max_backoff` seconds and returns to its base interval after the next
+    reply. Pairs on inactive interfaces are not due at all, and
+    `trigger()` makes an interface's pairs due immediately (e.g. after a
+    cable was plugged in). Times are `time.monotonic()` seconds.
+    """
+
+    def __init__(self, default_interval=10, max_backoff=120):
+        self.default_interval = default_interval
+        self.max_backoff = max_backoff
+        self._intervals = {}  # pair -> base interval
+        self._next = {}       # pair -> next due time
+        self._failures = {}   # pair -> consecutive failures
+
+    def configure(self, intervals):
+        """Set the pairs to schedule as {pair: base interval or None}; new pairs are due now."""
+        self._intervals = {pair: (iv or self.default_interval) for pair, iv in intervals.items()}
+        for pair in list(self._next):
+            if pair not in self._intervals:
+                del self._next[pair]
+                self._failures.pop(pair, None)
+        for pair in self._intervals:
+            self._next.setdefault(pair, 0.0)
+            self._failures.setdefault(pair, 0)
+
+    def due(self, now, active):
+        """Pairs whose time has come and whose interface is in `active`."""
+        return [pair for pair, t in self._next.items() if t <= now and pair[0] in active]
+
+    def report(self, pair, ok, now):
+        """Schedule the next probe of `pair` after a result."""
+        if pair not in self._intervals:
+            return
+        base = self._intervals[pair]
+        if ok:
+            self._failures[pair] = 0
+            delay = base
+        else:
+            failures = min(self._failures[pair], 10)
+            self._failures[pair] = failures + 1
+            delay = min(base * 2 ** failures, max(self.max_backoff, base))
+        self._next[pair] = now + delay
+
+    def trigger(self, iface, now=0.0):
+        """Make every pair of `iface` due at `now` and forget its backoff."""
+        for pair in self._next:
+            if pair[0] == iface:
+                self._next[pair] = now
+                self._failures[pair] = 0
+
+    def next_due(self, active):
+        """Earliest due time among pairs on `active` interfaces, or None."""
+        times = [t for pair, t in self._next.items() if pair[0] in active]
+        return min(times) if times else None
@@ -0,0 +1,204 @@
+"""SQLite index over the session journals.
+
+Every finished session journal (`session-*.jsonl`, the structured record
+of a session) is folded into a few rows: the session, the state of each
+interface before the unplug with its VLAN and how often it went down, every address
+seen, and per (interface, target) probe outcomes. The database runs in
+WAL mode so the query tool can read while the app writes, and its
+indexes make aggregations across thousands of sessions take
+milliseconds.
+"""
+import os
+import sqlite3
+import threading
+
+from tagtapperpi_comp.journal import Journal
+
+INDEX_NAME = "sessions.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    journal TEXT NOT NULL UNIQUE,
+    start REAL NOT NULL,
+    end REAL,
+    recovered INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS interfaces (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    iface TEXT NOT NULL,
+    vlan INTEGER,
+    vlan_name TEXT,
+    up INTEGER NOT NULL,
+    ip TEXT,
+    ssid TEXT,
+    down_events INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, iface)
+);
+CREATE TABLE IF NOT EXISTS addresses (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    iface TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    PRIMARY KEY (session_id, iface, ip)
+);
+CREATE TABLE IF NOT EXISTS probes (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    iface TEXT NOT NULL,
+    host TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    fail_events INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER,
+    lost INTEGER,
+    avg_ms REAL,
+    max_ms REAL,
+    PRIMARY KEY (session_id, iface, host)
+);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions(start);
+CREATE INDEX IF NOT EXISTS interfaces_vlan ON interfaces(vlan, up);
+CREATE INDEX IF NOT EXISTS interfaces_iface ON interfaces(iface);
+CREATE INDEX IF NOT EXISTS probes_host ON probes(host, ok);
+"""
+
+
+def _vlan_id(iface):
+    if '.' not in iface:
+        return None
+    try:
+        return int(iface.rsplit('.', 1)[1])
+    except ValueError:
+        return None
+
+
+def journal_name(path):
+    """Name a journal is indexed under (the same before and after archiving)."""
+    name = os.path.basename(path)
+    return name[:-3] if name.endswith('.gz') else name
+
+
+def summarize(entries):
+    """Fold journal entries into the rows of one session, or None if there is no start record.
+
+    Interface states are those just before the cable was pulled.
+    """
+    if not entries or entries[0].get('type') != 'start':
+        return None
+    start = entries[0]
+    vlan_names = start.get('vlan_names') or {}
+    links = {iface: dict(state) for iface, state in (start.get('links') or {}).items()}
+    downs = {}
+    addresses = {(iface, s['ip']) for iface, s in links.items() if s.get('ip')}
+    pings = {(iface, host): bool(ok) for iface, host, ok in start.get('pings') or []}
+    fails = {}
+    end = next((e for e in entries if e.get('type') == 'end'), None)
+    # The unplug that ended the session is not an outage of the interfaces
+    cutoff = end.get('t') if end and not end.get('recovered') else None
+
+    for e in entries[1:]:
+        kind = e.get('type')
+        if kind == 'link':
+            if cutoff is not None and e.get('t', 0) >= cutoff:
+                continue
+            iface = e.get('iface')
+            was_up = links.get(iface, {}).get('up')
+            if e.get('present'):
+                links[iface] = {'up': e.get('up'), 'ip': e.get('ip'), 'ssid': e.get('ssid')}
+                if e.get('ip'):
+                    addresses.add((iface, e['ip']))
+            else:
+                links.pop(iface, None)
+            if was_up and not (e.get('present') and e.get('up')):
+                downs[iface] = downs.get(iface, 0) + 1
+        elif kind == 'ping':
+            key = (e.get('iface'), e.get('host'))
+            if not e.get('ok') and pings.get(key, True):
+                fails[key] = fails.get(key, 0) + 1
+            pings[key] = bool(e.get('ok'))
+
+    stats = {}
+    for item in (end or {}).get('stats') or []:
+        stats[(item.get('iface'), item.get('host'))] = item.get('totals') or {}
+
+    # Interfaces that disappeared during the session still count as down
+    for iface in downs:
+        links.setdefault(iface, {'up': False, 'ip': None, 'ssid': None})
+
+    return {
+        'start': start.get('t'),
+        'end': end.get('t') if end else entries[-1].get('t'),
+        'recovered': bool(end and end.get('recovered')),
+        'interfaces': [
+            (iface, _vlan_id(iface), vlan_names.get(str(_vlan_id(iface))), bool(s.get('up')),
+             s.get('ip'), s.get('ssid'), downs.get(iface, 0))
+            for iface, s in links.items()
+        ],
+        'addresses': sorted(addresses),
+        'probes': [
+            (iface, host, ok, fails.get((iface, host), 0), stats.get((iface, host), {}).get('sent'),
+             stats.get((iface, host), {}).get('lost'), stats.get((iface, host), {}).get('avg_ms'),
+             stats.get((iface, host), {}).get('max_ms'))
+            for (iface, host), ok in pings.items()
+        ],
+    }
+
+
+class ReportIndex:
+    """Session index stored next to the reports (`sessions.sqlite`)."""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, INDEX_NAME)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable up to the last checkpoint, one fsync per checkpoint
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def indexed(self):
+        """Return the journal file names already in the index."""
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT journal FROM sessions")}
+
+    def add(self, journal_path):
+        """(Re)index one finished journal. Returns False if it has no usable data."""
+        record = summarize(Journal.read(journal_path))
+        if record is None:
+            return False
+        name = journal_name(journal_path)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM sessions WHERE journal = ?", (name,))
+            cur = self._db.execute(
+                "INSERT INTO sessions (journal, start, end, recovered) VALUES (?, ?, ?, ?)",
+                (name, record['start'], record['end'], int(record['recovered'])))
+            sid = cur.lastrowid
+            self._db.executemany(
+                "INSERT INTO interfaces (session_id, iface, vlan, vlan_name, up, ip, ssid, down_events) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(sid,) + row for row in record['interfaces']])
+            self._db.executemany(
+                "INSERT INTO addresses (session_id, iface, ip) VALUES (?, ?, ?)",
+                [(sid,) + row for row in record['addresses']])
+            self._db.executemany(
+                "INSERT INTO probes (session_id, iface, host, ok, fail_events, sent, lost, avg_ms, max_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(sid,) + row for row in record['probes']])
+        return True
+
+    def query(self, sql, params=()):
+        """Run a read query and return (column names, rows)."""
+        with self._lock:
+            cur = self._db.execute(sql, params)
+            return [d[0] for d in cur.description or []], cur.fetchall()
+
+
+def journals(directory):
+    """Paths of all session journals in `directory` (archived ones too), oldest first."""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    return [os.path.join(directory, n) for n in names if n.startswith("session-") and n.endswith((".jsonl", ".jsonl.gz"))]
@@ -0,0 +1,111 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# Over the sliding window of the last `capacity` probes; times in ms (None without replies)
+RttSummary = namedtuple('RttSummary', [
+    'sent', 'lost', 'loss_pct', 'min_ms', 'avg_ms', 'max_ms', 'p95_ms', 'jitter_ms', 'last_ms',
+])
+
+# Since the last reset_totals() (e.g. session start); times in ms
+RttTotals = namedtuple('RttTotals', ['sent', 'lost', 'loss_pct', 'min_ms', 'avg_ms', 'max_ms'])
+
+
+class RttStats:
+    """RTT samples per (interface, target) in fixed-size ring buffers.
+
+    Each key owns a float array of `capacity` slots holding the RTT of the
+    most recent probes in seconds (NaN for a lost probe), so memory stays
+    constant however long the device runs. Window statistics come from
+    the ring; running totals (count, sum, min, max) cover longer spans
+    such as a whole session.
+    """
+
+    def __init__(self, capacity=60):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._rings = {}    # key -> np.ndarray(capacity)
+        self._written = {}  # key -> number of probes recorded
+        self._totals = {}   # key -> np.array([sent, received, sum_s, min_s, max_s])
+
+    def record(self, key, rtt):
+        """Record one probe result: RTT in seconds, or None if it was lost."""
+        value = np.nan if rtt is None else float(rtt)
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = self._rings[key] = np.full(self.capacity, np.nan)
+                self._written[key] = 0
+            ring[self._written[key] % self.capacity] = value
+            self._written[key] += 1
+
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = np.array([0.0, 0.0, 0.0, np.inf, 0.0])
+            totals[0] += 1
+            if rtt is not None:
+                totals[1] += 1
+                totals[2] += value
+                totals[3] = min(totals[3], value)
+                totals[4] = max(totals[4], value)
+
+    def record_many(self, results):
+        """Record {key: rtt or None} from one probe round."""
+        for key, rtt in results.items():
+            self.record(key, rtt)
+
+    def summary(self, key):
+        """Return the RttSummary for `key`, or None if it was never probed."""
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                return None
+            n = min(self._written[key], self.capacity)
+            last_slot = (self._written[key] - 1) % self.capacity
+            # Oldest to newest, so jitter follows probe order
+            order = np.roll(ring, -(last_slot + 1))[self.capacity - n:]
+            last = ring[last_slot]
+
+        ok = order[~np.isnan(order)] * 1000
+        lost = n - ok.size
+        loss_pct = 100.0 * lost / n if n else 0.0
+        last_ms = None if np.isnan(last) else float(last * 1000)
+        if ok.size == 0:
+            return RttSummary(n, lost, loss_pct, None, None, None, None, None, last_ms)
+        # Mean absolute difference between consecutive replies (RFC 3550 style)
+        jitter = float(np.abs(np.diff(ok)).mean()) if ok.size > 1 else 0.0
+        return RttSummary(n, lost, loss_pct, float(ok.min()), float(ok.mean()), float(ok.max()),
+                          float(np.percentile(ok, 95)), jitter, last_ms)
+
+    def summaries(self):
+        """Return {key: RttSummary} for every probed key."""
+        with self._lock:
+            keys = list(self._rings)
+        return {key: self.summary(key) for key in keys}
+
+    def totals(self, key):
+        """Return RttTotals for `key` since the last reset, or None."""
+        with self._lock:
+            t = self._totals.get(key)
+            if t is None or t[0] == 0:
+                return None
+            sent, received, total, lo, hi = (float(v) for v in t)
+        lost = int(sent - received)
+        if not received:
+            return RttTotals(int(sent), lost, 100.0, None, None, None)
+        return RttTotals(int(sent), lost, 100.0 * lost / sent, lo * 1000, total / received * 1000, hi * 1000)
+
+    def reset_totals(self):
+        """Start new running totals (the sliding windows are kept)."""
+        with self._lock:
+            self._totals.clear()
+
+    def prune(self, keys):
+        """Forget every key not in `keys` (e.g. after a config change)."""
+        keep = set(keys)
+        with self._lock:
+            for key in [k for k in self._rings if k not in keep]:
+                del self._rings[key]
+                del self._written[key]
+                self._totals.pop(key, None)
@@ -1,47 +1,77 @@
 import os
 import time
 import threading
-import yaml
+
+from tagtapperpi_comp.config import get_config_store
+from tagtapperpi_comp.journal import Journal
+from tagtapperpi_comp.netstate import get_network_state, ordered_interfaces
+from tagtapperpi_comp.report_index import ReportIndex, journal_name, journals
+from tagtapperpi_comp.storage import enforce_quota, file_stem, get_write_behind
+from tagtapperpi_comp.rtt_stats import RttSummary, RttTotals
+
+
+def report_dir(snapshot):
+    """Directory reports go to: `<report_path>/tag-tapper-pi-reports` (repo root without report_path)."""
+    base_path = snapshot.report_path
+    # Fallback: repo root
+    if not base_path:
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, "tag-tapper-pi-reports")
 
 
 class SessionReporter:
-    """Monitors `eth0` link state and writes a session report when the cable
-    is unplugged (transition UP -> DOWN). A session starts when eth0 becomes UP.
+    """Writes a report for every `eth0` session: a session starts when eth0
+    becomes UP and ends when the cable is unplugged (transition UP -> DOWN).
+
+    The reporter is event driven. It subscribes to the network state service
+    and the ping tab and appends every link, address and SSID transition and
+    every ping result change, with its exact timestamp, to a per-session
+    journal (`session-YYYYMMDD-HHMMSS.jsonl`), fsynced in batches about once
+    per second. The text report is rendered from the journal on the
+    reporter's own thread once the session ended; journals left open by a
+    power cut or restart are finished and reported on the next start.
 
-    The report mirrors panel data: IP table and ping matrix.
+    The report mirrors panel data: IP table and ping matrix, plus the
+    sequence of events.
 
     Config:
       - In config.yaml, set `report_path: /some/base/path`
         Reports will be saved under `<report_path>/tag-tapper-pi-reports/`.
     """
 
-    def __init__(self, tab_ip, tab_ping, config_path="/home/dietpi/tag-tapper-pi/config.yaml"):
+    def __init__(self, tab_ip, tab_ping, config=None, netstate=None, sync_interval=1.0):
         self.tab_ip = tab_ip
         self.tab_ping = tab_ping
-        self.config_path = config_path
+        # Same network state service and config store the tabs read from
+        self.netstate = netstate or get_network_state()
+        self.config = config or get_config_store()
         self.report_dir = None
+        # Seconds between journal fsyncs
+        self.sync_interval = sync_interval
         self._stop = threading.Event()
         self._thread = None
 
-        self._session_active = False
-        self._session_start_ts = None
+        # Session state, changed from the netstate and ping threads
+        self._lock = threading.Lock()
+        self._journal = None
+        self._prev_up = None
+        self._links = {}  # iface -> {'up', 'ip', 'ssid'} as last journaled
+        self._pings = {}  # (iface, host) -> ok as last journaled
+        # SQLite index of finished sessions, opened on first use
+        self._report_index = None
+        # Text reports go through the write-behind buffer
+        self.storage = get_write_behind()
+        # Set when old sessions should be compressed/pruned (done on the sync thread)
+        self._quota_due = True
+        # Journals of ended sessions waiting for their report (done on the sync thread)
+        self._finished = []
 
-        self._load_config()
-        self._ensure_report_dir()
+        self._load_config(self.config.snapshot())
+        self.config.subscribe(self._load_config)
 
-    def _load_config(self):
-        base_path = None
-        try:
-            with open(self.config_path, "r") as f:
-                cfg = yaml.safe_load(f) or {}
-                base_path = cfg.get("report_path")
-        except Exception:
-            base_path = None
-        # Fallback: repo root
-        if not base_path:
-            repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            base_path = repo_root
-        self.report_dir = os.path.join(base_path, "tag-tapper-pi-reports")
+    def _load_config(self, snapshot):
+        self.report_dir = report_dir(snapshot)
+        self._ensure_report_dir()
 
     def _ensure_report_dir(self):
         try:
@@ -52,93 +82,244 @@ class SessionReporter:
     def start(self):
         if self._thread:
             return
-        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._recover()
+        self.netstate.subscribe(self._on_net_change)
+        try:
+            self.tab_ping.subscribe(self._on_ping_results)
+        except AttributeError:
+            pass
+        self._on_net_change(self.netstate.snapshot())
+        self._thread = threading.Thread(target=self._sync_loop, daemon=True)
         self._thread.start()
 
     def stop(self):
         self._stop.set()
+        self.netstate.unsubscribe(self._on_net_change)
+        try:
+            self.tab_ping.unsubscribe(self._on_ping_results)
+        except AttributeError:
+            pass
         if self._thread:
             try:
                 self._thread.join(timeout=1.0)
             except Exception:
                 pass
+        # An open session stays unfinished and is reported on the next start
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        self._report_finished()
 
-    def _loop(self):
-        prev_up = None
-        while not self._stop.is_set():
-            up = False
-            # Read cached link state from TabIP
-            try:
-                with getattr(self.tab_ip, "_lock", threading.Lock()):
-                    ups = dict(getattr(self.tab_ip, "cached_up", {}))
-                up = bool(ups.get("eth0", False))
-            except Exception:
-                up = False
-
-            if prev_up is None:
-                prev_up = up
-
-            # Detect transitions
-            if not self._session_active and up and prev_up is False:
-                # Session start
-                self._session_active = True
-                self._session_start_ts = time.time()
-            elif self._session_active and (not up) and prev_up is True:
-                # Session end -> write report
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            journal = self._journal
+            if journal is not None:
+                journal.sync()
+            self._report_finished()
+            if self._quota_due:
+                self._quota_due = False
                 try:
-                    self._write_report()
+                    exclude = self.storage.open_files()
+                    if journal is not None:
+                        exclude.add(journal.path)
+                    enforce_quota(self.report_dir, self.config.snapshot().report_quota,
+                                  exclude=exclude)
                 except Exception:
                     pass
-                finally:
-                    self._session_active = False
-                    self._session_start_ts = None
 
-            prev_up = up
-            time.sleep(0.5)
+    @staticmethod
+    def _link_state(snap):
+        return {iface: {'up': bool(snap.ups.get(iface, False)),
+                        'ip': snap.ips.get(iface),
+                        'ssid': snap.ssids.get(iface)}
+                for iface in snap.ifaces}
 
-    def _build_ip_rows(self):
-        """Return list of tuples: (display_name, ip_text, status_text)"""
-        rows = []
+    def _on_net_change(self, snap):
+        with self._lock:
+            up = bool(snap.ups.get("eth0", False))
+            prev_up = self._prev_up
+            self._prev_up = up
+            if self._journal is None:
+                if up and prev_up is False:
+                    self._start_session(snap)
+                return
+            self._journal_links(snap)
+            if not up:
+                # Report and index are written on the sync thread; this runs
+                # on the shared netstate thread
+                self._finished.append(self._end_session(snap.timestamp))
+
+    def _report_finished(self):
+        """Write the report of every ended session and add them to the index."""
+        with self._lock:
+            finished, self._finished = self._finished, []
+        if not finished:
+            return
+        for path in finished:
+            try:
+                self._write_report(path)
+            except Exception:
+                pass
+        self._index(finished)
+        self._quota_due = True
+
+    def _on_ping_results(self, results):
+        with self._lock:
+            if self._journal is None:
+                return
+            now = time.time()
+            for (iface, host), ok in results.items():
+                if self._pings.get((iface, host)) != ok:
+                    self._journal.append({'type': 'ping', 't': now, 'iface': iface, 'host': host, 'ok': ok})
+            self._pings = dict(results)
+
+    def _start_session(self, snap):
+        ts = snap.timestamp
+        self._ensure_report_dir()
+        base = os.path.join(self.report_dir, time.strftime("session-%Y%m%d-%H%M%S", time.localtime(ts)))
+        # Sessions of a flapping cable can start within the same second
+        path, n = base + ".jsonl", 1
+        while os.path.exists(path):
+            n += 1
+            path = f"{base}-{n}.jsonl"
         try:
-            with getattr(self.tab_ip, "_lock", threading.Lock()):
-                ifaces = list(getattr(self.tab_ip, "cached_ifaces", []))
-                vlan_names = dict(getattr(self.tab_ip, "cached_vlan_names", {}))
-                ips = dict(getattr(self.tab_ip, "cached_ips", {}))
-                ups = dict(getattr(self.tab_ip, "cached_up", {}))
+            self._journal = Journal(path)
+        except OSError:
+            return
+        cfg = self.config.snapshot()
+        self._links = self._link_state(snap)
+        self._pings = dict(getattr(self.tab_ping, "ping_results", {}))
+        targets = [{'host': t.get('host'), 'name': t.get('name')}
+                   for t in getattr(self.tab_ping, "ping_targets", []) if isinstance(t, dict)]
+        self._journal.append({
+            'type': 'start', 't': ts,
+            'vlan_names': dict(cfg.vlan_names),
+            'targets': targets,
+            'links': self._links,
+            'pings': [[iface, host, ok] for (iface, host), ok in self._pings.items()],
+        })
+        # RTT/loss totals in the report cover this session only
+        try:
+            self.tab_ping.stats.reset_totals()
         except Exception:
-            ifaces, vlan_names, ips, ups = [], {}, {}, {}
+            pass
 
-        # Order: eth0, VLANs by id, then wlan*
-        candidates = []
-        if "eth0" in ifaces:
-            candidates.append("eth0")
-        vlans = [n for n in ifaces if "." in n]
-        def vlan_key(name):
+    def _journal_links(self, snap):
+        state = self._link_state(snap)
+        for iface in list(self._links) + [i for i in state if i not in self._links]:
+            now = state.get(iface)
+            if now != self._links.get(iface):
+                entry = {'type': 'link', 't': snap.timestamp, 'iface': iface, 'present': now is not None}
+                entry.update(now or {})
+                self._journal.append(entry)
+        self._links = state
+
+    def _end_session(self, ts):
+        """Journal the end of the session and close it. Returns the journal path."""
+        entry = {'type': 'end', 't': ts, 'stats': []}
+        stats = getattr(self.tab_ping, "stats", None)
+        if stats is not None:
+            for (iface, host) in self._pings:
+                totals = stats.totals((iface, host))
+                summary = stats.summary((iface, host))
+                entry['stats'].append({
+                    'iface': iface, 'host': host,
+                    'totals': totals._asdict() if totals else None,
+                    'window': summary._asdict() if summary else None,
+                })
+        journal, self._journal = self._journal, None
+        journal.append(entry)
+        journal.close()
+        return journal.path
+
+    def _recover(self):
+        """Finish and report journals whose session never ended (power loss, restart),
+        re-render reports lost before they were flushed and index every finished
+        journal the index does not know yet."""
+        pending = []
+        try:
+            indexed = self._open_index().indexed()
+        except Exception:
+            indexed = set()
+        for path in journals(self.report_dir):
             try:
-                return int(name.split(".")[-1])
+                stem = file_stem(path)
+                has_report = os.path.exists(stem + ".txt") or os.path.exists(stem + ".txt.gz")
+                # Only finished journals get indexed
+                if journal_name(path) in indexed and has_report:
+                    continue
+                entries = Journal.read(path)
+                if not entries:
+                    continue
+                if not path.endswith(".gz") and not any(e.get('type') == 'end' for e in entries):
+                    journal = Journal(path)
+                    journal.append({'type': 'end', 't': entries[-1].get('t'), 'recovered': True})
+                    journal.close()
+                    has_report = False
+                if not has_report:
+                    self._write_report(path)
+                if journal_name(path) not in indexed:
+                    pending.append(path)
             except Exception:
-                return 0
-        for n in sorted(vlans, key=vlan_key):
-            candidates.append(n)
-        for n in sorted(ifaces):
-            if n.startswith("wlan") or n.startswith("wl"):
-                if n not in candidates:
-                    candidates.append(n)
-
-        for iface in candidates:
-            up = bool(ups.get(iface, False))
-            ip = ips.get(iface)
+                pass
+        self._index(pending)
+
+    def _open_index(self):
+        index = self._report_index
+        if index is None or os.path.dirname(index.path) != self.report_dir:
+            index = self._report_index = ReportIndex(self.report_dir)
+        return index
+
+    def _index(self, paths):
+        """Add finished journals to the SQLite session index."""
+        if not paths:
+            return
+        try:
+            index = self._open_index()
+            for path in paths:
+                index.add(path)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _replay(entries):
+        """Fold journal entries into the final state and the list of events."""
+        start = entries[0]
+        links = {iface: dict(state) for iface, state in start.get('links', {}).items()}
+        pings = {(iface, host): ok for iface, host, ok in start.get('pings', [])}
+        events = []
+        end = None
+        for e in entries[1:]:
+            kind = e.get('type')
+            if kind == 'link':
+                if e.get('present'):
+                    links[e['iface']] = {'up': e.get('up'), 'ip': e.get('ip'), 'ssid': e.get('ssid')}
+                else:
+                    links.pop(e['iface'], None)
+                events.append(e)
+            elif kind == 'ping':
+                pings[(e['iface'], e['host'])] = e.get('ok')
+                events.append(e)
+            elif kind == 'end':
+                end = e
+        return links, pings, events, end
+
+    @staticmethod
+    def _build_ip_rows(links, vlan_names):
+        """Return list of tuples: (display_name, ip_text, status_text)"""
+        rows = []
+        # Order: eth0, VLANs by id, then wlan*
+        for iface in ordered_interfaces(links):
+            up = bool(links[iface].get('up'))
+            ip = links[iface].get('ip')
             display_name = iface
             if "." in iface:
                 vid = iface.split(".")[-1]
                 if vid in vlan_names:
                     display_name = f"{iface} {vlan_names[vid]}"
             elif iface.startswith("wlan") or iface.startswith("wl"):
-                # Try SSID for wifi
-                try:
-                    ssid = self.tab_ip.get_wifi_ssid(iface)
-                except Exception:
-                    ssid = None
+                ssid = links[iface].get('ssid')
                 if ssid:
                     ssid_short = ssid[:16] + "…" if len(ssid) > 16 else ssid
                     display_name = f"{iface} ({ssid_short})"
@@ -147,55 +328,79 @@ class SessionReporter:
             rows.append((display_name, ip_text, status_text))
         return rows
 
-    def _build_ping_matrix(self):
-        """Return dict: {interface: [(target, ok_bool), ...]}"""
-        matrix = {}
-        try:
-            targets = list(getattr(self.tab_ping, "ping_targets", []))
-            results = dict(getattr(self.tab_ping, "ping_results", {}))
-        except Exception:
-            targets, results = [], {}
-
-        # Collect interfaces present in results
-        interfaces = set()
-        for (iface, host), ok in results.items():
-            interfaces.add(iface)
-        # If results are empty, try to infer from TabIP
-        if not interfaces:
-            try:
-                with getattr(self.tab_ip, "_lock", threading.Lock()):
-                    ifaces = list(getattr(self.tab_ip, "cached_ifaces", []))
-                for n in ifaces:
-                    interfaces.add(n)
-            except Exception:
-                pass
+    @staticmethod
+    def _build_ping_matrix(pings, targets, end):
+        """Return dict: {interface: [(target, ok_bool, RttTotals or None, RttSummary or None), ...]}"""
+        stats = {}
+        for item in (end or {}).get('stats') or []:
+            totals = RttTotals(**item['totals']) if item.get('totals') else None
+            summary = RttSummary(**item['window']) if item.get('window') else None
+            stats[(item['iface'], item['host'])] = (totals, summary)
 
-        for iface in sorted(interfaces):
+        hosts = [t.get('host') for t in targets if t.get('host')]
+        for _, host in pings:
+            if host not in hosts:
+                hosts.append(host)
+
+        matrix = {}
+        for iface in sorted({iface for iface, _ in pings}):
             row = []
-            for target in targets:
-                host = target.get("host") if isinstance(target, dict) else str(target)
-                ok = bool(results.get((iface, host), False))
-                row.append((host, ok))
+            for host in hosts:
+                ok = bool(pings.get((iface, host), False))
+                totals, summary = stats.get((iface, host), (None, None))
+                row.append((host, ok, totals, summary))
             matrix[iface] = row
         return matrix
 
-    def _write_report(self):
+    @staticmethod
+    def _format_event(e):
+        stamp = time.strftime("%H:%M:%S", time.localtime(e['t'])) + f".{int(e['t'] * 1000) % 1000:03d}"
+        if e['type'] == 'ping':
+            return f"  {stamp}  {e['iface'] + ' -> ' + e['host']:30} {'OK' if e.get('ok') else 'FAIL'}"
+        if not e.get('present'):
+            return f"  {stamp}  {e['iface']:30} entfernt"
+        text = f"  {stamp}  {e['iface']:30} {'UP' if e.get('up') else 'DOWN':4}  {e.get('ip') or '-'}"
+        if e.get('ssid'):
+            text += f"  ({e['ssid']})"
+        return text
+
+    @staticmethod
+    def _format_rtt(totals, summary):
+        """Loss and RTT figures for one report line ('' without samples)."""
+        if totals is None:
+            return ""
+        text = f"Verlust {totals.loss_pct:5.1f}% ({totals.lost}/{totals.sent})"
+        if totals.avg_ms is not None:
+            text += f"  RTT min/avg/max {totals.min_ms:.1f}/{totals.avg_ms:.1f}/{totals.max_ms:.1f} ms"
+        if summary is not None and summary.p95_ms is not None:
+            text += f"  p95 {summary.p95_ms:.1f} ms  Jitter {summary.jitter_ms:.1f} ms"
+        return text
+
+    def _write_report(self, journal_path):
+        """Render the text report of the session recorded in `journal_path`."""
+        entries = Journal.read(journal_path)
+        if not entries or entries[0].get('type') != 'start':
+            return
+        links, pings, events, end = self._replay(entries)
+
         # Filename: session-YYYYMMDD-HHMMSS.txt based on start time
-        start_ts = self._session_start_ts or time.time()
-        end_ts = time.time()
+        start_ts = entries[0]['t']
+        end_ts = end['t'] if end and end.get('t') else entries[-1]['t']
         start_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_ts))
         end_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_ts))
-        fname = time.strftime("session-%Y%m%d-%H%M%S.txt", time.localtime(start_ts))
-        fpath = os.path.join(self.report_dir, fname)
+        fpath = file_stem(journal_path) + ".txt"
 
-        ip_rows = self._build_ip_rows()
-        ping_matrix = self._build_ping_matrix()
+        ip_rows = self._build_ip_rows(links, entries[0].get('vlan_names', {}))
+        ping_matrix = self._build_ping_matrix(pings, entries[0].get('targets', []), end)
 
         lines = []
         lines.append("Tag Tapper Pi Session Report")
         lines.append("")
         lines.append(f"Start: {start_str}")
-        lines.append(f"Ende:  {end_str}")
+        if end and end.get('recovered'):
+            lines.append(f"Ende:  {end_str} (letzter Eintrag, Session durch Neustart oder Stromausfall unterbrochen)")
+        else:
+            lines.append(f"Ende:  {end_str}")
         lines.append("")
         lines.append("IPs:")
         for name, ip, status in ip_rows:
@@ -205,14 +410,19 @@ class SessionReporter:
         if ping_matrix:
             for iface, items in ping_matrix.items():
                 lines.append(f"  [{iface}]")
-                for host, ok in items:
+                for host, ok, totals, summary in items:
                     state = "OK" if ok else "FAIL"
-                    lines.append(f"    {host:20} {state}")
+                    lines.append(f"    {host:20} {state:4}  {self._format_rtt(totals, summary)}".rstrip())
         else:
             lines.append("  (keine Ping-Daten)")
+        lines.append("")
+        lines.append("Ereignisse:")
+        if events:
+            for e in events:
+                lines.append(self._format_event(e))
+        else:
+            lines.append("  (keine)")
 
-        try:
-            with open(fpath, "w") as f:
-                f.write("\n".join(lines) + "\n")
-        except Exception:
-            pass
+        # Replaced atomically by the write-behind thread, flushed right away
+        self.storage.write_file(fpath, "\n".join(lines) + "\n")
+        self.storage.request_flush()
@@ -0,0 +1,303 @@
+"""Write-behind storage for logs and reports on the SD card.
+
+Callers hand their data to `WriteBehind` and return immediately; a writer
+thread flushes it in batches (every `flush_interval` seconds, when the
+buffer grows large, on errors in the log, and at exit). Whole files
+(reports) are written to a temporary file and renamed into place, so a
+power cut leaves either the old or the new version. Appended files (the
+log, walk-test CSVs) are rotated by size into gzip archives, and
+`enforce_quota()` compresses old session files and drops the oldest
+archives once the report directory exceeds its quota.
+"""
+import atexit
+import gzip
+import logging
+import os
+import re
+import shutil
+import threading
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 30  # seconds
+DEFAULT_MAX_BUFFER = 256 * 1024  # bytes pending before an early flush
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def atomic_write(path, data):
+    """Replace `path` with `data` (bytes) via a temporary file and rename."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path)
+
+
+def gzip_file(path, target=None):
+    """Compress `path` into `target` (default `path`.gz) atomically and remove `path`."""
+    target = target or f"{path}.gz"
+    tmp = f"{target}.tmp"
+    with open(path, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    with open(tmp, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    os.remove(path)
+    _fsync_dir(target)
+
+
+def rotate(path, backups):
+    """Rename `path` to `path`.1.gz, shifting older archives up to `backups`."""
+    for i in range(backups - 1, 0, -1):
+        src = f"{path}.{i}.gz"
+        if os.path.exists(src):
+            os.replace(src, f"{path}.{i + 1}.gz")
+    if backups > 0:
+        gzip_file(path, f"{path}.1.gz")
+    else:
+        os.remove(path)
+
+
+class WriteBehind:
+    """RAM buffer in front of the SD card with a single writer thread."""
+
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL, max_buffer=DEFAULT_MAX_BUFFER):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._files = {}     # path -> bytes to write as the whole file
+        self._appends = {}   # path -> [bytes, ...]
+        self._rotation = {}  # path -> (max_bytes, backups)
+        self._open = set()   # appended files still being written (see mark_open)
+        self._pending = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        self.flush()
+
+    def set_rotation(self, path, max_bytes, backups=3):
+        """Rotate the appended file `path` into gzip archives once it exceeds `max_bytes`."""
+        with self._lock:
+            self._rotation[path] = (max_bytes, backups)
+
+    def mark_open(self, path, is_open=True):
+        """Flag `path` as a file that is still being appended to (e.g. a running walk test)."""
+        with self._lock:
+            if is_open:
+                self._open.add(path)
+            else:
+                self._open.discard(path)
+
+    def open_files(self):
+        """Paths that must not be compressed or removed: marked open or with pending appends."""
+        with self._lock:
+            return self._open | set(self._appends)
+
+    def write_file(self, path, data):
+        """Queue `data` (str or bytes) to replace `path` atomically."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with self._lock:
+            self._pending += len(data) - len(self._files.get(path, b''))
+            self._files[path] = data
+        self._check_pending()
+
+    def append(self, path, data):
+        """Queue `data` (str or bytes) to be appended to `path`."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with self._lock:
+            self._appends.setdefault(path, []).append(data)
+            self._pending += len(data)
+        self._check_pending()
+
+    def request_flush(self):
+        """Ask the writer thread to flush soon (e.g. after an error was logged)."""
+        self._wake.set()
+
+    def _check_pending(self):
+        if self._pending >= self.max_buffer:
+            self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far (called by the writer thread and at exit)."""
+        with self._flush_lock:
+            with self._lock:
+                files, self._files = self._files, {}
+                appends, self._appends = self._appends, {}
+                rotation = dict(self._rotation)
+                self._pending = 0
+            for path, data in files.items():
+                try:
+                    atomic_write(path, data)
+                except OSError as e:
+                    log.error(f"Write-behind: writing {path} failed: {e}")
+            for path, chunks in appends.items():
+                try:
+                    self._append(path, b''.join(chunks), rotation.get(path))
+                except OSError as e:
+                    # Logging here could feed back into the buffer; report on stderr only
+                    try:
+                        os.write(2, f"Write-behind: appending to {path} failed: {e}\n".encode())
+                    except OSError:
+                        pass
+
+    @staticmethod
+    def _append(path, data, rotation):
+        if rotation is not None:
+            max_bytes, backups = rotation
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            if size and size + len(data) > max_bytes:
+                rotate(path, backups)
+        with open(path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class BufferedLogHandler(logging.Handler):
+    """Logging handler that appends formatted records through WriteBehind.
+
+    Records of level ERROR and above make the writer flush right away, so
+    the lines leading up to a failure reach the card promptly.
+    """
+
+    def __init__(self, path, write_behind=None, max_bytes=1024 * 1024, backups=3):
+        super().__init__()
+        self.path = path
+        self.write_behind = write_behind or get_write_behind()
+        self.write_behind.set_rotation(path, max_bytes, backups)
+
+    def emit(self, record):
+        try:
+            self.write_behind.append(self.path, self.format(record) + '\n')
+            if record.levelno >= logging.ERROR:
+                self.write_behind.request_flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.write_behind.flush()
+
+
+def file_stem(name):
+    """'session-20260101-120000.txt.gz' -> 'session-20260101-120000' (paths work too)."""
+    for ext in ('.gz', '.txt', '.jsonl', '.csv'):
+        if name.endswith(ext):
+            name = name[:-len(ext)]
+    return name
+
+
+_STEM_TIME = re.compile(r'-(\d{8}-\d{6})(?:-(\d+))?$')
+
+
+def _stem_age_key(stem):
+    """Sort key putting session and walk-test stems of one directory in start-time order.
+
+    Names carry the start time after the prefix ('session-20260101-120000-2');
+    the prefix itself must not decide the order.
+    """
+    m = _STEM_TIME.search(os.path.basename(stem))
+    if m is None:
+        return ('', 0, stem)
+    return (m.group(1), int(m.group(2) or 1), stem)
+
+
+def enforce_quota(directory, quota_bytes, keep_recent=20, exclude=()):
+    """Compress all but the `keep_recent` newest sessions and delete the
+    oldest archives while the reports in `directory` exceed `quota_bytes`.
+
+    Only `session-*` and `walktest-*` files are touched; paths in
+    `exclude` (the journal of the running session, the CSV of a running
+    walk test) are left alone.
+    """
+    try:
+        names = [n for n in os.listdir(directory)
+                 if n.startswith(('session-', 'walktest-')) and not n.endswith('.tmp')]
+    except OSError:
+        return
+    exclude = {os.path.abspath(p) for p in exclude}
+    groups = {}
+    for name in names:
+        path = os.path.join(directory, name)
+        if os.path.abspath(path) in exclude:
+            continue
+        groups.setdefault(file_stem(name), []).append(path)
+    stems = sorted(groups, key=_stem_age_key)
+
+    for stem in stems[:max(0, len(stems) - keep_recent)]:
+        for i, path in enumerate(groups[stem]):
+            if not path.endswith('.gz'):
+                try:
+                    gzip_file(path)
+                    groups[stem][i] = f"{path}.gz"
+                except OSError as e:
+                    log.warning(f"Could not compress {path}: {e}")
+
+    def size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    total = sum(size(p) for paths in groups.values() for p in paths)
+    for stem in stems:
+        if total <= quota_bytes:
+            break
+        for path in groups[stem]:
+            total -= size(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        log.info(f"Report quota: removed {stem}")
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_write_behind():
+    """Return the process-wide WriteBehind, starting its writer thread on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = WriteBehind()
+            _shared.start()
+            atexit.register(_shared.stop)
+        return _shared
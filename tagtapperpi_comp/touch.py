@@ -3,7 +3,9 @@ import time
 import threading
 import logging
 import struct
-import yaml
+from collections import deque
+
+from tagtapperpi_comp.config import get_config_store
 
 try:
     from textual.events import Click
@@ -16,41 +18,109 @@ except ImportError:
     Click = None
 
 
-def load_calibration(config_file="/home/dietpi/tag-tapper-pi/config.yaml"):
-    """Load touch calibration from config.yaml."""
+def load_calibration():
+    """Return touch calibration from the shared config store."""
+    snapshot = get_config_store().snapshot()
+    if not snapshot.has_touch_calibration:
+        # Default uncalibrated values
+        logging.getLogger("tagtapper.touch").debug("No calibration found")
+    return dict(snapshot.touch_calibration)
+
+
+# EVIOCSCLOCKID: have the kernel stamp input events with CLOCK_MONOTONIC
+# (default is wall-clock time, which jumps when NTP syncs)
+EVIOCSCLOCKID = 0x400445a0
+
+
+class TouchChannel:
+    """Bounded hand-off of touch events from the reader thread to the main loop.
+
+    Consecutive position updates coalesce into one (the latest wins), while
+    button edges are kept in order, so the backlog between two frames is at
+    most one position per edge no matter how long a drag lasts. Button
+    edges are never dropped: if the main loop stalls until `capacity`
+    events are pending, the oldest position update is discarded to make
+    room (the channel only grows past `capacity` when it holds nothing but
+    button edges).
+    """
+
+    def __init__(self, capacity=64):
+        self._events = deque()
+        self._capacity = capacity
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, event):
+        with self._cond:
+            if event[0] == 'POS' and self._events and self._events[-1][0] == 'POS':
+                self._events[-1] = event
+            else:
+                if len(self._events) >= self._capacity:
+                    self._drop_oldest_position()
+                self._events.append(event)
+            self._cond.notify()
+
+    def _drop_oldest_position(self):
+        for i, pending in enumerate(self._events):
+            if pending[0] == 'POS':
+                del self._events[i]
+                self.dropped += 1
+                return
+
+    def drain(self, timeout=None):
+        """Return all pending events in order, waiting up to `timeout` seconds for the first."""
+        with self._cond:
+            if not self._events and timeout:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+
+class PositionSmoother:
+    """Moving average over the last `size` raw positions, kept as running sums."""
+
+    def __init__(self, size=4):
+        self._points = deque()
+        self._size = size
+        self._sum_x = 0
+        self._sum_y = 0
+
+    def add(self, x, y):
+        self._points.append((x, y))
+        self._sum_x += x
+        self._sum_y += y
+        if len(self._points) > self._size:
+            ox, oy = self._points.popleft()
+            self._sum_x -= ox
+            self._sum_y -= oy
+        n = len(self._points)
+        return self._sum_x // n, self._sum_y // n
+
+    def clear(self):
+        self._points.clear()
+        self._sum_x = 0
+        self._sum_y = 0
+
+
+def _use_monotonic_clock(dev):
+    """Switch `dev` to CLOCK_MONOTONIC timestamps. Returns False if the kernel refused."""
     try:
-        with open(config_file, 'r') as f:
-            config = yaml.safe_load(f)
-            if config and 'touch_calibration' in config:
-                calib = config['touch_calibration']
-                return {
-                    'raw_x_min': calib.get('raw_x_min', 0),
-                    'raw_x_max': calib.get('raw_x_max', 4095),
-                    'raw_y_min': calib.get('raw_y_min', 0),
-                    'raw_y_max': calib.get('raw_y_max', 4095),
-                    'screen_width': calib.get('screen_width', 480),
-                    'screen_height': calib.get('screen_height', 320),
-                }
-    except Exception as e:
-        logging.getLogger("tagtapper.touch").debug(f"No calibration found: {e}")
-    
-    # Default uncalibrated values
-    return {
-        'raw_x_min': 0,
-        'raw_x_max': 4095,
-        'raw_y_min': 0,
-        'raw_y_max': 4095,
-        'screen_width': 480,
-        'screen_height': 320,
-    }
-
-
-def start_touch_monitor(q, device_path: str, stop_event=None):
+        import fcntl
+        fcntl.ioctl(dev.fd, EVIOCSCLOCKID, struct.pack('i', time.CLOCK_MONOTONIC))
+        return True
+    except Exception:
+        return False
+
+
+def start_touch_monitor(channel, device_path: str, stop_event=None, smoothing=4):
     """Start a background thread that reads events from device_path using python-evdev.
 
-    Emits to `q` the same tuples as the original implementation:
-      - ('BTN', value)
-      - ('POS', x, y, pressure)
+    Puts into `channel` (a TouchChannel) tuples stamped with the kernel event
+    time `t` on the time.monotonic() clock:
+      - ('BTN', value, t)
+      - ('POS', x, y, pressure, t) with x/y averaged over the last `smoothing`
+        raw samples of the current touch
 
     Returns the started Thread. `stop_event` may be a threading.Event to stop the loop.
     """
@@ -71,9 +141,17 @@ def start_touch_monitor(q, device_path: str, stop_event=None):
             logger.error(f"Failed to open touch device {device_path}: {e}")
             return
 
+        if _use_monotonic_clock(dev):
+            stamp = lambda ev: ev.timestamp()
+        else:
+            # Wall-clock kernel stamps; translate to time.monotonic() on arrival
+            logger.warning("Touch device does not support CLOCK_MONOTONIC timestamps")
+            stamp = lambda ev: ev.timestamp() - time.time() + time.monotonic()
+
         cur_x = None
         cur_y = None
         cur_pressure = 0
+        smoother = PositionSmoother(smoothing)
 
         try:
             for ev in dev.read_loop():
@@ -88,10 +166,14 @@ def start_touch_monitor(q, device_path: str, stop_event=None):
                         elif ev.code == ecodes.ABS_PRESSURE:
                             cur_pressure = ev.value
                     elif ev.type == ecodes.EV_KEY and ev.code == ecodes.BTN_TOUCH:
-                        q.put(('BTN', ev.value))
-                    elif ev.type == ecodes.EV_SYN:
+                        # Each touch starts a fresh average
+                        smoother.clear()
+                        channel.put(('BTN', ev.value, stamp(ev)))
+                    elif ev.type == ecodes.EV_SYN and ev.code == ecodes.SYN_REPORT:
                         # On SYN_REPORT, push current position
-                        q.put(('POS', cur_x, cur_y, cur_pressure))
+                        if cur_x is not None and cur_y is not None:
+                            x, y = smoother.add(cur_x, cur_y)
+                            channel.put(('POS', x, y, cur_pressure, stamp(ev)))
                 except Exception:
                     continue
         except Exception as e:
@@ -117,7 +199,7 @@ def _post_click(app, x: int, y: int):
                 if all_tabs:
                     # Log all tab IDs for debugging
                     tab_ids = [t.id for t in all_tabs]
-                    logger.debug(f"Available tabs: {tab_ids}")
+                    logger.debug("Available tabs: %s", tab_ids)
                     
                     # Display width is 480, but let's use more forgiving boundaries
                     # Tabs: IP (0), Ping (1), Range (2), Power (3)
@@ -164,9 +246,9 @@ def _post_click(app, x: int, y: int):
                     )
                     widget.post_message(event)
             else:
-                logger.debug(f"No widget at X={x} Y={y}")
+                logger.debug("No widget at X=%s Y=%s", x, y)
         except Exception as e:
-            logger.debug(f"Error getting widget: {e}")
+            logger.debug("Error getting widget: %s", e)
             
     except Exception as e:
         logger.error(f"Error in _post_click: {e}")
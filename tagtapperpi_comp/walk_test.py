@@ -0,0 +1,121 @@
+import csv
+import io
+import threading
+import time
+
+import numpy as np
+
+from tagtapperpi_comp.storage import get_write_behind
+from tagtapperpi_comp.wireless import SignalReader, get_ssid
+
+
+class WalkTest:
+    """Samples the connected link's signal level for coverage walks.
+
+    A thread reads the level of `interface` from /proc/net/wireless about
+    `rate` times per second. Samples go into one ring of `capacity` slots
+    per SSID (dBm, NaN while connected elsewhere or not at all); all rings
+    share one write position, so their sparklines line up in time. Every
+    sample is also appended to a CSV session file through the write-behind
+    buffer.
+    """
+
+    def __init__(self, interface='wlan0', rate=10, capacity=300, reader=None, storage=None):
+        self.interface = interface
+        self.rate = rate
+        self.capacity = capacity
+        self.reader = reader or SignalReader()
+        self.storage = storage or get_write_behind()
+        self.path = None
+        # Bumped on every sample
+        self.version = 0
+        self._lock = threading.Lock()
+        self._rings = {}  # ssid -> np.ndarray(capacity)
+        self._written = 0
+        self._latest = (None, None)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, path):
+        """Start sampling into fresh buffers and the CSV file `path`."""
+        if self._thread:
+            return
+        with self._lock:
+            self._rings = {}
+            self._written = 0
+            self._latest = (None, None)
+        self.path = path
+        # Keeps the report quota away from the file while it grows
+        self.storage.mark_open(path)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and close the session file. Returns its path."""
+        if not self._thread:
+            return self.path
+        self._stop.set()
+        try:
+            self._thread.join(timeout=1.0)
+        except Exception:
+            pass
+        self._thread = None
+        self.reader.close()
+        # Still excluded from the quota until its buffered rows are flushed
+        self.storage.mark_open(self.path, False)
+        return self.path
+
+    def _loop(self):
+        self.storage.append(self.path, "time,ssid,signal_dbm\n")
+        period = 1.0 / self.rate
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            ssid = get_ssid(self.interface)
+            dbm = self.reader.level(self.interface) if ssid else None
+            self._record(ssid, dbm)
+            row = io.StringIO()
+            csv.writer(row).writerow([f"{time.time():.3f}", ssid or '', '' if dbm is None else f"{dbm:.0f}"])
+            # Buffered in RAM, written to the card in batches
+            self.storage.append(self.path, row.getvalue())
+
+            next_t += period
+            delay = next_t - time.monotonic()
+            if delay < 0:
+                # Fell behind (e.g. system busy): keep the rate, drop the backlog
+                next_t = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+        self.storage.request_flush()
+
+    def _record(self, ssid, dbm):
+        with self._lock:
+            slot = self._written % self.capacity
+            for ring in self._rings.values():
+                ring[slot] = np.nan
+            if ssid:
+                ring = self._rings.get(ssid)
+                if ring is None:
+                    ring = self._rings[ssid] = np.full(self.capacity, np.nan)
+                ring[slot] = np.nan if dbm is None else dbm
+            self._written += 1
+            self._latest = (ssid, dbm)
+            self.version += 1
+
+    def series(self, ssid):
+        """Return the samples of `ssid` oldest to newest (NaN gaps), or None."""
+        with self._lock:
+            ring = self._rings.get(ssid)
+            if ring is None:
+                return None
+            n = min(self._written, self.capacity)
+            return np.roll(ring, -(self._written % self.capacity))[self.capacity - n:]
+
+    def latest(self):
+        """Return (ssid, dbm) of the last sample."""
+        with self._lock:
+            return self._latest
@@ -0,0 +1,168 @@
+"""Wi-Fi scanning without blocking on the scan itself.
+
+`iw dev <iface> scan trigger` only asks the kernel to scan and returns at
+once; the results land in the kernel's BSS cache, which `iw dev <iface>
+scan dump` reads in milliseconds without disturbing the link. The cache
+therefore keeps serving the previous results while a scan runs, and a
+new scan is only triggered once the last one is over. Devices without
+`iw` fall back to a blocking `iwlist scan`.
+"""
+import logging
+import re
+import subprocess
+import time
+
+log = logging.getLogger(__name__)
+
+_ESCAPE = re.compile(rb'\\(x[0-9a-fA-F]{2}|\\)')
+
+
+def dbm_to_percent(dbm):
+    """Convert dBm signal strength to percentage (0-100)."""
+    # Typical WiFi signal range: -90 dBm (weak) to -30 dBm (strong)
+    if dbm >= -30:
+        return 100
+    elif dbm <= -90:
+        return 0
+    else:
+        # Linear interpolation
+        return int(((dbm + 90) / 60) * 100)
+
+
+def _unescape_ssid(text):
+    """Undo iw's \\xNN escaping of non-printable SSID bytes."""
+    raw = text.encode('utf-8', 'surrogateescape')
+    raw = _ESCAPE.sub(lambda m: b'\\' if m.group(1) == b'\\' else bytes([int(m.group(1)[1:], 16)]), raw)
+    return raw.decode('utf-8', 'replace')
+
+
+def parse_scan_dump(text):
+    """Parse `iw ... scan dump` output in one pass into {ssid: signal_percent}.
+
+    An SSID seen on several BSSs (access points, bands) keeps its
+    strongest signal; hidden networks are skipped.
+    """
+    networks = {}
+    ssid = None
+    dbm = None
+
+    def flush():
+        if ssid and dbm is not None:
+            percent = dbm_to_percent(dbm)
+            if percent > networks.get(ssid, -1):
+                networks[ssid] = percent
+
+    for line in text.splitlines():
+        if line.startswith('BSS '):
+            flush()
+            ssid = None
+            dbm = None
+            continue
+        line = line.strip()
+        if line.startswith('signal:'):
+            try:
+                dbm = float(line.split()[1])
+            except (IndexError, ValueError):
+                pass
+        elif line.startswith('SSID:') and ssid is None:
+            ssid = _unescape_ssid(line[5:].strip()) or None
+    flush()
+    return networks
+
+
+def parse_iwlist(text):
+    """Parse `iwlist ... scan` output into {ssid: signal_percent}."""
+    networks = {}
+    current_ssid = None
+    current_quality = None
+    for line in text.splitlines():
+        line = line.strip()
+        if 'ESSID:' in line:
+            match = re.search(r'ESSID:"([^"]+)"', line)
+            if match:
+                current_ssid = match.group(1)
+        elif 'Quality=' in line:
+            # Format: Quality=70/100  Signal level=-40 dBm
+            match = re.search(r'Quality=(\d+)/(\d+)', line)
+            if match:
+                current_quality = int((int(match.group(1)) / int(match.group(2))) * 100)
+            else:
+                match = re.search(r'Signal level[=:](-?\d+)', line)
+                if match:
+                    current_quality = dbm_to_percent(int(match.group(1)))
+        if current_ssid and current_quality is not None:
+            networks[current_ssid] = current_quality
+            current_ssid = None
+            current_quality = None
+    return networks
+
+
+class WifiScanner:
+    """Triggers scans on one interface and reads the cached results.
+
+    Not thread-safe; meant to be driven by a single polling thread.
+    """
+
+    def __init__(self, interface='wlan0', scan_time=4):
+        self.interface = interface
+        # A scan counts as running this long after it was triggered
+        self.scan_time = scan_time
+        self._proc = None
+        self._triggered = None
+        self._have_iw = True
+        # Results of the last iwlist scan (fallback only)
+        self._fallback = None
+
+    def scanning(self, now=None):
+        """True while the last triggered scan may still be in progress."""
+        now = time.monotonic() if now is None else now
+        if self._proc is not None and self._proc.poll() is None:
+            return True
+        self._proc = None
+        return self._triggered is not None and now - self._triggered < self.scan_time
+
+    def trigger(self, now=None):
+        """Start a scan unless one is running. Returns True if a scan was started.
+
+        Without `iw` this runs the blocking `iwlist` scan instead.
+        """
+        now = time.monotonic() if now is None else now
+        if self.scanning(now):
+            return False
+        self._triggered = now
+        if not self._have_iw:
+            self._iwlist()
+            return True
+        try:
+            self._proc = subprocess.Popen(['sudo', 'iw', 'dev', self.interface, 'scan', 'trigger'],
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            log.debug(f"iw scan trigger failed: {e}")
+            return False
+        return True
+
+    def results(self):
+        """Return the cached scan results as {ssid: signal_percent}, or None on failure."""
+        if not self._have_iw:
+            return self._fallback
+        try:
+            out = subprocess.run(['iw', 'dev', self.interface, 'scan', 'dump'],
+                                 stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=2)
+        except FileNotFoundError:
+            log.warning("iw not found, falling back to iwlist scans")
+            self._have_iw = False
+            self._triggered = None
+            return None
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+        if out.returncode != 0:
+            return None
+        return parse_scan_dump(out.stdout.decode('utf-8', 'surrogateescape'))
+
+    def _iwlist(self):
+        try:
+            out = subprocess.check_output(['sudo', 'iwlist', self.interface, 'scan'],
+                                          stderr=subprocess.DEVNULL, timeout=10)
+            self._fallback = parse_iwlist(out.decode('utf-8', 'replace'))
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+            self._fallback = None
@@ -0,0 +1,86 @@
+"""Cheap Wi-Fi queries straight from the kernel (no iwgetid/iwconfig forks)."""
+import array
+import fcntl
+import socket
+import struct
+
+SIOCGIWESSID = 0x8B1B
+IW_ESSID_MAX_SIZE = 32
+IWREQ_SIZE = 32  # ifr_name[16] + union iwreq_data (16 bytes)
+
+
+def get_ssid(iface):
+    """Return the SSID `iface` is associated with, or None.
+
+    Same SIOCGIWESSID ioctl `iwgetid -r` issues (cfg80211 provides it for
+    nl80211 drivers), without spawning a process.
+    """
+    buf = array.array('B', bytes(IW_ESSID_MAX_SIZE + 1))
+    addr, _ = buf.buffer_info()
+    req = struct.pack('16sPHH', iface.encode('utf-8')[:15], addr, len(buf), 0).ljust(IWREQ_SIZE, b'\0')
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            res = fcntl.ioctl(sock.fileno(), SIOCGIWESSID, req)
+    except OSError:
+        # Not a wireless interface, not present or not associated
+        return None
+    length = struct.unpack_from('16sPHH', res)[2]
+    ssid = buf.tobytes()[:min(length, IW_ESSID_MAX_SIZE)].rstrip(b'\0')
+    return ssid.decode('utf-8', 'replace') or None
+
+
+PROC_NET_WIRELESS = '/proc/net/wireless'
+
+
+def parse_proc_wireless(text):
+    """Return {iface: (link_quality, level_dbm, noise_dbm)} from /proc/net/wireless."""
+    stats = {}
+    # Two header lines, then "  wlan0: 0000   54.  -56.  -256  ..."
+    for line in text.splitlines()[2:]:
+        name, sep, rest = line.partition(':')
+        fields = rest.split()
+        if not sep or len(fields) < 4:
+            continue
+        try:
+            link, level, noise = (float(f.rstrip('.')) for f in fields[1:4])
+        except ValueError:
+            continue
+        # Some drivers report dBm as an unsigned 8-bit value
+        if level > 0:
+            level -= 256
+        stats[name.strip()] = (link, level, noise)
+    return stats
+
+
+class SignalReader:
+    """Reads the link's signal level from /proc/net/wireless.
+
+    Keeps the file open and re-reads it from the start on every call, so
+    sampling costs one read() and neither forks nor talks to the driver
+    beyond what the kernel already tracks for the association.
+    """
+
+    def __init__(self, path=PROC_NET_WIRELESS):
+        self.path = path
+        self._file = None
+
+    def level(self, iface):
+        """Return the signal level of `iface` in dBm, or None."""
+        try:
+            if self._file is None:
+                self._file = open(self.path)
+            self._file.seek(0)
+            text = self._file.read()
+        except OSError:
+            self.close()
+            return None
+        entry = parse_proc_wireless(text).get(iface)
+        return entry[1] if entry else None
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
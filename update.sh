@@ -32,4 +32,4 @@ sudo systemctl restart vlan-sync.service
 
 
 echo "Tailing error log: $LOG_FILE"
-tail -f "$LOG_FILE"
+tail -F "$LOG_FILE"